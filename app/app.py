@@ -1,7 +1,9 @@
 import streamlit as st
 import tempfile
+import hashlib
 import os
 import sys
+from collections import OrderedDict
 from dotenv import load_dotenv
 
 # =========================
@@ -20,7 +22,17 @@ if ROOT_DIR not in sys.path:
 # 내부 모듈 import
 # =========================
 from utils.file_handler import load_from_file, load_from_text_input
-from pipeline.langgraph_pipeline import run_langgraph_pipeline
+from pipeline.langgraph_pipeline import FUSED_MODE, SPECULATIVE_MODE, stream_langgraph_pipeline
+from utils.metrics import METRICS_PORT, start_metrics_server
+
+# =========================
+# 세션 캐시 설정
+# - Streamlit은 위젯을 조작할 때마다 스크립트 전체를 다시 실행하므로
+#   파싱한 원고와 분석 결과를 내용 해시 기준으로 세션에 보관
+# - 세션마다 최근 항목만 남기고 오래된 것부터 제거 (LRU)
+# =========================
+PARSED_CACHE_SIZE = 4
+RESULT_CACHE_SIZE = 8
 
 
 # =========================
@@ -40,14 +52,7 @@ def format_value(v):
 # =========================
 # 결과 출력 함수
 # =========================
-def render_result(result: dict):
-    st.markdown("---")
-
-    # =========================
-    # 1. 요약
-    # =========================
-    st.subheader("✍️ 요약")
-
+def render_summary(result: dict):
     summary = result.get("summary") or result.get("summary_result") or {}
 
     paras = summary.get("paragraph_summaries") or summary.get("paragraphs") or []
@@ -78,12 +83,8 @@ def render_result(result: dict):
         st.markdown("**핵심 키워드**")
         st.write(format_value(keywords))
 
-    # =========================
-    # 2. 장르 분석
-    # =========================
-    st.markdown("---")
-    st.subheader("🎭 장르 분석")
 
+def render_genre(result: dict):
     genre = result.get("genre") or {}
 
     main = genre.get("주_장르")
@@ -106,28 +107,37 @@ def render_result(result: dict):
     if not any([main, subs, keywords, confidence]):
         st.caption("장르 분석 결과가 없습니다.")
 
-    # =========================
-    # 3. 문체 분석
-    # =========================
-    st.markdown("---")
-    st.subheader("🖋️ 문체 분석")
 
+def render_style(result: dict):
     style = result.get("style") or result.get("style_result") or {}
 
     if style:
         for k, v in style.items():
+            if k in ("metrics", "repeated_phrases"):
+                continue
             value_text = format_value(v)
             if value_text:
                 st.write(f"- **{k}**: {value_text}")
+
+        # 로컬에서 계산한 문체 지표 요약
+        style_metrics = style.get("metrics") or {}
+        if style_metrics.get("chars"):
+            sentences = style_metrics["sentences"]
+            paragraphs = style_metrics["paragraphs"]
+            st.caption(
+                f"평균 문장 {sentences['mean']}자 · 긴 문장 {sentences['long_ratio']:.0%} · "
+                f"대사 비율 {style_metrics['dialogue']['ratio']:.0%} · "
+                f"문단당 {paragraphs['sentences_per_paragraph']}문장"
+            )
+
+        repeated = style.get("repeated_phrases") or []
+        if repeated:
+            st.write("- **반복 표현**: " + ", ".join(f"{r['phrase']} ({r['count']}회)" for r in repeated))
     else:
         st.caption("문체 분석 결과가 없습니다.")
 
-    # =========================
-    # 4. 종합 평가
-    # =========================
-    st.markdown("---")
-    st.subheader("📊 종합 평가")
 
+def render_evaluation(result: dict):
     evaluation = result.get("evaluation") or result.get("evaluation_result") or {}
 
     summary_eval = (
@@ -149,12 +159,8 @@ def render_result(result: dict):
     if not evaluation:
         st.caption("평가 결과가 없습니다.")
 
-    # =========================
-    # 5. 캐릭터 카드
-    # =========================
-    st.markdown("---")
-    st.subheader("👤 캐릭터 카드")
 
+def render_character_cards(result: dict):
     cards = result.get("character_cards") or []
 
     if cards:
@@ -178,27 +184,176 @@ def render_result(result: dict):
     else:
         st.caption("캐릭터 분석 결과가 없습니다.")
 
-    # =========================
-    # 6. 원본 JSON
-    # =========================
+
+# (상태 키, 제목, 출력 함수) - 화면에 표시되는 순서
+SECTIONS = [
+    ("summary", "✍️ 요약", render_summary),
+    ("genre", "🎭 장르 분석", render_genre),
+    ("style", "🖋️ 문체 분석", render_style),
+    ("evaluation", "📊 종합 평가", render_evaluation),
+    ("character_cards", "👤 캐릭터 카드", render_character_cards),
+]
+
+
+def render_raw_json(result: dict):
     st.markdown("---")
     with st.expander("🔍 원본 JSON 보기 (디버깅)"):
         st.json(result)
 
 
+def render_result(result: dict):
+    for _, title, render in SECTIONS:
+        st.markdown("---")
+        st.subheader(title)
+        render(result)
+
+    render_raw_json(result)
+
+
+# =========================
+# 진행 상황 스트리밍 실행
+# =========================
+NODE_LABELS = {
+    "text_type": "텍스트 형식 판별",
+    "summary": "요약",
+    "genre": "장르 분석",
+    "evaluation": "종합 평가",
+    "score_gate": "심화 분석 여부 판단",
+    "style": "문체 분석",
+    "characters": "캐릭터성 분석",
+    "character_cards": "캐릭터 카드",
+    "overview": "요약 + 장르 분석",
+    "deep": "문체 + 캐릭터 분석",
+}
+
+
+def _is_unknown(text_type) -> bool:
+    return bool(text_type) and text_type.get("type") == "unknown"
+
+
+def run_analysis_streaming(text: str, fused: bool, speculative: bool = False, series_id: str | None = None) -> dict:
+    """
+    파이프라인을 스트리밍으로 실행하면서 노드가 끝나는 즉시 해당 섹션을 그림
+    - 요약은 LLM이 생성하는 대로 글자 단위로 표시
+    - 모든 노드가 끝나면 최종 상태(dict) 반환
+    """
+    result = {"errors": []}
+    status = st.status("LangGraph AI Agent가 분석 중입니다...", expanded=False)
+    slots = {}
+    streamed = ""
+
+    def ensure_slots():
+        # 텍스트 형식 판별을 통과한 뒤에 결과 영역을 만듦
+        if slots:
+            return
+        st.header("3. 분석 결과")
+        for key, title, _ in SECTIONS:
+            st.markdown("---")
+            st.subheader(title)
+            slots[key] = st.empty()
+            slots[key].caption("분석 중...")
+
+    for kind, node, payload in stream_langgraph_pipeline(text, fused, speculative, series_id):
+        if kind == "token":
+            ensure_slots()
+            streamed += payload
+            slots["summary"].markdown(streamed + "▌")
+            continue
+        if kind == "metrics":
+            result["metrics"] = payload
+            continue
+        if kind == "retry":
+            status.write(f"🔁 {NODE_LABELS.get(node, node)} 재시도 ({payload}회차)")
+            if node == "summary":
+                streamed = ""
+            continue
+
+        for error in payload.get("errors") or []:
+            result["errors"].append(error)
+            status.write(f"⚠️ {NODE_LABELS.get(node, node)} 실패: {error['error']}")
+        result.update({k: v for k, v in payload.items() if k != "errors"})
+        if not payload.get("errors"):
+            status.write(f"✅ {NODE_LABELS.get(node, node)} 완료")
+
+        if node == "text_type" and _is_unknown(result.get("text_type")):
+            status.update(label="분석 중단", state="error")
+            return result
+
+        ensure_slots()
+        for key, _, render in SECTIONS:
+            if key in payload:
+                with slots[key].container():
+                    render(result)
+
+    # 점수 미달로 건너뛰었거나 실패한 섹션은 빈 결과 안내로 바꿈
+    ensure_slots()
+    for key, _, render in SECTIONS:
+        if result.get(key) is None:
+            with slots[key].container():
+                render(result)
+
+    status.update(label="분석 완료", state="complete")
+    render_raw_json(result)
+    return result
+
+
+# =========================
+# 세션 LRU 캐시
+# =========================
+def _session_lru(name: str) -> OrderedDict:
+    if name not in st.session_state:
+        st.session_state[name] = OrderedDict()
+    return st.session_state[name]
+
+
+def lru_get(name: str, key: str):
+    cache = _session_lru(name)
+    if key not in cache:
+        return None
+    cache.move_to_end(key)
+    return cache[key]
+
+
+def lru_put(name: str, key: str, value, max_size: int) -> None:
+    cache = _session_lru(name)
+    cache[key] = value
+    cache.move_to_end(key)
+    while len(cache) > max_size:
+        cache.popitem(last=False)
+
+
+def content_hash(*parts) -> str:
+    h = hashlib.sha256()
+    for part in parts:
+        h.update(part if isinstance(part, bytes) else str(part).encode("utf-8"))
+        h.update(b"\0")
+    return h.hexdigest()
+
+
 # =========================
 # 텍스트 로딩 함수
 # =========================
+def _parse_upload(data: bytes, suffix: str) -> str:
+    with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
+        tmp.write(data)
+        path = tmp.name
+    try:
+        return load_from_file(path)
+    finally:
+        os.remove(path)
+
+
 def load_text(uploaded_file, input_text):
     if uploaded_file:
+        # 같은 파일은 재실행마다 다시 파싱하지 않음
         suffix = os.path.splitext(uploaded_file.name)[1]
-        with tempfile.NamedTemporaryFile(delete=False, suffix=suffix) as tmp:
-            tmp.write(uploaded_file.getbuffer())
-            path = tmp.name
-        try:
-            return load_from_file(path)
-        finally:
-            os.remove(path)
+        data = uploaded_file.getvalue()
+        key = content_hash(suffix, data)
+        text = lru_get("parsed_uploads", key)
+        if text is None:
+            text = _parse_upload(data, suffix)
+            lru_put("parsed_uploads", key, text, PARSED_CACHE_SIZE)
+        return text
 
     if input_text.strip():
         return load_from_text_input(input_text)
@@ -211,6 +366,10 @@ def load_text(uploaded_file, input_text):
 # =========================
 st.set_page_config(page_title="Novel Reviewer", layout="wide")
 
+# METRICS_PORT가 설정되어 있으면 Prometheus 엔드포인트를 한 번만 띄움
+if METRICS_PORT:
+    start_metrics_server(METRICS_PORT)
+
 st.title("Novel Reviewer")
 st.caption("LangGraph 기반 웹소설 분석 AI Agent")
 
@@ -237,14 +396,40 @@ if not text:
 # 2. 분석 실행
 st.header("2. 분석 실행")
 
-if st.button("웹소설 종합 분석"):
-    with st.spinner("LangGraph AI Agent가 분석 중입니다..."):
-        result = run_langgraph_pipeline(text)
+fused = st.checkbox(
+    "빠른 분석 (여러 분석을 묶어서 호출)",
+    value=FUSED_MODE,
+    help="LLM 호출 수를 줄여 더 빠르고 저렴하게 분석합니다.",
+)
+speculative = st.checkbox(
+    "선행 분석 (다음 단계를 미리 시작)",
+    value=SPECULATIVE_MODE,
+    help="형식 판별 / 점수 평가를 기다리지 않고 다음 분석을 미리 시작해 더 빨리 끝납니다. "
+         "기준에 못 미치는 원고는 미리 시작한 호출만큼 비용이 더 듭니다.",
+)
+series_id = st.text_input(
+    "연재 ID (선택)",
+    help="같은 연재의 회차를 같은 ID로 올리면 캐릭터 카드가 누적되고, 새 회차는 바뀐 인물만 추출합니다.",
+).strip() or None
+
+# 같은 원고 + 같은 옵션의 결과는 세션에 남아 있어 재실행 시 LLM을 다시 호출하지 않음
+result_key = content_hash(text, fused, series_id)
+result = lru_get("analysis_results", result_key)
+streamed = False
 
+if st.button("웹소설 종합 분석"):
+    # 이전 실행이 실패했던 경우에만 다시 분석
+    if result is None or result.get("errors"):
+        # 노드가 끝날 때마다 결과가 바로 표시됨
+        result = run_analysis_streaming(text, fused, speculative, series_id)
+        lru_put("analysis_results", result_key, result, RESULT_CACHE_SIZE)
+        streamed = True
+
+if result is not None:
     # text_type 먼저 확인
     text_type = result.get("text_type")
 
-    if text_type and text_type.get("type") == "unknown":
+    if _is_unknown(text_type):
         # 이유 메시지 출력
         st.warning(
             text_type.get(
@@ -255,10 +440,7 @@ if st.button("웹소설 종합 분석"):
         # 아래 UI 전부 중단
         st.stop()
 
-    # 정상 분석일 때만
-    st.success("분석 완료")
-
-    # 3. 분석 결과
-    st.header("3. 분석 결과")
-    render_result(result)
-
+    # 스트리밍으로 이미 그린 경우가 아니면 저장된 결과를 바로 출력
+    if not streamed:
+        st.header("3. 분석 결과")
+        render_result(result)
@@ -0,0 +1,327 @@
+''' 벤치마크용 OpenAI 호환 가짜 서버
+    - POST /v1/chat/completions 만 지원 (stream=True 이면 SSE로 응답)
+    - 노드별 프롬프트를 알아보고 각 노드 스키마에 맞는 고정 JSON/텍스트 응답을 반환
+    - 응답 지연 = 기본 지연(로그정규분포) + 캐시되지 않은 프롬프트 토큰 prefill 시간 + 생성 토큰 / 초당 토큰
+    - 같은 prefix(마지막 메시지를 뺀 앞부분)가 다시 오면 cached_tokens를 채워 provider prefix cache를 흉내 냄
+    - error_rate 비율로 429 / 500을 섞어 재시도 경로도 측정 가능
+
+    단독 실행)
+        python -m benchmarks.fake_openai_server --port 8808 --latency-ms 400
+        OPENAI_BASE_URL=http://127.0.0.1:8808/v1 OPENAI_API_KEY=bench streamlit run app/app.py'''
+
+import argparse
+import hashlib
+import json
+import random
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# provider prefix cache 흉내: 이 토큰 수 이상일 때 128 토큰 단위로 적중
+PREFIX_CACHE_MIN_TOKENS = 1024
+PREFIX_CACHE_BLOCK = 128
+PREFIX_CACHE_ENTRIES = 10000
+
+DEFAULT_CONFIG = {
+    "latency_ms": 400.0,        # 기본 지연 중앙값
+    "latency_sigma": 0.25,      # 로그정규분포 sigma (0이면 고정 지연)
+    "tokens_per_sec": 100.0,    # 생성 속도 (0이면 생성 시간 없음)
+    "prefill_ms_per_1k": 20.0,  # 캐시되지 않은 프롬프트 1K 토큰당 처리 시간
+    "error_rate": 0.0,          # 429 / 500 응답 비율
+    "seed": 0,
+}
+
+
+def estimate_tokens(text: str) -> int:
+    # 한국어 원고 기준 대략 글자 2개당 1토큰
+    return max(1, len(text) // 2)
+
+
+# =========================
+# 노드별 고정 응답
+# =========================
+def _json(data) -> str:
+    return json.dumps(data, ensure_ascii=False)
+
+
+def canned_response(messages: list) -> str:
+    """마지막 메시지(작업 지시)를 보고 노드를 판별해 스키마에 맞는 응답 생성"""
+    prompt = messages[-1].get("content", "") if messages else ""
+    digest = hashlib.md5(prompt.encode("utf-8")).hexdigest()[:6]
+
+    if "원고의 일부분" in prompt:
+        return _json({
+            "summary": f"주인공 일행이 새로운 단서를 찾아 이동한다. ({digest})",
+            "characters": [
+                {"name": "서하윤", "observation": "위기 앞에서도 침착하게 판단한다."},
+                {"name": "강도현", "observation": "말수가 적지만 동료를 먼저 챙긴다."},
+            ],
+        })
+    if "두 가지 작업" in prompt:
+        return _json({
+            "summary": {
+                "full_summary": "몰락한 가문의 후계자가 잃어버린 힘을 되찾기 위해 여정을 떠난다. 동료들과 함께 음모의 실체에 다가간다.",
+                "keywords": ["회귀", "복수", "성장", "가문", "음모"],
+            },
+            "genre": {"주_장르": "판타지", "보조_장르": ["회귀", "복수"], "핵심_키워드": ["가문", "음모"], "장르_분류_신뢰도": 0.86},
+        })
+    if "세 가지 작업" in prompt:
+        return _json({
+            "style": {"스타일": ["3인칭 관찰 시점", "긴장감 있는 단문"], "강점": ["빠른 전개"], "약점": ["반복되는 감탄사"]},
+            "characters": {"character_consistency": 82, "character_depth": 74, "analysis_comment": "주요 인물의 동기가 일관된다.", "risk_points": []},
+            "character_cards": [
+                {"name": "서하윤", "role": "주인공", "personality_keywords": ["침착", "집요"], "core_traits": "목표를 위해 감정을 누른다.", "warning_point": "갑작스러운 감정 폭발 주의"},
+            ],
+        })
+    if "형식을 판별" in prompt:
+        return _json({"type": "novel_text", "confidence": 0.9, "reason": "서술과 대사가 섞인 소설 원문입니다."})
+    if "키워드 5~8개" in prompt:
+        return _json({"keywords": ["회귀", "복수", "성장", "가문", "음모"]})
+    if "부분별 요약" in prompt or "요약해 주세요" in prompt:
+        return "몰락한 가문의 후계자가 잃어버린 힘을 되찾기 위해 여정을 떠난다. 동료들과 함께 음모의 실체에 다가가며 자신의 과거와 마주한다."
+    if "장르 분석 전문가" in prompt:
+        return _json({"주_장르": "판타지", "보조_장르": ["회귀", "복수"], "핵심_키워드": ["가문", "음모"], "장르_분류_신뢰도": 0.86})
+    if "전문 평가 AI" in prompt:
+        return _json({
+            "시장성": {"점수": 82, "이유": "장르 내 인기 키워드를 잘 활용했다."},
+            "개연성": {"점수": 78, "이유": "사건 전개가 대체로 자연스럽다."},
+            "독창성": {"점수": 75, "이유": "익숙한 설정을 새롭게 조합했다."},
+            "종합_총평": "기초 완성도가 높은 원고입니다.",
+        })
+    if "문체 분석" in prompt:
+        return _json({"스타일": ["3인칭 관찰 시점", "긴장감 있는 단문"], "강점": ["빠른 전개"], "약점": ["반복되는 감탄사"]})
+    if "캐릭터 카드" in prompt:
+        return _json({"cards": [
+            {"name": "서하윤", "role": "주인공", "personality_keywords": ["침착", "집요"], "core_traits": "목표를 위해 감정을 누른다.", "warning_point": "갑작스러운 감정 폭발 주의"},
+            {"name": "강도현", "role": "조연", "personality_keywords": ["과묵", "헌신"], "core_traits": "주인공의 오랜 호위.", "warning_point": ""},
+        ]})
+    if "캐릭터 분석" in prompt:
+        return _json({"character_consistency": 82, "character_depth": 74, "analysis_comment": "주요 인물의 동기가 일관된다.", "risk_points": []})
+    return _json({})
+
+
+# =========================
+# 서버
+# =========================
+class FakeOpenAIServer:
+    """백그라운드 스레드에서 도는 OpenAI 호환 가짜 서버"""
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config):
+        self.config = dict(DEFAULT_CONFIG)
+        self.config.update(config)
+        self._lock = threading.Lock()
+        self._random = random.Random(self.config["seed"])
+        self._prefixes = {}
+        self._stats = {}
+        self.reset_stats()
+        self._httpd = ThreadingHTTPServer((host, port), self._handler_class())
+        self._httpd.daemon_threads = True
+        self._thread = None
+
+    @property
+    def base_url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}/v1"
+
+    def configure(self, **config) -> None:
+        with self._lock:
+            self.config.update(config)
+            if "seed" in config:
+                self._random.seed(config["seed"])
+
+    def reset_stats(self) -> None:
+        with self._lock:
+            self._stats = {"requests": 0, "errors": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+    def stats(self) -> dict:
+        with self._lock:
+            return dict(self._stats)
+
+    def start(self) -> "FakeOpenAIServer":
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-openai", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+    # ---------- 요청 처리 ----------
+    def _cached_tokens(self, messages: list) -> int:
+        if len(messages) < 2:
+            return 0
+        prefix = json.dumps(messages[:-1], ensure_ascii=False, sort_keys=True)
+        tokens = estimate_tokens(prefix)
+        if tokens < PREFIX_CACHE_MIN_TOKENS:
+            return 0
+        key = hashlib.sha256(prefix.encode("utf-8")).hexdigest()
+        with self._lock:
+            hit = key in self._prefixes
+            self._prefixes[key] = True
+            if len(self._prefixes) > PREFIX_CACHE_ENTRIES:
+                self._prefixes.pop(next(iter(self._prefixes)))
+        return (tokens // PREFIX_CACHE_BLOCK) * PREFIX_CACHE_BLOCK if hit else 0
+
+    def plan(self, body: dict):
+        """(상태 코드, 응답 본문, usage, 첫 토큰까지 지연, 생성 시간) 계산"""
+        messages = body.get("messages") or []
+        with self._lock:
+            config = dict(self.config)
+            roll = self._random.random()
+            jitter = self._random.lognormvariate(0, config["latency_sigma"]) if config["latency_sigma"] > 0 else 1.0
+
+        if roll < config["error_rate"]:
+            status = 429 if roll < config["error_rate"] / 2 else 500
+            with self._lock:
+                self._stats["errors"] += 1
+            return status, None, None, config["latency_ms"] / 1000 * jitter, 0.0
+
+        content = canned_response(messages)
+        prompt_tokens = estimate_tokens("".join(m.get("content", "") for m in messages))
+        cached = min(self._cached_tokens(messages), prompt_tokens)
+        completion_tokens = estimate_tokens(content)
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": completion_tokens,
+            "total_tokens": prompt_tokens + completion_tokens,
+            "prompt_tokens_details": {"cached_tokens": cached},
+        }
+
+        ttft = config["latency_ms"] / 1000 * jitter + (prompt_tokens - cached) / 1000 * config["prefill_ms_per_1k"] / 1000
+        generation = completion_tokens / config["tokens_per_sec"] if config["tokens_per_sec"] > 0 else 0.0
+
+        with self._lock:
+            self._stats["requests"] += 1
+            self._stats["prompt_tokens"] += prompt_tokens
+            self._stats["cached_tokens"] += cached
+            self._stats["completion_tokens"] += completion_tokens
+        return 200, content, usage, ttft, generation
+
+    def _handler_class(self):
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = "HTTP/1.1"
+            # 헤더와 본문을 따로 쓰므로 Nagle + delayed ACK로 응답마다 ~40ms가 붙지 않게 함
+            disable_nagle_algorithm = True
+
+            def log_message(self, format, *args):
+                pass
+
+            def handle_one_request(self):
+                # 클라이언트가 먼저 끊은 요청(취소된 hedge / 타임아웃)은 정상 상황으로 취급
+                try:
+                    super().handle_one_request()
+                except (BrokenPipeError, ConnectionResetError):
+                    self.close_connection = True
+
+            def _send_json(self, status: int, data: dict, headers: dict = None):
+                body = json.dumps(data, ensure_ascii=False).encode("utf-8")
+                self.send_response(status)
+                self.send_header("Content-Type", "application/json")
+                self.send_header("Content-Length", str(len(body)))
+                for k, v in (headers or {}).items():
+                    self.send_header(k, v)
+                self.end_headers()
+                self.wfile.write(body)
+
+            def do_POST(self):
+                length = int(self.headers.get("Content-Length") or 0)
+                body = json.loads(self.rfile.read(length) or b"{}")
+                if not self.path.rstrip("/").endswith("/chat/completions"):
+                    self._send_json(404, {"error": {"message": "not found"}})
+                    return
+
+                status, content, usage, ttft, generation = server.plan(body)
+                time.sleep(ttft)
+                if status != 200:
+                    kind = "rate_limit_exceeded" if status == 429 else "server_error"
+                    headers = {"retry-after": "0.05"} if status == 429 else {}
+                    self._send_json(status, {"error": {"message": "injected", "type": kind, "code": kind}}, headers)
+                    return
+
+                completion_id = "chatcmpl-" + uuid.uuid4().hex[:12]
+                model = body.get("model", "gpt-4o-mini")
+                if body.get("stream"):
+                    self._stream(completion_id, model, content, usage, generation, body)
+                    return
+
+                time.sleep(generation)
+                self._send_json(200, {
+                    "id": completion_id,
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": model,
+                    "choices": [{
+                        "index": 0,
+                        "message": {"role": "assistant", "content": content},
+                        "finish_reason": "stop",
+                    }],
+                    "usage": usage,
+                })
+
+            def _stream(self, completion_id, model, content, usage, generation, body):
+                self.send_response(200)
+                self.send_header("Content-Type", "text/event-stream")
+                self.send_header("Connection", "close")
+                self.end_headers()
+                self.close_connection = True
+
+                def send(choices, extra=None):
+                    chunk = {"id": completion_id, "object": "chat.completion.chunk", "created": int(time.time()),
+                             "model": model, "choices": choices}
+                    chunk.update(extra or {})
+                    self.wfile.write(f"data: {json.dumps(chunk, ensure_ascii=False)}\n\n".encode("utf-8"))
+                    self.wfile.flush()
+
+                pieces = [content[i:i + 8] for i in range(0, len(content), 8)] or [""]
+                delay = generation / len(pieces)
+                for piece in pieces:
+                    time.sleep(delay)
+                    send([{"index": 0, "delta": {"content": piece}, "finish_reason": None}])
+                send([{"index": 0, "delta": {}, "finish_reason": "stop"}])
+                if (body.get("stream_options") or {}).get("include_usage"):
+                    send([], {"usage": usage})
+                self.wfile.write(b"data: [DONE]\n\n")
+                self.wfile.flush()
+
+        return Handler
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="OpenAI 호환 가짜 서버")
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8808)
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULT_CONFIG["latency_sigma"])
+    parser.add_argument("--tokens-per-sec", type=float, default=DEFAULT_CONFIG["tokens_per_sec"])
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=DEFAULT_CONFIG["prefill_ms_per_1k"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"])
+    args = parser.parse_args(argv)
+
+    server = FakeOpenAIServer(
+        args.host, args.port,
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_sec=args.tokens_per_sec,
+        prefill_ms_per_1k=args.prefill_ms_per_1k,
+        error_rate=args.error_rate,
+    )
+    print(f"fake OpenAI server: {server.base_url}")
+    server.start()
+    try:
+        while True:
+            time.sleep(3600)
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == "__main__":
+    main()
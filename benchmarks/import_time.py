@@ -0,0 +1,91 @@
+''' 주요 모듈의 import 시간 / 부작용 점검
+    - 모듈마다 새 인터프리터에서 `python -X importtime -c "import 모듈"`을 여러 번 실행해 최솟값을 측정
+    - 예산(ms)을 넘거나, import만으로 무거운 의존성(langgraph, openai 등)이 로드되면 종료 코드 1
+    - OPENAI_API_KEY 없이 실행하므로 import 시점에 클라이언트를 만드는 코드가 생기면 바로 드러남
+
+    사용 예)
+        python -m benchmarks.import_time
+        python -m benchmarks.import_time --repeat 10 --scale 1.5'''
+
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 모듈별 import 시간 예산 (ms, 인터프리터 기동 시간 제외)
+IMPORT_BUDGET_MS = {
+    "utils.openai_client": 120,
+    "nodes.summary_node": 150,
+    "pipeline.langgraph_pipeline": 200,
+    "pipeline.batch": 220,
+}
+
+# import만으로는 로드되면 안 되는 무거운 의존성 (실제 호출 / 그래프 실행 시점에 로드)
+LAZY_MODULES = ("langgraph", "openai", "httpx", "pypdf", "tiktoken", "numpy")
+
+_PROBE = """
+import json, sys
+import {module}
+print(json.dumps([m for m in {lazy!r} if m in sys.modules]))
+"""
+
+
+def _clean_env() -> dict:
+    env = dict(os.environ)
+    env.pop("OPENAI_API_KEY", None)
+    env["PYTHONPATH"] = ROOT_DIR + os.pathsep + env.get("PYTHONPATH", "")
+    return env
+
+
+def measure_import(module: str, repeat: int) -> float:
+    """모듈 import 누적 시간 (ms, repeat회 중 최솟값)"""
+    best = None
+    for _ in range(repeat):
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+            cwd=ROOT_DIR, env=_clean_env(), capture_output=True, text=True, check=True,
+        )
+        # "import time: self [us] | cumulative | name" 중 최상위 모듈 줄의 누적값
+        cumulative = None
+        for line in proc.stderr.splitlines():
+            parts = line.split("|")
+            if len(parts) == 3 and parts[2].strip() == module:
+                cumulative = int(parts[1].strip())
+        elapsed = cumulative / 1000
+        best = elapsed if best is None else min(best, elapsed)
+    return best
+
+
+def eager_modules(module: str) -> list:
+    """모듈 import 후 이미 로드된 무거운 의존성 목록"""
+    proc = subprocess.run(
+        [sys.executable, "-c", _PROBE.format(module=module, lazy=LAZY_MODULES)],
+        cwd=ROOT_DIR, env=_clean_env(), capture_output=True, text=True, check=True,
+    )
+    return json.loads(proc.stdout.strip().splitlines()[-1])
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="주요 모듈 import 시간 예산 점검")
+    parser.add_argument("--repeat", type=int, default=5, help="모듈마다 측정할 횟수 (최솟값 사용)")
+    parser.add_argument("--scale", type=float, default=1.0, help="예산 배율 (느린 CI 머신용)")
+    args = parser.parse_args(argv)
+
+    failed = False
+    print(f"{'module':<32}{'import_ms':>10}{'budget_ms':>10}  eager")
+    for module, budget in IMPORT_BUDGET_MS.items():
+        elapsed = measure_import(module, args.repeat)
+        eager = eager_modules(module)
+        over = elapsed > budget * args.scale
+        failed = failed or over or bool(eager)
+        mark = "  ← 예산 초과" if over else ""
+        print(f"{module:<32}{elapsed:>10.1f}{budget * args.scale:>10.0f}  {', '.join(eager) or '-'}{mark}")
+
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
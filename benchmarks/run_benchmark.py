@@ -0,0 +1,266 @@
+''' 로컬 가짜 OpenAI 서버를 상대로 한 end-to-end 벤치마크
+    - 네트워크 / API 비용 없이 파이프라인 성능 회귀를 잡기 위한 도구
+    - 비교 대상
+        langgraph:   run_langgraph_pipeline (기본 그래프)
+        fused:       run_langgraph_pipeline(fused=True)
+        speculative: run_langgraph_pipeline(speculative=True) (게이트 결과를 기다리지 않고 다음 노드를 미리 실행)
+        legacy:      pipeline.pipeline.run_pipeline (순차 실행)
+    - 원고 크기 × 동시 실행 수 조합마다 처리량, p50/p95/p99 지연시간, 원고당 LLM 호출 수를 측정
+    - overhead: 지연 0인 서버로 같은 원고를 돌렸을 때의 p50 (그래프 / 파싱 / HTTP 등 파이프라인 자체 비용)
+    - --baseline으로 이전 --json 결과와 비교해 p95나 처리량이 허용치 이상 나빠지면 종료 코드 1
+
+    사용 예)
+        python -m benchmarks.run_benchmark
+        python -m benchmarks.run_benchmark --sizes 3000,60000 --concurrency 1,8 --runs 16 --json bench.json
+        python -m benchmarks.run_benchmark --json new.json --baseline bench.json --tolerance 0.2'''
+
+import argparse
+import json
+import os
+import random
+import sys
+import tempfile
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT_DIR not in sys.path:
+    sys.path.insert(0, ROOT_DIR)
+
+from benchmarks.fake_openai_server import DEFAULT_CONFIG, FakeOpenAIServer
+
+PIPELINES = ("langgraph", "fused", "speculative", "legacy")
+
+# =========================
+# 합성 원고
+# =========================
+_NAMES = ["서하윤", "강도현", "윤세린", "백무진", "한이설"]
+_PLACES = ["북부 성채", "폐허가 된 신전", "수도의 뒷골목", "얼어붙은 호수", "황실 도서관"]
+_ACTIONS = ["천천히 걸음을 옮겼다", "검을 고쳐 쥐었다", "낮게 숨을 내쉬었다", "고개를 들어 하늘을 보았다", "문고리를 조심스럽게 돌렸다"]
+_FEELINGS = ["불안이 밀려왔다", "심장이 빠르게 뛰었다", "오래된 기억이 떠올랐다", "묘한 안도감이 들었다", "분노가 치밀었다"]
+_LINES = ["이제 돌아갈 곳은 없어.", "끝까지 함께 가자.", "그 사람이 정말 배신했다고?", "아직 늦지 않았어.", "내가 먼저 가 볼게."]
+
+
+def make_manuscript(chars: int, seed: int) -> str:
+    """소설 원문처럼 보이는 합성 원고 (seed마다 내용이 달라 chunk / 응답 캐시가 재사용되지 않음)"""
+    rng = random.Random(seed)
+    parts = []
+    total = 0
+    episode = 0
+    next_episode_at = 0
+    while total < chars:
+        if total >= next_episode_at:
+            episode += 1
+            heading = f"제{episode}화"
+            parts.append(heading)
+            total += len(heading) + 2
+            next_episode_at += 5000
+
+        name = rng.choice(_NAMES)
+        sentences = [
+            f"{name}은 {rng.choice(_PLACES)}에서 {rng.choice(_ACTIONS)}.",
+            f"{rng.choice(_FEELINGS)}.",
+            f"\"{rng.choice(_LINES)}\" {rng.choice(_NAMES)}이 말했다.",
+            f"바람이 {rng.randint(2, 9)}번째로 창을 흔들었고, {name}은 대답 대신 {rng.choice(_ACTIONS)}.",
+            f"({seed}-{len(parts)})",
+        ]
+        paragraph = " ".join(sentences)
+        parts.append(paragraph)
+        total += len(paragraph) + 2
+    return "\n\n".join(parts)[:chars]
+
+
+# =========================
+# 실행
+# =========================
+def _runner(name: str):
+    # 환경 변수 설정이 끝난 뒤에 import (클라이언트 / 캐시 설정이 import 시점에 읽힘)
+    if name == "legacy":
+        from pipeline.pipeline import run_pipeline
+        return run_pipeline
+
+    from pipeline.langgraph_pipeline import run_langgraph_pipeline
+    fused = name == "fused"
+    speculative = name == "speculative"
+    return lambda text: run_langgraph_pipeline(text, fused=fused, speculative=speculative)
+
+
+def run_scenario(server: FakeOpenAIServer, pipeline: str, size: int, concurrency: int, runs: int, seed: int) -> dict:
+    from pipeline.batch import percentile
+
+    run = _runner(pipeline)
+    manuscripts = [make_manuscript(size, seed + i) for i in range(runs)]
+    latencies = []
+    failures = 0
+
+    def timed(text):
+        started = time.perf_counter()
+        result = run(text)
+        elapsed = time.perf_counter() - started
+        errors = result.get("errors") if isinstance(result, dict) else None
+        return elapsed, bool(errors)
+
+    server.reset_stats()
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(timed, text) for text in manuscripts]
+        for future in futures:
+            try:
+                elapsed, failed = future.result()
+            except Exception:
+                failures += 1
+                continue
+            latencies.append(elapsed)
+            failures += failed
+    wall_time = time.perf_counter() - started
+    stats = server.stats()
+
+    return {
+        "pipeline": pipeline,
+        "size": size,
+        "concurrency": concurrency,
+        "runs": runs,
+        "failures": failures,
+        "wall_time": round(wall_time, 4),
+        "throughput": round(len(latencies) / wall_time, 4) if wall_time > 0 else 0.0,
+        "p50": round(percentile(latencies, 50), 4),
+        "p95": round(percentile(latencies, 95), 4),
+        "p99": round(percentile(latencies, 99), 4),
+        "llm_calls_per_run": round(stats["requests"] / runs, 2),
+        "cached_token_ratio": round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0,
+    }
+
+
+def measure_overhead(server: FakeOpenAIServer, pipeline: str, size: int, runs: int, seed: int) -> float:
+    """지연 0인 서버에서의 p50 = 파이프라인 자체 비용"""
+    saved = dict(server.config)
+    server.configure(latency_ms=0.0, latency_sigma=0.0, tokens_per_sec=0.0, prefill_ms_per_1k=0.0, error_rate=0.0)
+    try:
+        return run_scenario(server, pipeline, size, 1, runs, seed)["p50"]
+    finally:
+        server.configure(**saved)
+
+
+# =========================
+# 보고 / 회귀 비교
+# =========================
+def format_table(rows: list) -> str:
+    header = f"{'pipeline':<10}{'size':>9}{'conc':>6}{'runs':>6}{'fail':>6}{'thru/s':>9}{'p50':>8}{'p95':>8}{'p99':>8}{'calls':>7}{'cached':>8}{'ovh_ms':>8}"
+    lines = [header, "-" * len(header)]
+    for r in rows:
+        overhead = r.get("overhead")
+        lines.append(
+            f"{r['pipeline']:<10}{r['size']:>9}{r['concurrency']:>6}{r['runs']:>6}{r['failures']:>6}"
+            f"{r['throughput']:>9.2f}{r['p50']:>8.2f}{r['p95']:>8.2f}{r['p99']:>8.2f}"
+            f"{r['llm_calls_per_run']:>7.1f}{r['cached_token_ratio']:>8.2f}"
+            + (f"{overhead * 1000:>8.1f}" if overhead is not None else f"{'-':>8}")
+        )
+    return "\n".join(lines)
+
+
+def _key(row: dict):
+    return (row["pipeline"], row["size"], row["concurrency"])
+
+
+def compare_with_baseline(rows: list, baseline: list, tolerance: float) -> list:
+    """p95가 (1 + tolerance)배를 넘거나 처리량이 (1 - tolerance)배 아래로 떨어진 조합 목록"""
+    previous = {_key(r): r for r in baseline}
+    regressions = []
+    for row in rows:
+        old = previous.get(_key(row))
+        if old is None:
+            continue
+        if old["p95"] > 0 and row["p95"] > old["p95"] * (1 + tolerance):
+            regressions.append(f"{_key(row)} p95 {old['p95']:.3f}s → {row['p95']:.3f}s")
+        if old["throughput"] > 0 and row["throughput"] < old["throughput"] * (1 - tolerance):
+            regressions.append(f"{_key(row)} throughput {old['throughput']:.3f} → {row['throughput']:.3f}/s")
+        if row["failures"] > old["failures"]:
+            regressions.append(f"{_key(row)} failures {old['failures']} → {row['failures']}")
+    return regressions
+
+
+def _int_list(value: str) -> list:
+    return [int(v) for v in value.split(",") if v.strip()]
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description="가짜 OpenAI 서버 기반 파이프라인 벤치마크")
+    parser.add_argument("--pipelines", default=",".join(PIPELINES), help="쉼표 구분 (langgraph, fused, speculative, legacy)")
+    parser.add_argument("--sizes", type=_int_list, default=[3000, 30000, 120000], help="원고 글자 수 (쉼표 구분)")
+    parser.add_argument("--concurrency", type=_int_list, default=[1, 8], help="동시 실행 원고 수 (쉼표 구분)")
+    parser.add_argument("--runs", type=int, default=8, help="조합마다 실행할 원고 수")
+    parser.add_argument("--latency-ms", type=float, default=DEFAULT_CONFIG["latency_ms"])
+    parser.add_argument("--latency-sigma", type=float, default=DEFAULT_CONFIG["latency_sigma"])
+    parser.add_argument("--tokens-per-sec", type=float, default=DEFAULT_CONFIG["tokens_per_sec"])
+    parser.add_argument("--prefill-ms-per-1k", type=float, default=DEFAULT_CONFIG["prefill_ms_per_1k"])
+    parser.add_argument("--error-rate", type=float, default=DEFAULT_CONFIG["error_rate"])
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--no-overhead", action="store_true", help="지연 0 서버로 overhead 측정하지 않음")
+    parser.add_argument("--json", help="결과를 저장할 JSON 파일")
+    parser.add_argument("--baseline", help="비교할 이전 --json 결과")
+    parser.add_argument("--tolerance", type=float, default=0.2, help="회귀로 판단할 허용 비율")
+    args = parser.parse_args(argv)
+
+    pipelines = [p.strip() for p in args.pipelines.split(",") if p.strip()]
+    unknown = set(pipelines) - set(PIPELINES)
+    if unknown:
+        parser.error(f"알 수 없는 파이프라인: {', '.join(sorted(unknown))}")
+
+    server = FakeOpenAIServer(
+        latency_ms=args.latency_ms,
+        latency_sigma=args.latency_sigma,
+        tokens_per_sec=args.tokens_per_sec,
+        prefill_ms_per_1k=args.prefill_ms_per_1k,
+        error_rate=args.error_rate,
+        seed=args.seed,
+    ).start()
+
+    # 실제 API / 로컬 캐시를 쓰지 않도록 import 전에 설정
+    work_dir = tempfile.mkdtemp(prefix="novel-reviewer-bench-")
+    os.environ["OPENAI_BASE_URL"] = server.base_url
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["LLM_CACHE_DISABLED"] = "1"
+    os.environ["CHUNK_STORE_PATH"] = os.path.join(work_dir, "chunk_store.sqlite3")
+    os.environ.setdefault("OPENAI_RPM_LIMIT", "100000")
+    os.environ.setdefault("OPENAI_TPM_LIMIT", "100000000")
+    os.environ.setdefault("OPENAI_INITIAL_CONCURRENCY", "32")
+
+    rows = []
+    seed = args.seed * 1_000_000
+    try:
+        for pipeline in pipelines:
+            for size in args.sizes:
+                overhead = None
+                if not args.no_overhead:
+                    seed += args.runs
+                    overhead = measure_overhead(server, pipeline, size, max(2, args.runs // 2), seed)
+                for concurrency in args.concurrency:
+                    seed += args.runs
+                    row = run_scenario(server, pipeline, size, concurrency, args.runs, seed)
+                    row["overhead"] = overhead
+                    rows.append(row)
+                    print(format_table([row]).splitlines()[-1], flush=True)
+    finally:
+        server.stop()
+
+    print()
+    print(format_table(rows))
+
+    if args.json:
+        with open(args.json, "w", encoding="utf-8") as f:
+            json.dump({"config": vars(args), "results": rows}, f, ensure_ascii=False, indent=2)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)["results"]
+        regressions = compare_with_baseline(rows, baseline, args.tolerance)
+        if regressions:
+            print("\n=== 성능 회귀 ===")
+            print("\n".join(regressions))
+            return 1
+        print("\n회귀 없음")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,11 +1,20 @@
 # 파이프라인 전체 테스트용 파일
+#   python main.py                      -> 샘플 텍스트로 기존 파이프라인 실행
+#   python main.py <디렉터리|.jsonl> ...  -> 배치 분석 (pipeline/batch.py 참고)
+
+import sys
 
 from dotenv import load_dotenv
 load_dotenv()
 
-from pipeline import run_pipeline
+from pipeline.pipeline import run_pipeline
 
 if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        from pipeline.batch import main as batch_main
+        batch_main(sys.argv[1:])
+        sys.exit(0)
+
     # 간단한 테스트용 텍스트
     sample_text = """
     정령의 힘을 숨긴 채 살아가던 루아는
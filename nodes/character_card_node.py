@@ -1,23 +1,49 @@
 # 원고내 등장하는 주요 캐릭터들의 설정을 뽑아내는 노드
+# 긴 원고는 캐릭터성 분석 노드와 같은 인물별 발췌를 보냄 (같은 prefix라 provider 캐시도 공유)
+# series_id가 있으면 연재별 카드 저장소(utils.character_store)를 사용
+#   - 첫 회차: 평소처럼 전체 카드를 추출해 저장
+#   - 다음 회차: 처음 보는 chunk만 보내 새 인물 / 바뀐 특성만 받고 저장된 카드에 합침
+#     (프롬프트에는 그 chunk에 등장하는 인물의 카드만 넣으므로 카드가 늘어도 프롬프트는 일정)
+#   - 추출(prepare_character_cards)과 저장(save_series_cards)을 나눔
+#     (그래프는 게이트를 통과해 결과가 채택된 뒤에만 저장 → 폐기된 추측 실행은 저장소를 바꾸지 않음)
 
+import asyncio
 from typing import List, Dict
-from utils.openai_client import get_client
+from utils.character_index import build_character_context
+from utils.character_store import get_character_store, merge_cards
+from utils.chunk_store import chunk_hash
+from utils.text_utils import chunk_paragraphs
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    STRING, STRING_LIST, array_schema, astructured_completion, is_failure, object_schema, structured_completion,
+)
+from nodes.character_node import character_context_note, format_character_observations
 
-def extract_character_cards(text: str) -> str:
-    """
-    주요 캐릭터 카드 추출 노드
-    - 등장인물 식별
-    - 각 캐릭터의 성격, 역할, 특징 정리
-    
-    Returns:
-        JSON 형식의 문자열 (List[Dict] 형태)
-    """
-    client = get_client()
-    prompt = f"""
+# 캐릭터 카드 한 장
+CHARACTER_CARD_SCHEMA = object_schema({
+    "name": STRING,
+    "role": STRING,
+    "personality_keywords": STRING_LIST,
+    "core_traits": STRING,
+    "warning_point": STRING,
+})
+# 구조화 출력은 최상위가 object여야 하므로 카드 배열을 "cards"로 감쌈
+CHARACTER_CARDS_SCHEMA = object_schema({"cards": array_schema(CHARACTER_CARD_SCHEMA)})
+
+# 연재 원고에서 이미 읽은 부분을 가려내는 chunk 크기 (회차 제목 / 문단 내용 기준 경계)
+CARD_CHUNK_CHARS = 6000
+# delta 추출에 함께 보내는 저장된 카드 수 (새 부분에 많이 등장하는 인물 순)
+MAX_KNOWN_CARDS = 8
+
+
+def _build_messages(text: str, character_observations: List[Dict] | None = None, context: tuple = None) -> list:
+    # 인물별 발췌가 앞, 분석 지시가 뒤 (인물 관찰은 실행마다 달라지므로 지시 쪽에 둠)
+    label, body = context or build_character_context(text)
+    instructions = f"""
 당신은 웹소설 캐릭터 카드 생성 전문 AI입니다.
-아래 소설 원문을 읽고, 주요 캐릭터들을 카드 형태로 정리하세요.
+앞의 소설 원문을 읽고, 주요 캐릭터들을 카드 형태로 정리하세요.
 주인공, 조연, 적대자로 구분하세요.
-
+{character_context_note(label)}
 [지침]
 
 - 중요도가 낮은 단역은 제외하세요.
@@ -27,39 +53,232 @@ def extract_character_cards(text: str) -> str:
 - 말투, 성격, 버릇은 텍스트에 보이는 것으로 작성하세요.
 - 확인되지 않는 정보는 '확인 불가' 또는 '미상'으로 작성하세요.
 
+{format_character_observations(character_observations)}
 ---
 
-[소설 원문]
-{text}
+[출력 형식]
+
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{{
+  "cards": [
+    {{
+      "name": "캐릭터 이름",
+      "role": "주인공",
+      "personality_keywords": ["성격 키워드 1", "성격 키워드 2", "성격 키워드 3"],
+      "core_traits": "캐릭터의 핵심 특징을 요약한 2~3문장 설명",
+      "warning_point": "캐릭터성 유지 시 주의할 점"
+    }},
+    {{
+      "name": "캐릭터 이름 2",
+      "role": "조연",
+      "personality_keywords": ["키워드1", "키워드2"],
+      "core_traits": "설명",
+      "warning_point": "주의점 (없으면 빈 문자열)"
+    }}
+  ]
+}}
+"""
+    return build_manuscript_messages(body, instructions, label=label)
+
 
+def _mentions(name: str, text: str) -> int:
+    # 성을 뺀 이름("도현")으로만 불리는 경우도 셈
+    count = text.count(name)
+    if len(name) == 3:
+        count = max(count, text.count(name[1:]))
+    return count
+
+
+def _mentioned(entries: List[Dict], text: str, limit: int) -> List[Dict]:
+    """text에 등장하는 인물 항목만 등장 횟수 순으로 limit개"""
+    counted = [(_mentions(e["name"], text), i) for i, e in enumerate(entries or []) if e.get("name")]
+    counted = sorted((c for c in counted if c[0]), key=lambda c: -c[0])[:limit]
+    return [entries[i] for _, i in counted]
+
+
+def format_known_cards(cards: List[Dict], total: int) -> str:
+    """delta 추출 프롬프트에 넣는 저장된 카드 (새 부분에 등장하는 인물만)"""
+    if not cards:
+        return f"\n[저장된 캐릭터 카드: {total}장 중 새 원고에 등장하는 인물 없음]\n"
+    lines = [f"\n[저장된 캐릭터 카드: {total}장 중 새 원고에 등장하는 인물]"]
+    for c in cards:
+        keywords = ", ".join(c.get("personality_keywords") or [])
+        lines.append(f"- {c['name']} ({c.get('role', '미상')}) 성격: {keywords} / 특징: {c.get('core_traits', '')}")
+    return "\n".join(lines) + "\n"
+
+
+def _build_delta_messages(
+    text: str,
+    known_cards: List[Dict],
+    total: int,
+    character_observations: List[Dict] | None = None,
+    context: tuple = None,
+) -> list:
+    # 새로 올라온 부분(또는 그 인물별 발췌)이 앞, 저장된 카드와 지시가 뒤
+    label, body = context or build_character_context(text)
+    instructions = f"""
+당신은 웹소설 캐릭터 카드 생성 전문 AI입니다.
+앞의 원고는 이미 캐릭터 카드를 만든 연재의 새 회차(처음 분석하는 부분)입니다.
+아래 저장된 카드와 비교해 바뀐 부분만 카드로 반환하세요.
+{character_context_note(label)}{format_known_cards(known_cards, total)}
+[지침]
+
+- 새 원고에서 처음 등장한 주요 인물은 새 카드를 만드세요. 주인공, 조연, 적대자로 구분하세요.
+- 저장된 인물 중 새 원고에서 역할, 성격, 특징이 바뀌었거나 새로 드러난 인물만 갱신 카드를 만드세요.
+  갱신 카드의 name은 저장된 이름을 그대로 쓰고, core_traits는 저장된 특징에 새 내용을 반영한 전체 설명으로 작성하세요.
+- 변화가 없는 인물, 중요도가 낮은 단역은 포함하지 마세요. 바뀐 인물이 없으면 빈 배열을 반환하세요.
+- 추측은 최소화하고, 텍스트에 드러난 정보 위주로 작성하세요.
+- 새 원고에서 확인되지 않는 항목은 '확인 불가'로 작성하세요 (저장된 값이 유지됩니다).
+
+{format_character_observations(character_observations)}
 ---
 
 [출력 형식]
 
-반드시 아래 JSON 배열 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
-
-[
-  {{
-    "name": "캐릭터 이름",
-    "role": "주인공",
-    "personality_keywords": ["성격 키워드 1", "성격 키워드 2", "성격 키워드 3"],
-    "core_traits": "캐릭터의 핵심 특징을 요약한 2~3문장 설명",
-    "warning_point": "캐릭터성 유지 시 주의할 점"
-  }},
-  {{
-    "name": "캐릭터 이름 2",
-    "role": "조연",
-    "personality_keywords": ["키워드1", "키워드2"],
-    "core_traits": "설명",
-    "warning_point": "주의점 (없으면 빈 문자열)"
-  }}
-]
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{{
+  "cards": [
+    {{
+      "name": "캐릭터 이름",
+      "role": "조연",
+      "personality_keywords": ["키워드1", "키워드2"],
+      "core_traits": "설명",
+      "warning_point": "주의점 (없으면 빈 문자열)"
+    }}
+  ]
+}}
 """
+    return build_manuscript_messages(body, instructions, label=label)
+
+
+def _cards_result(result: Dict):
+    # 상태(character_cards)에는 기존처럼 카드 배열을 저장 (실패하면 parse_error dict 그대로)
+    return result if is_failure(result) else result["cards"]
+
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
+# =========================
+# 연재별 카드 저장소
+# =========================
+def _series_delta(series_id: str, text: str):
+    """
+    (이미 카드를 추출한 연재인지, 저장된 카드, 원고 chunk 해시, 처음 보는 chunk를 이은 원고)
+    - 첫 회차에서 카드가 0장이어도 chunk 기록이 있으면 다음 회차부터는 delta 추출
+    """
+    store = get_character_store()
+    chunks = chunk_paragraphs(text, CARD_CHUNK_CHARS)
+    hashes = [chunk_hash(c) for c in chunks]
+    seen = store.seen_chunks(series_id, hashes)
+    delta = "\n\n".join(c for c, h in zip(chunks, hashes) if h not in seen)
+    return store.has_series(series_id), store.get_cards(series_id), hashes, delta
+
+
+def _pending_update(series_id: str, stored: List[Dict], updates: List[Dict], hashes: List[str]) -> Dict:
+    # 저장소에 아직 쓰지 않은 변경분 (save_series_cards로 저장)
+    return {"series_id": series_id, "stored": stored, "updates": updates, "hashes": hashes}
+
+
+def save_series_cards(pending: Dict) -> List[Dict]:
+    """변경분을 저장된 카드에 합쳐 저장하고 합친 전체 카드 반환"""
+    merged, changed = merge_cards(pending["stored"], pending["updates"])
+    get_character_store().save(pending["series_id"], changed, pending["hashes"])
+    return merged
+
+
+def series_cards_update(series_id: str, text: str, cards: List[Dict]) -> Dict:
+    """
+    다른 경로(fused 모드의 deep 호출)에서 추출한 카드의 저장소 변경분 (저장소는 읽기만 함)
+    - 저장하면 원고의 chunk는 모두 반영한 것으로 기록 (다음 회차의 카드 노드는 새 부분만 읽음)
+    """
+    _, stored, hashes, _ = _series_delta(series_id, text)
+    return _pending_update(series_id, stored, cards, hashes)
+
+
+def _delta_messages(stored, delta, character_observations, context=None) -> list:
+    known = _mentioned(stored, delta, MAX_KNOWN_CARDS)
+    observations = _mentioned(character_observations, delta, MAX_KNOWN_CARDS)
+    return _build_delta_messages(delta, known, len(stored), observations, context)
+
+
+def prepare_character_cards(
+    text: str,
+    character_observations: List[Dict] | None = None,
+    series_id: str | None = None,
+) -> tuple:
+    """
+    카드 추출만 하고 저장소에는 쓰지 않음
+    Returns:
+        (카드 목록 또는 parse_error dict, 저장할 변경분 또는 None)
+        - series_id가 없거나 추출에 실패했거나 새로 읽은 부분이 없으면 변경분은 None
+    """
+    if not series_id:
+        messages = _build_messages(text, character_observations)
+        result = structured_completion(messages, "character_cards", CHARACTER_CARDS_SCHEMA, temperature=0.3)
+        return _cards_result(result), None
+
+    known, stored, hashes, delta = _series_delta(series_id, text)
+    if known and not delta:
+        return stored, None
+    if known:
+        messages = _delta_messages(stored, delta, character_observations)
+    else:
+        messages = _build_messages(text, character_observations)
+    cards = _cards_result(structured_completion(messages, "character_cards", CHARACTER_CARDS_SCHEMA, temperature=0.3))
+    if is_failure(cards):
+        return cards, None
+    return cards, _pending_update(series_id, stored, cards, hashes)
+
+
+async def aprepare_character_cards(
+    text: str,
+    character_observations: List[Dict] | None = None,
+    series_id: str | None = None,
+) -> tuple:
+    """prepare_character_cards의 비동기 버전 (추측 실행 중에도 저장소를 바꾸지 않음)"""
+    known = False
+    if series_id:
+        known, stored, hashes, delta = await asyncio.to_thread(_series_delta, series_id, text)
+        if known and not delta:
+            return stored, None
+
+    if known:
+        context = await asyncio.to_thread(build_character_context, delta)
+        messages = _delta_messages(stored, delta, character_observations, context)
+    else:
+        context = await asyncio.to_thread(build_character_context, text)
+        messages = _build_messages(text, character_observations, context)
+    cards = _cards_result(
+        await astructured_completion(messages, "character_cards", CHARACTER_CARDS_SCHEMA, temperature=0.3)
     )
+    if not series_id or is_failure(cards):
+        return cards, None
+    return cards, _pending_update(series_id, stored, cards, hashes)
+
+
+def extract_character_cards(
+    text: str,
+    character_observations: List[Dict] | None = None,
+    series_id: str | None = None,
+) -> list | dict:
+    """
+    주요 캐릭터 카드 추출 노드
+    - 등장인물 식별
+    - 각 캐릭터의 성격, 역할, 특징 정리
+    - series_id가 있으면 저장된 카드에 새 부분의 변화만 합침 (읽은 적 없는 부분이 없으면 LLM 호출 없음)
+    
+    Returns:
+        캐릭터 카드 목록 (List[Dict], 형식 오류가 끝내 고쳐지지 않으면 parse_error dict)
+    """
+    cards, pending = prepare_character_cards(text, character_observations, series_id)
+    return save_series_cards(pending) if pending else cards
+
 
-    return response.choices[0].message.content
\ No newline at end of file
+async def aextract_character_cards(
+    text: str,
+    character_observations: List[Dict] | None = None,
+    series_id: str | None = None,
+) -> list | dict:
+    """extract_character_cards의 비동기 버전"""
+    cards, pending = await aprepare_character_cards(text, character_observations, series_id)
+    return await asyncio.to_thread(save_series_cards, pending) if pending else cards
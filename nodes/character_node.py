@@ -1,21 +1,53 @@
 # 이야기가 진행되면서 캐릭터별 캐릭터의 특징이 변화 없는지 평가하는 노드
+# 긴 원고는 원고 앞부분 대신 인물 색인(utils.character_index)으로 고른 주요 인물별 발췌를 보냄
 
-from typing import Dict
-from utils.openai_client import get_client
+import asyncio
+from typing import Dict, List
+from utils.character_index import build_character_context
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    SCORE, STRING, STRING_LIST, astructured_completion, object_schema, structured_completion,
+)
 
-def analyze_characters(text: str) -> Dict:
+# 캐릭터성 분석 응답 스키마
+CHARACTERS_SCHEMA = object_schema({
+    "character_consistency": SCORE,
+    "character_depth": SCORE,
+    "analysis_comment": STRING,
+    "risk_points": STRING_LIST,
+})
+
+
+def format_character_observations(observations: List[Dict] | None) -> str:
     """
-    캐릭터성 유지 여부 분석 노드
-    - 성격/태도 일관성
-    - 행동과 동기의 연결성
-    - 말투/행동 톤 유지
+    summary_node가 원고 전체 chunk에서 모은 인물 관찰을 프롬프트용 텍스트로 정리
+    (긴 원고는 앞부분만 전달되므로 뒷부분의 인물 변화는 이 정보로 보완)
     """
-    
-    client = get_client()
-    prompt = f"""
-당신은 웹소설 캐릭터 분석 전문 AI입니다.
-아래 기준에 따라 소설 속 주요 캐릭터의 '캐릭터성 유지 여부'를 평가하세요.
+    if not observations:
+        return ""
+    lines = []
+    for entry in observations:
+        lines.append(f"- {entry['name']} (등장 {entry['mentions']}회): " + " / ".join(entry["observations"]))
+    return "\n[원고 전체에서 관찰된 인물 정보]\n" + "\n".join(lines) + "\n"
+
+
+def character_context_note(label: str) -> str:
+    """인물별 발췌를 보낼 때 지시문에 덧붙이는 안내 (원고 전체를 보내면 빈 문자열)"""
+    if label != "인물별 발췌":
+        return ""
+    return (
+        "\n앞의 원고는 전체가 아니라 인물 색인으로 고른 주요 인물별 발췌입니다. "
+        "인물 목록의 언급 횟수와 발췌의 문단 번호(원고 내 위치)로 이야기 전체의 흐름을 가늠하세요.\n"
+    )
+
 
+def _build_messages(text: str, character_observations: List[Dict] | None = None, context: tuple = None) -> list:
+    # 인물별 발췌가 앞, 분석 지시가 뒤 (인물 관찰은 실행마다 달라지므로 지시 쪽에 둠)
+    label, body = context or build_character_context(text)
+    instructions = f"""
+당신은 웹소설 캐릭터 분석 전문 AI입니다.
+아래 기준에 따라 앞의 소설 속 주요 캐릭터의 '캐릭터성 유지 여부'를 평가하세요.
+{character_context_note(label)}
 [평가 기준]
 
 1. 캐릭터 일관성 (0~100점)
@@ -32,11 +64,7 @@ def analyze_characters(text: str) -> Dict:
 - 주요 행동이 이전 상황 및 감정과 논리적으로 연결되는지
 - 갑작스러운 선택이나 설명 없는 행동이 있는지
 
----
-
-[소설 원문]
-{text}
-
+{format_character_observations(character_observations)}
 ---
 
 [출력 형식]
@@ -52,11 +80,23 @@ def analyze_characters(text: str) -> Dict:
 
 risk_points는 문제가 없으면 빈 배열 []로 반환하세요.
 """
+    return build_manuscript_messages(body, instructions, label=label)
+
+
+def analyze_characters(text: str, character_observations: List[Dict] | None = None) -> Dict:
+    """
+    캐릭터성 유지 여부 분석 노드
+    - 성격/태도 일관성
+    - 행동과 동기의 연결성
+    - 말투/행동 톤 유지
+    """
+    messages = _build_messages(text, character_observations)
+    return structured_completion(messages, "characters", CHARACTERS_SCHEMA, temperature=0.3)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-    )
 
-    return response.choices[0].message.content
\ No newline at end of file
+async def aanalyze_characters(text: str, character_observations: List[Dict] | None = None) -> Dict:
+    """analyze_characters의 비동기 버전"""
+    # 긴 원고의 인물 색인은 수백 ms 걸리므로 스레드에서 만듦
+    context = await asyncio.to_thread(build_character_context, text)
+    messages = _build_messages(text, character_observations, context)
+    return await astructured_completion(messages, "characters", CHARACTERS_SCHEMA, temperature=0.3)
@@ -4,44 +4,88 @@
 독창성 - 시중에 널린 스토리, 키워드 뿐만 아니라 이 원고만의 차별점이 있는지 평가'''
 
 
+import asyncio
 from typing import Dict
-import json
-from utils.openai_client import get_client
-
-def evaluate_story(text: str, genre_info: Dict) -> Dict:
-    """
-    소설 평가 노드
-    입력:
-      - text: 원문
-      - genre_info: genre_node 결과(dict 또는 JSON 문자열)
-    출력:
-      - 평가 점수 + 코멘트(dict)
-    """
-    
-    client = get_client()
-    
+from utils.passage_sampler import SAMPLE_TOKENS, sample_passages
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    SCORE, STRING, astructured_completion, extract_json, object_schema, structured_completion,
+)
+
+# 평가에 전달하는 발췌 토큰 예산 (원고 길이와 무관하게 고정)
+EVALUATION_SAMPLE_TOKENS = SAMPLE_TOKENS
+
+_CRITERION_SCHEMA = object_schema({"점수": SCORE, "이유": STRING})
+# 평가 응답 스키마 (score_gate가 각 항목의 "점수"를 읽음)
+EVALUATION_SCHEMA = object_schema({
+    "시장성": _CRITERION_SCHEMA,
+    "개연성": _CRITERION_SCHEMA,
+    "독창성": _CRITERION_SCHEMA,
+    "종합_총평": STRING,
+})
+
+
+def _genre_dict(genre_info) -> Dict:
     # genre_info가 문자열이면 파싱 시도
     if isinstance(genre_info, str):
-        try:
-            genre_dict = json.loads(genre_info.strip().strip('`').replace('json', '', 1).strip())
-        except:
+        genre_dict, _ = extract_json(genre_info)
+        if not isinstance(genre_dict, dict):
             genre_dict = {"주_장르": "미상", "보조_장르": [], "핵심_키워드": []}
-    else:
-        genre_dict = genre_info or {}
-    
+        return genre_dict
+    return genre_info or {}
+
+
+def _full_summary(summary_result) -> str:
+    if isinstance(summary_result, dict):
+        return summary_result.get("full_summary") or ""
+    return summary_result or ""
+
+
+def build_evaluation_sample(text: str, genre_info, summary_result=None) -> tuple:
+    """
+    평가에 보낼 (라벨, 본문): 도입 / 전개 구간별 / 결말 발췌
+    - 전개 구간의 발췌는 장르 / 요약 키워드와 줄거리 요약에 가까운 장면(BM25)으로 고름
+    """
+    genre_dict = _genre_dict(genre_info)
+    keywords = [
+        genre_dict.get("주_장르") or genre_dict.get("main_genre") or "",
+        *(genre_dict.get("보조_장르") or genre_dict.get("sub_genres") or []),
+        *(genre_dict.get("핵심_키워드") or genre_dict.get("keywords") or []),
+    ]
+    if isinstance(summary_result, dict):
+        keywords += summary_result.get("keywords") or []
+    return sample_passages(
+        text, [k for k in keywords if isinstance(k, str)], _full_summary(summary_result), EVALUATION_SAMPLE_TOKENS,
+    )
+
+
+def _build_messages(text: str, genre_info: Dict, summary_result=None, sample=None) -> list:
+    genre_dict = _genre_dict(genre_info)
+
     # 장르 정보를 읽기 쉽게 정리
     main_genre = genre_dict.get("주_장르") or genre_dict.get("main_genre", "미상")
     sub_genres = genre_dict.get("보조_장르") or genre_dict.get("sub_genres", [])
     keywords = genre_dict.get("핵심_키워드") or genre_dict.get("keywords", [])
-    
+
+    label, body = sample or build_evaluation_sample(text, genre_info, summary_result)
+    full_summary = _full_summary(summary_result)
+    if label == "소설 원문":
+        reading = "앞의 소설 원문을 읽고 평가하세요."
+    else:
+        reading = "앞의 원고 발췌(도입, 전개 구간별 주요 장면, 결말 순서이며 [...]는 생략된 부분)"
+        reading += "와\n아래 줄거리 요약을 함께 읽고" if full_summary else "를 읽고"
+        reading += " 이야기 전체를 기준으로 평가하세요."
+    story_summary = f"\n[줄거리 요약]\n{full_summary}\n---\n" if full_summary else ""
+
     genre_summary = f"""
 주 장르: {main_genre}
 보조 장르: {', '.join(sub_genres) if sub_genres else '없음'}
 핵심 키워드: {', '.join(keywords) if keywords else '없음'}
 """
     
-    prompt = f"""
+    instructions = f"""
 당신은 웹소설 전문 평가 AI입니다.
+{reading}
 아래의 '평가 기준'을 반드시 따르세요.
 
 [평가 기준]
@@ -66,12 +110,8 @@ def evaluate_story(text: str, genre_info: Dict) -> Dict:
 
 [장르 분석 결과]
 {genre_summary}
-
-[소설 원문]
-{text[:3000]}...  
-
 ---
-
+{story_summary}
 위 내용을 바탕으로 소설을 평가해 주세요.
 
 평가 항목:
@@ -103,11 +143,25 @@ def evaluate_story(text: str, genre_info: Dict) -> Dict:
   "종합_총평": "전체 평가"
 }}
 """
+    return build_manuscript_messages(body, instructions, label=label)
+
+
+def evaluate_story(text: str, genre_info: Dict, summary_result: Dict = None) -> Dict:
+    """
+    소설 평가 노드
+    입력:
+      - text: 원문 (전체, LLM에는 EVALUATION_SAMPLE_TOKENS 안의 발췌만 보냄)
+      - genre_info: genre_node 결과(dict 또는 JSON 문자열)
+      - summary_result: summary_node 결과 (발췌 선택 질의 + 줄거리 요약)
+    출력:
+      - 평가 점수 + 코멘트(dict)
+    """
+    messages = _build_messages(text, genre_info, summary_result)
+    return structured_completion(messages, "evaluation", EVALUATION_SCHEMA, temperature=0.3)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-    )
 
-    return response.choices[0].message.content
\ No newline at end of file
+async def aevaluate_story(text: str, genre_info: Dict, summary_result: Dict = None) -> Dict:
+    """evaluate_story의 비동기 버전 (발췌 선택은 스레드에서)"""
+    sample = await asyncio.to_thread(build_evaluation_sample, text, genre_info, summary_result)
+    messages = _build_messages(text, genre_info, summary_result, sample)
+    return await astructured_completion(messages, "evaluation", EVALUATION_SCHEMA, temperature=0.3)
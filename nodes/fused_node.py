@@ -0,0 +1,226 @@
+''' 여러 노드의 분석을 한 번의 LLM 호출로 묶어 처리하는 노드 (fused 모드)
+    - overview: 요약 + 핵심 키워드 + 장르     (summary_node + genre_node)
+    - deep:     문체 + 캐릭터성 + 캐릭터 카드  (style_node + character_node + character_card_node)
+    - 원고를 한 번만 보내고 구조화된 JSON 하나로 받은 뒤 기존 AnalysisState 키로 나눔
+    - 긴 원고(SUMMARY_CHUNK_CHARS 초과)의 요약은 map-reduce 요약을 그대로 사용
+    - deep의 문체 분석에는 원고 전체로 계산한 문체 지표 / 반복 표현(style_node와 같은 값)을 함께 전달
+    - deep은 긴 원고면 원고 앞부분 대신 캐릭터 노드와 같은 인물별 발췌(utils.character_index)를 보냄'''
+
+import asyncio
+from typing import Dict, List
+
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    STRING, STRING_LIST, array_schema, astructured_completion, is_failure, object_schema, structured_completion,
+)
+from utils.file_handler import MAX_CHARS
+from nodes.summary_node import SUMMARY_CHUNK_CHARS, summarize_text, asummarize_text
+from nodes.genre_node import GENRE_SCHEMA, analyze_genre, aanalyze_genre
+from nodes.style_node import STYLE_SCHEMA, analyze_style_locally, format_local_style
+from nodes.character_node import CHARACTERS_SCHEMA, character_context_note, format_character_observations
+from utils.character_index import build_character_context
+from nodes.character_card_node import CHARACTER_CARD_SCHEMA
+
+# 노드별 스키마를 그대로 묶음 (fused 결과가 개별 노드 결과와 같은 형태가 되도록)
+OVERVIEW_SCHEMA = object_schema({
+    "summary": object_schema({"full_summary": STRING, "keywords": STRING_LIST}),
+    "genre": GENRE_SCHEMA,
+})
+DEEP_SCHEMA = object_schema({
+    "style": STYLE_SCHEMA,
+    "characters": CHARACTERS_SCHEMA,
+    "character_cards": array_schema(CHARACTER_CARD_SCHEMA),
+})
+
+
+# =========================
+# overview: 요약 + 키워드 + 장르
+# =========================
+def _build_overview_messages(text: str) -> list:
+    instructions = """
+당신은 웹소설 요약 및 장르 분석 전문 AI입니다.
+앞의 소설 원문을 읽고 두 가지 작업을 한 번에 수행하세요.
+
+[작업 1. 요약]
+- 소설을 5~7문장으로 요약 (스포일러 최소화, 전체 흐름과 분위기 위주)
+- 주인공과 주요 사건을 중심으로, 결말은 암시만 할 것
+- 핵심 키워드 5~8개 (단어 또는 짧은 구, 중복 없이)
+
+[작업 2. 장르 분석]
+- 주 장르, 보조 장르, 장르 판단의 근거가 된 핵심 키워드, 분류 신뢰도(0.0~1.0)
+
+---
+
+[출력 형식]
+
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{
+  "summary": {
+    "full_summary": "5~7문장 요약",
+    "keywords": ["키워드1", "키워드2"]
+  },
+  "genre": {
+    "주_장르": "string",
+    "보조_장르": ["string"],
+    "핵심_키워드": ["string"],
+    "장르_분류_신뢰도": 0.0
+  }
+}
+"""
+    return build_manuscript_messages(text, instructions)
+
+
+def _split_overview(result: Dict) -> Dict:
+    if is_failure(result):
+        return {"summary": result, "genre": result}
+
+    return {
+        "summary": {
+            "full_summary": result["summary"]["full_summary"],
+            "keywords": result["summary"]["keywords"],
+            "paragraph_summaries": [],
+        },
+        "genre": result["genre"],
+    }
+
+
+def analyze_overview(text: str) -> Dict:
+    """
+    요약 + 키워드 + 장르를 한 번에 분석
+    Returns:
+        {"summary": dict, "genre": dict}
+    """
+    if len(text) > SUMMARY_CHUNK_CHARS:
+        summary = summarize_text(text)
+        return {"summary": summary, "genre": analyze_genre(text[:MAX_CHARS], summary)}
+
+    result = structured_completion(_build_overview_messages(text), "overview", OVERVIEW_SCHEMA, temperature=0.3)
+    return _split_overview(result)
+
+
+async def aanalyze_overview(text: str) -> Dict:
+    """analyze_overview의 비동기 버전"""
+    if len(text) > SUMMARY_CHUNK_CHARS:
+        summary = await asummarize_text(text)
+        return {"summary": summary, "genre": await aanalyze_genre(text[:MAX_CHARS], summary)}
+
+    result = await astructured_completion(_build_overview_messages(text), "overview", OVERVIEW_SCHEMA, temperature=0.3)
+    return _split_overview(result)
+
+
+# =========================
+# deep: 문체 + 캐릭터성 + 캐릭터 카드
+# =========================
+def _build_deep_messages(
+    text: str,
+    summary_result: Dict = None,
+    character_observations: List[Dict] = None,
+    local_style: Dict = None,
+    character_context: tuple = None,
+) -> list:
+    label, body = character_context or build_character_context(text)
+    context = ""
+    if summary_result:
+        keywords = summary_result.get("keywords", [])
+        if keywords:
+            context = f"\n[참고: 핵심 키워드]\n{', '.join(keywords)}\n"
+    context += format_local_style(local_style) + character_context_note(label)
+
+    instructions = f"""
+당신은 웹소설 문체 및 캐릭터 분석 전문 AI입니다.
+앞의 소설 원문을 읽고 세 가지 작업을 한 번에 수행하세요.
+{context}
+[작업 1. 문체 분석]
+- 문체 특징: 서술 방식(1인칭/3인칭, 관찰/몰입형), 감정 표현의 밀도, 전반적인 분위기
+- 강점: 몰입을 돕는 요소, 감정 전달력, 장르 적합성, 표현력
+- 약점: 반복되는 표현, 과도한 감정 묘사, 가독성을 해치는 요소
+- 문체 지표 / 반복 표현이 주어졌으면 리듬, 대사 비중, 가독성, 반복 판단은 그 값을 근거로 할 것
+
+[작업 2. 캐릭터성 유지 여부]
+- 캐릭터 일관성(0~100): 성격/태도/말투가 상황에 따라 급변하지 않는지
+- 캐릭터 깊이(0~100): 감정, 선택, 반응이 맥락을 가지는지
+- 행동과 동기의 연결: 설명 없는 갑작스러운 선택이 있는지
+- risk_points는 문제가 없으면 빈 배열 []
+
+[작업 3. 캐릭터 카드]
+- 주요 캐릭터를 주인공, 조연, 적대자로 구분 (단역 제외)
+- 이름이 명확하지 않으면 '미상', 확인되지 않는 정보는 '확인 불가'
+- 추측은 최소화하고 텍스트에 드러난 특성만 정리
+
+{format_character_observations(character_observations)}
+---
+
+[출력 형식]
+
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{{
+  "style": {{
+    "스타일": ["문체 특징 1", "문체 특징 2"],
+    "강점": ["강점 1", "강점 2"],
+    "약점": ["약점 1", "약점 2"]
+  }},
+  "characters": {{
+    "character_consistency": 0~100,
+    "character_depth": 0~100,
+    "analysis_comment": "2~3문장의 종합 분석",
+    "risk_points": ["지점 1", "지점 2"]
+  }},
+  "character_cards": [
+    {{
+      "name": "캐릭터 이름",
+      "role": "주인공",
+      "personality_keywords": ["키워드1", "키워드2"],
+      "core_traits": "핵심 특징 2~3문장",
+      "warning_point": "캐릭터성 유지 시 주의할 점"
+    }}
+  ]
+}}
+"""
+    return build_manuscript_messages(body, instructions, label=label)
+
+
+def _split_deep(result: Dict, local_style: Dict) -> Dict:
+    if is_failure(result):
+        return {"style": {**result, **local_style}, "characters": result, "character_cards": result}
+
+    return {
+        "style": {**result["style"], **local_style},
+        "characters": result["characters"],
+        "character_cards": result["character_cards"],
+    }
+
+
+def analyze_deep(
+    text: str,
+    summary_result: Dict = None,
+    character_observations: List[Dict] = None,
+    local_style: Dict = None,
+) -> Dict:
+    """
+    문체 + 캐릭터성 + 캐릭터 카드를 한 번에 분석
+    - text는 잘리지 않은 원고 전체 (LLM에는 인물별 발췌만 보냄)
+    - local_style: analyze_style_locally 결과 (이미 계산했으면 전달, 생략하면 text로 계산)
+    Returns:
+        {"style": dict, "characters": dict, "character_cards": list}
+    """
+    if local_style is None:
+        local_style = analyze_style_locally(text)
+    messages = _build_deep_messages(text, summary_result, character_observations, local_style)
+    return _split_deep(structured_completion(messages, "deep", DEEP_SCHEMA, temperature=0.3), local_style)
+
+
+async def aanalyze_deep(
+    text: str,
+    summary_result: Dict = None,
+    character_observations: List[Dict] = None,
+    local_style: Dict = None,
+) -> Dict:
+    """analyze_deep의 비동기 버전"""
+    if local_style is None:
+        local_style = await asyncio.to_thread(analyze_style_locally, text)
+    character_context = await asyncio.to_thread(build_character_context, text)
+    messages = _build_deep_messages(text, summary_result, character_observations, local_style, character_context)
+    result = await astructured_completion(messages, "deep", DEEP_SCHEMA, temperature=0.3)
+    return _split_deep(result, local_style)
@@ -1,59 +1,69 @@
 # 장르 분석 담당 노드(원고를 읽고 판타지, 로판, 현판 등 판단, 판단 기준이 된 키워드 추출)
 
-import json
-from openai import OpenAI
+from utils.file_handler import MAX_CHARS
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    RATIO, STRING, STRING_LIST, astructured_completion, is_failure, object_schema, structured_completion,
+)
 
-client = OpenAI()
+# 장르 분석 응답 스키마
+GENRE_SCHEMA = object_schema({
+    "주_장르": STRING,
+    "보조_장르": STRING_LIST,
+    "핵심_키워드": STRING_LIST,
+    "장르_분류_신뢰도": RATIO,
+})
 
-def analyze_genre(text: str, summary_result: dict | None = None) -> dict:
-    """
-    장르 분석 노드
-    - 반드시 dict 형태로 반환
-    - UI / LangGraph에서 바로 사용 가능
-    """
 
-    system_prompt = """
+def _build_messages(text: str, summary_result: dict | None = None) -> list:
+    # 긴 원고는 앞부분만 전달되므로, 원고 전체 줄거리 요약을 함께 제공
+    digest = ""
+    if summary_result and summary_result.get("paragraph_summaries"):
+        digest = "\n[원고 전체 줄거리 요약]\n" + summary_result.get("full_summary", "") + "\n"
+
+    # 원고가 앞, 장르 분석 지시가 뒤 (요약은 실행마다 달라지므로 지시 쪽에 둠)
+    instructions = f"""
 너는 웹소설 장르 분석 전문가다.
+앞의 웹소설 원고의 장르를 분석하라.
+{digest}
 반드시 아래 JSON 형식으로만 응답하라.
 
-{
+{{
   "주_장르": "string",
   "보조_장르": ["string", "string"],
   "핵심_키워드": ["string", "string"],
   "장르_분류_신뢰도": 0.0
-}
+}}
 """
 
-    user_prompt = f"""
-다음 웹소설 원고의 장르를 분석하라.
+    # 원고 전체를 넘겨받아도(기존 순차 파이프라인 등) 프롬프트 한도까지만 보냄
+    return build_manuscript_messages(text[:MAX_CHARS], instructions)
 
-[원고]
-{text}
-"""
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": system_prompt},
-            {"role": "user", "content": user_prompt},
-        ],
-        temperature=0.3,
-    )
-
-    raw_text = response.choices[0].message.content.strip()
-
-    # 🔥 핵심 수정 포인트
-    # JSON 문자열 → dict 변환
-    try:
-        result = json.loads(raw_text)
-    except json.JSONDecodeError:
-        # JSON 깨졌을 때를 대비한 최소 안전장치
-        result = {
+def _genre_result(result: dict) -> dict:
+    # repair까지 실패했을 때를 대비한 최소 안전장치
+    if is_failure(result):
+        return {
             "주_장르": None,
             "보조_장르": [],
             "핵심_키워드": [],
             "장르_분류_신뢰도": None,
-            "raw_output": raw_text,
+            "raw_output": result["raw_response"],
         }
-
     return result
+
+
+def analyze_genre(text: str, summary_result: dict | None = None) -> dict:
+    """
+    장르 분석 노드
+    - 반드시 dict 형태로 반환
+    - UI / LangGraph에서 바로 사용 가능
+    """
+    result = structured_completion(_build_messages(text, summary_result), "genre", GENRE_SCHEMA, temperature=0.3)
+    return _genre_result(result)
+
+
+async def aanalyze_genre(text: str, summary_result: dict | None = None) -> dict:
+    """analyze_genre의 비동기 버전"""
+    result = await astructured_completion(_build_messages(text, summary_result), "genre", GENRE_SCHEMA, temperature=0.3)
+    return _genre_result(result)
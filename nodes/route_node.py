@@ -1,13 +1,23 @@
+import logging
+
+from utils import metrics
+
+logger = logging.getLogger(__name__)
+
+
 def route_by_text_type(state):
     """
     text_type 결과를 보고 다음 노드 결정
     """
     info = state.get("text_type") or {}
-    print("[ROUTE DEBUG] text_type =", info)
+    logger.debug("text_type = %s", info)
     text_type = info.get("type")
 
     if text_type == "novel_text":
-        return "novel"
-    if text_type in ("scenario", "plot"):
-        return "planning"
-    return "unknown"
+        decision = "novel"
+    elif text_type in ("scenario", "plot"):
+        decision = "planning"
+    else:
+        decision = "unknown"
+    metrics.record_route("text_type", decision)
+    return decision
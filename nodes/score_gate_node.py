@@ -1,6 +1,7 @@
 # 시장성, 개연성, 독창성 점수를 가져와 심화 분석을 할지 말지 결정하는 노드
 
 from typing import TypedDict
+from utils import metrics
 
 class AnalysisState(TypedDict):
     evaluation: dict
@@ -13,7 +14,6 @@ def score_gate_node(state: AnalysisState) -> AnalysisState:
     # 1. 평가 자체가 실패한 경우 (여기다 넣는 거다)
     if "error" in evaluation or evaluation.get("parse_error"):
         return {
-            **state,
             "score_gate": {
                 "passed": False,
                 "average": 0,
@@ -31,7 +31,6 @@ def score_gate_node(state: AnalysisState) -> AnalysisState:
         average = sum(scores) / len(scores)
     except Exception:
         return {
-            **state,
             "score_gate": {
                 "passed": False,
                 "average": 0,
@@ -41,7 +40,6 @@ def score_gate_node(state: AnalysisState) -> AnalysisState:
 
     # 3. 통과 여부 결정
     return {
-        **state,
         "score_gate": {
             "passed": average >= 70,
             "average": average,
@@ -54,6 +52,8 @@ def route_by_score(state):
     score_gate 결과를 보고 다음 노드 결정
     """
     gate = state.get("score_gate", {})
-    return "deep" if gate.get("passed") else "stop"
+    decision = "deep" if gate.get("passed") else "stop"
+    metrics.record_route("score_gate", decision)
+    return decision
 
 
@@ -1,28 +1,94 @@
 # 원고 문체 분석 담당 노드
+# 문장 길이 / 대사 비율 / 문단 호흡 / 문장부호 같은 수치(utils.text_utils)와
+# 반복 표현(utils.ngram_index)은 로컬에서 원고 전체로 계산하고,
+# LLM에는 원고 대신 그 결과와 앞 / 중간 / 뒤 발췌만 보내 해석을 맡김
 
+import asyncio
 from typing import Dict
-from utils.openai_client import get_client
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import STRING_LIST, astructured_completion, object_schema, structured_completion
+from utils.ngram_index import get_ngram_index
+from utils.text_utils import compute_style_metrics, sample_excerpts
 
-def analyze_style(text: str, summary_result: Dict = None) -> Dict:
+# LLM에 보내는 발췌 분량 (앞 / 중간 / 뒤 합계)
+STYLE_SAMPLE_CHARS = 4000
+STYLE_SAMPLE_PARTS = 3
+# 결과 / 프롬프트에 넣는 반복 표현 수
+STYLE_REPEATED_PHRASES = 10
+
+# 문체 분석 응답 스키마
+STYLE_SCHEMA = object_schema({
+    "스타일": STRING_LIST,
+    "강점": STRING_LIST,
+    "약점": STRING_LIST,
+})
+
+
+def analyze_style_locally(text: str) -> Dict:
     """
-    문체 및 서술 스타일 분석 노드
-    - 문체 특징
-    - 강점
-    - 약점
+    LLM 없이 원고 전체에서 계산하는 문체 정보
+    Returns:
+        {"metrics": compute_style_metrics 결과, "repeated_phrases": [{"phrase", "count", "positions"}, ...]}
     """
-    client = get_client()
-    
+    return {
+        "metrics": compute_style_metrics(text),
+        "repeated_phrases": get_ngram_index(text).top_repeated(STYLE_REPEATED_PHRASES),
+    }
+
+
+def format_style_metrics(metrics: Dict) -> str:
+    """compute_style_metrics 결과를 프롬프트용 텍스트로 변환"""
+    if not metrics.get("chars"):
+        return ""
+
+    sentences = metrics["sentences"]
+    dialogue = metrics["dialogue"]
+    paragraphs = metrics["paragraphs"]
+    punctuation = metrics["punctuation_per_1k"]
+    by_section = " → ".join(f"{v:.0%}" for v in dialogue["by_section"])
+    return f"""
+[문체 지표: 원고 전체 {metrics["chars"]:,}자(공백 제외)를 기계적으로 계산한 값]
+- 문장: {sentences["count"]:,}개, 평균 {sentences["mean"]}자 (중앙값 {sentences["median"]}, 하위 10% {sentences["p10"]}, 상위 10% {sentences["p90"]}, 표준편차 {sentences["std"]})
+- 짧은 문장(15자 미만) {sentences["short_ratio"]:.0%}, 긴 문장(80자 초과) {sentences["long_ratio"]:.0%}
+- 대사 비율: 글자 기준 {dialogue["ratio"]:.0%}, 줄 기준 {dialogue["line_ratio"]:.0%}
+- 구간별 대사 비율(처음 → 끝): {by_section}
+- 문단: {paragraphs["count"]:,}개, 평균 {paragraphs["mean"]}자 (상위 10% {paragraphs["p90"]}자), 문단당 {paragraphs["sentences_per_paragraph"]}문장, 한 문장 문단 {paragraphs["single_sentence_ratio"]:.0%}
+- 1000자당 문장부호: 쉼표 {punctuation["comma"]}, 느낌표 {punctuation["exclamation"]}, 물음표 {punctuation["question"]}, 말줄임표 {punctuation["ellipsis"]}, 줄표 {punctuation["dash"]}, 물결 {punctuation["tilde"]}
+"""
+
+
+def format_repeated_phrases(repeated_phrases: list) -> str:
+    """반복 표현 목록을 프롬프트용 텍스트로 변환"""
+    lines = [f'- "{item["phrase"]}" {item["count"]}회' for item in repeated_phrases]
+    return f"""
+[반복 표현: 원고 전체에서 찾은, 여러 번 되풀이된 표현 (횟수 순)]
+{chr(10).join(lines) or "- 눈에 띄게 반복된 표현 없음"}
+"""
+
+
+def format_local_style(local_style: Dict) -> str:
+    """analyze_style_locally 결과 전체를 프롬프트용 텍스트로 변환"""
+    if not local_style:
+        return ""
+    return format_style_metrics(local_style["metrics"]) + format_repeated_phrases(local_style["repeated_phrases"])
+
+
+def _build_messages(text: str, summary_result: Dict = None, local_style: Dict = None) -> list:
     # summary 정보가 있으면 활용
     context = ""
     if summary_result:
         keywords = summary_result.get("keywords", [])
         if keywords:
             context = f"\n[참고: 핵심 키워드]\n{', '.join(keywords)}\n"
-    
-    prompt = f"""
+    if local_style is None:
+        local_style = analyze_style_locally(text)
+
+    # 원고 전체 대신 발췌가 앞, 지표와 분석 지시가 뒤
+    instructions = f"""
 당신은 웹소설 문체 분석 전문 AI입니다.
-아래 소설 원문을 읽고, 문체와 서술 스타일을 분석하세요.
-{context}
+앞의 원고 발췌와 아래 문체 지표 / 반복 표현 목록을 함께 보고, 문체와 서술 스타일을 분석하세요.
+지표와 반복 표현은 원고 전체에서 계산한 값이므로 리듬, 대사 비중, 가독성, 반복 판단은 발췌보다 이 값을 우선하세요.
+{context}{format_local_style(local_style)}
 [분석 기준]
 
 1. 문체 특징
@@ -37,17 +103,12 @@ def analyze_style(text: str, summary_result: Dict = None) -> Dict:
 - 표현력
 
 3. 문체의 약점
-- 반복되는 표현
+- 반복되는 표현 ([반복 표현] 목록 중 문체상 문제가 되는 것을 구체적으로)
 - 과도한 감정 묘사
 - 가독성을 해칠 수 있는 요소
 
 ---
 
-[소설 원문]
-{text}
-
----
-
 [출력 형식]
 
 반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
@@ -58,11 +119,33 @@ def analyze_style(text: str, summary_result: Dict = None) -> Dict:
   "약점": ["약점 1", "약점 2"]
 }}
 """
+    sample = sample_excerpts(text, STYLE_SAMPLE_CHARS, STYLE_SAMPLE_PARTS)
+    return build_manuscript_messages(sample, instructions, label="원고 발췌")
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-    )
 
-    return response.choices[0].message.content
\ No newline at end of file
+def _style_result(result: Dict, local_style: Dict) -> Dict:
+    # 로컬 계산 결과는 LLM 응답과 별도로 결과에 남김 (parse_error 결과에도)
+    return {**result, **local_style}
+
+
+def analyze_style(text: str, summary_result: Dict = None) -> Dict:
+    """
+    문체 및 서술 스타일 분석 노드
+    - 문체 특징
+    - 강점
+    - 약점
+    - metrics / repeated_phrases: 로컬에서 계산한 문체 지표 / 반복 표현 (analyze_style_locally)
+    """
+    local_style = analyze_style_locally(text)
+    messages = _build_messages(text, summary_result, local_style)
+    return _style_result(structured_completion(messages, "style", STYLE_SCHEMA, temperature=0.3), local_style)
+
+
+async def aanalyze_style(text: str, summary_result: Dict = None) -> Dict:
+    """analyze_style의 비동기 버전"""
+    # 100만 자 원고면 100ms 안팎 걸리므로 이벤트 루프를 막지 않도록 스레드에서 계산
+    local_style = await asyncio.to_thread(analyze_style_locally, text)
+    messages = _build_messages(text, summary_result, local_style)
+    return _style_result(
+        await astructured_completion(messages, "style", STYLE_SCHEMA, temperature=0.3), local_style,
+    )
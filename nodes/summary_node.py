@@ -1,76 +1,310 @@
 ''' 원고 요약/키워드 담당 노드
     1. 전체 요약
     2. 핵심 키워드 추출
-        (문단별/편별 요약은 2차 버전에서 확장 예정)'''
+    3. 긴 원고(SUMMARY_CHUNK_CHARS 초과)는 map-reduce 방식으로 요약
+        - map: 문단 경계 기준 chunk별 요약을 병렬로 생성 (= paragraph_summaries)
+        - reduce: chunk 요약을 REDUCE_FANOUT개씩 묶어 계층적으로 합친 뒤 전체 요약 생성
+    4. 증분 분석: chunk별 요약/인물 관찰을 chunk 해시로 저장해 두고
+       원고가 수정되거나 회차가 추가되면 바뀐 chunk만 다시 요약'''
 
 
+import asyncio
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
-from utils.text_utils import split_paragraphs
-from utils.openai_client import get_client
+from utils.text_utils import split_paragraphs, chunk_paragraphs
+from utils.openai_client import chat_completion, achat_completion
+from utils.prompt_builder import build_manuscript_messages
+from utils.chunk_store import chunk_hash, get_chunk_store
+from utils.structured_output import (
+    STRING, STRING_LIST, array_schema, astructured_completion, is_failure, object_schema, structured_completion,
+)
 
+# 이 길이를 넘으면 chunk 단위 요약 사용
+SUMMARY_CHUNK_CHARS = 6000
+# reduce 단계에서 한 번에 합치는 요약 개수
+REDUCE_FANOUT = 8
+# map / reduce 단계 동시 호출 수
+MAP_CONCURRENCY = 16
+# chunk 저장소 kind (chunk 프롬프트가 바뀌면 버전을 올림)
+CHUNK_RESULT_KIND = "summary_chunk:v1"
+# 인물 관찰 병합 시 남기는 인물 수 / 인물당 관찰 수
+MAX_CHARACTERS = 20
+MAX_OBSERVATIONS = 6
 
-def extract_keywords(text: str, client) -> List[str]:
-    """핵심 키워드 추출"""
-    prompt = f"""
-다음 소설 텍스트에서 핵심 키워드 5~8개를 추출해 주세요.
-단어 또는 짧은 구 형태로, 중복 없이 쉼표로 구분하여 나열하세요.
+# 키워드 / chunk 요약 응답 스키마
+KEYWORDS_SCHEMA = object_schema({"keywords": STRING_LIST})
+SUMMARY_CHUNK_SCHEMA = object_schema({
+    "summary": STRING,
+    "characters": array_schema(object_schema({"name": STRING, "observation": STRING})),
+})
 
-예시: 마법, 귀족 사회, 성장, 복수, 가족애
 
-텍스트:
-{text[:2000]}
+def _build_keyword_messages(text: str, label: str = "소설 원문") -> list:
+    instructions = """
+앞의 텍스트에서 핵심 키워드 5~8개를 추출해 주세요.
+단어 또는 짧은 구 형태로, 중복 없이 나열하세요.
+
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{"keywords": ["마법", "귀족 사회", "성장", "복수", "가족애"]}
 """
+    return build_manuscript_messages(text, instructions, label=label)
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": prompt}],
-        temperature=0.3,
-    )
 
-    keywords = response.choices[0].message.content.strip()
-    return [k.strip() for k in keywords.split(",")]
+def _keywords_result(result: Dict) -> List[str]:
+    if is_failure(result):
+        # JSON으로 고쳐지지 않으면 예전 형식(쉼표 구분)으로 간주
+        return [k.strip() for k in (result["raw_response"] or "").split(",") if k.strip()]
+    return [k.strip() for k in result["keywords"] if k.strip()]
 
 
-def summarize_text(text: str) -> Dict:
-    """
-    summary_node 2차 확장
-    - 전체 요약
-    - 핵심 키워드
-    - 문단별 요약 (추후 구현)
-    """
+def extract_keywords(text: str, label: str = "소설 원문") -> List[str]:
+    """핵심 키워드 추출"""
+    messages = _build_keyword_messages(text, label)
+    return _keywords_result(structured_completion(messages, "keywords", KEYWORDS_SCHEMA, temperature=0.3))
+
+
+async def aextract_keywords(text: str, label: str = "소설 원문") -> List[str]:
+    """extract_keywords의 비동기 버전"""
+    messages = _build_keyword_messages(text, label)
+    return _keywords_result(await astructured_completion(messages, "keywords", KEYWORDS_SCHEMA, temperature=0.3))
+
 
-    client = get_client()
-    
+def _build_summary_messages(text: str) -> list:
     # 1. 전체 요약
-    summary_prompt = f"""
-다음 소설을 5~7문장으로 요약해 주세요.
+    instructions = """
+앞의 소설을 5~7문장으로 요약해 주세요.
 스포일러는 최소화하고, 전체 흐름과 분위기 위주로 정리하세요.
 
 [지침]
 - 주인공과 주요 사건을 중심으로 요약
 - 결말은 암시만 할 것
 - 명확하고 간결한 문장으로 작성
+"""
+    return build_manuscript_messages(text, instructions)
+
+
+def _build_chunk_messages(chunk: str) -> list:
+    # chunk 위치(몇 번째 부분인지)는 넣지 않음
+    # → 회차가 추가되어 chunk 개수가 바뀌어도 기존 chunk의 요청/결과가 그대로 재사용됨
+    prompt = f"""
+다음은 소설 원고의 일부분입니다.
+이 부분에서 일어난 사건과 등장인물의 행동을 중심으로 2~3문장으로 요약하고,
+이 부분에 등장하는 인물별로 드러난 성격/행동/관계를 한 문장씩 정리해 주세요.
+앞뒤 내용을 추측하지 말고 이 부분에 드러난 내용만 정리하세요.
+
+반드시 아래 JSON 형식으로만 반환하세요. 다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+{{
+  "summary": "2~3문장 요약",
+  "characters": [
+    {{"name": "인물 이름", "observation": "이 부분에서 드러난 특징 한 문장"}}
+  ]
+}}
 
 텍스트:
-{text}
+{chunk}
 """
+    return [{"role": "user", "content": prompt}]
 
-    summary_response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[{"role": "user", "content": summary_prompt}],
-        temperature=0.3,  # 0.4에서 0.3으로 낮춤
+
+def _chunk_result(result: Dict) -> Dict:
+    if is_failure(result):
+        # repair까지 실패하면 응답 전체를 요약으로 사용
+        return {"summary": (result["raw_response"] or "").strip(), "characters": []}
+    characters = [
+        {"name": c["name"].strip(), "observation": c["observation"].strip()}
+        for c in result["characters"]
+        if c["name"].strip()
+    ]
+    return {"summary": result["summary"].strip(), "characters": characters}
+
+
+def _build_reduce_messages(summaries: List[str], final: bool) -> list:
+    joined = "\n".join(f"{i}. {s}" for i, s in enumerate(summaries, 1))
+    if final:
+        instruction = """다음은 한 소설의 부분별 요약을 순서대로 나열한 것입니다.
+이를 바탕으로 소설 전체를 5~7문장으로 요약해 주세요.
+스포일러는 최소화하고, 전체 흐름과 분위기 위주로 정리하세요.
+
+[지침]
+- 주인공과 주요 사건을 중심으로 요약
+- 결말은 암시만 할 것
+- 명확하고 간결한 문장으로 작성"""
+    else:
+        instruction = """다음은 한 소설의 연속된 부분별 요약입니다.
+사건의 흐름이 이어지도록 하나로 합쳐 3~4문장으로 요약해 주세요."""
+
+    prompt = f"""
+{instruction}
+
+부분별 요약:
+{joined}
+"""
+    return [{"role": "user", "content": prompt}]
+
+
+def _group(items: List[str], size: int) -> List[List[str]]:
+    return [items[i:i + size] for i in range(0, len(items), size)]
+
+
+def _merge_character_observations(chunk_results: List[Dict]) -> List[Dict]:
+    """chunk별 인물 관찰을 인물 단위로 합침 (등장 chunk 수 기준 정렬)"""
+    merged = {}
+    for result in chunk_results:
+        for c in result["characters"]:
+            entry = merged.setdefault(c["name"], {"name": c["name"], "mentions": 0, "observations": []})
+            entry["mentions"] += 1
+            if c["observation"]:
+                entry["observations"].append(c["observation"])
+
+    characters = sorted(merged.values(), key=lambda e: e["mentions"], reverse=True)[:MAX_CHARACTERS]
+    for entry in characters:
+        # 처음 모습과 최근 모습을 함께 남김
+        obs = entry["observations"]
+        if len(obs) > MAX_OBSERVATIONS:
+            half = MAX_OBSERVATIONS // 2
+            entry["observations"] = obs[:half] + obs[-(MAX_OBSERVATIONS - half):]
+    return characters
+
+
+def _load_cached_chunks(chunks: List[str]):
+    """저장소에 있는 chunk 결과와 새로 계산할 chunk 목록 반환"""
+    hashes = [chunk_hash(c) for c in chunks]
+    cached = get_chunk_store().get_many(CHUNK_RESULT_KIND, hashes)
+    missing = {h: c for h, c in zip(hashes, chunks) if h not in cached}
+    return hashes, cached, missing
+
+
+def _build_chunked_result(hashes, results_by_hash, full_summary, keywords, reused) -> Dict:
+    chunk_results = [results_by_hash[h] for h in hashes]
+    return {
+        "full_summary": full_summary,
+        "keywords": keywords,
+        "paragraph_summaries": [r["summary"] for r in chunk_results],
+        "character_observations": _merge_character_observations(chunk_results),
+        "incremental": {"chunks": len(hashes), "reused": reused},
+    }
+
+
+def _summarize_chunked(text: str) -> Dict:
+    chunks = chunk_paragraphs(text, SUMMARY_CHUNK_CHARS)
+    hashes, results_by_hash, missing = _load_cached_chunks(chunks)
+
+    def call(messages):
+        return chat_completion(messages, temperature=0.3).strip()
+
+    def summarize_chunk(chunk):
+        messages = _build_chunk_messages(chunk)
+        return _chunk_result(structured_completion(messages, "summary_chunk", SUMMARY_CHUNK_SCHEMA, temperature=0.3))
+
+    with ThreadPoolExecutor(max_workers=MAP_CONCURRENCY) as executor:
+        # map: 바뀌었거나 새로 추가된 chunk만 요약
+        computed = dict(zip(missing, executor.map(summarize_chunk, missing.values())))
+        get_chunk_store().put_many(CHUNK_RESULT_KIND, computed)
+        results_by_hash.update(computed)
+
+        # reduce: 한 번에 합칠 수 있을 때까지 계층적으로 합침
+        # (바뀌지 않은 묶음은 요청이 같으므로 LLM 캐시에서 바로 반환됨)
+        level = [results_by_hash[h]["summary"] for h in hashes]
+        paragraph_summaries = level
+        while len(level) > REDUCE_FANOUT:
+            level = list(executor.map(
+                call,
+                [_build_reduce_messages(g, final=False) for g in _group(level, REDUCE_FANOUT)],
+            ))
+
+    full_summary = call(_build_reduce_messages(level, final=True))
+    keywords = extract_keywords("\n".join(paragraph_summaries), label="부분별 요약")
+
+    return _build_chunked_result(hashes, results_by_hash, full_summary, keywords, len(hashes) - len(missing))
+
+
+async def _asummarize_chunked(text: str, on_token=None) -> Dict:
+    chunks = chunk_paragraphs(text, SUMMARY_CHUNK_CHARS)
+    hashes, results_by_hash, missing = _load_cached_chunks(chunks)
+    semaphore = asyncio.Semaphore(MAP_CONCURRENCY)
+
+    async def call(messages, on_token=None):
+        async with semaphore:
+            return (await achat_completion(messages, temperature=0.3, on_token=on_token)).strip()
+
+    async def summarize_chunk(chunk):
+        async with semaphore:
+            messages = _build_chunk_messages(chunk)
+            return _chunk_result(
+                await astructured_completion(messages, "summary_chunk", SUMMARY_CHUNK_SCHEMA, temperature=0.3)
+            )
+
+    # map: 바뀌었거나 새로 추가된 chunk만 요약
+    results = await asyncio.gather(*(summarize_chunk(c) for c in missing.values()))
+    computed = dict(zip(missing, results))
+    get_chunk_store().put_many(CHUNK_RESULT_KIND, computed)
+    results_by_hash.update(computed)
+
+    # reduce: 한 번에 합칠 수 있을 때까지 계층적으로 합침
+    # (바뀌지 않은 묶음은 요청이 같으므로 LLM 캐시에서 바로 반환됨)
+    level = [results_by_hash[h]["summary"] for h in hashes]
+    paragraph_summaries = level
+    while len(level) > REDUCE_FANOUT:
+        level = list(await asyncio.gather(*(
+            call(_build_reduce_messages(g, final=False)) for g in _group(level, REDUCE_FANOUT)
+        )))
+
+    full_summary, keywords = await asyncio.gather(
+        call(_build_reduce_messages(level, final=True), on_token),
+        aextract_keywords("\n".join(paragraph_summaries), label="부분별 요약"),
     )
 
-    full_summary = summary_response.choices[0].message.content.strip()
+    return _build_chunked_result(hashes, results_by_hash, full_summary, keywords, len(hashes) - len(missing))
+
+
+def summarize_text(text: str) -> Dict:
+    """
+    summary_node 2차 확장
+    - 전체 요약
+    - 핵심 키워드
+    - 문단별 요약 (긴 원고는 chunk별 요약)
+    """
+
+    if len(text) > SUMMARY_CHUNK_CHARS:
+        return _summarize_chunked(text)
+
+    full_summary = chat_completion(
+        _build_summary_messages(text),
+        temperature=0.3,  # 0.4에서 0.3으로 낮춤
+    ).strip()
 
     # 2. 문단 분리
     paragraphs = split_paragraphs(text)
 
     # 3. 키워드 추출
-    keywords = extract_keywords(text, client)
+    keywords = extract_keywords(text)
 
     return {
         "full_summary": full_summary,
         "keywords": keywords,
-        "paragraph_summaries": []  # 추후 구현
-    }
\ No newline at end of file
+        "paragraph_summaries": []  # 짧은 원고는 전체 요약만 생성
+    }
+
+
+async def asummarize_text(text: str, on_token=None) -> Dict:
+    """
+    summarize_text의 비동기 버전
+    - 요약과 키워드 추출은 서로 독립적이므로 동시에 호출
+    - on_token이 있으면 전체 요약을 생성되는 대로 조각 단위로 전달 (UI 스트리밍용)
+    """
+
+    if len(text) > SUMMARY_CHUNK_CHARS:
+        return await _asummarize_chunked(text, on_token)
+
+    full_summary, keywords = await asyncio.gather(
+        achat_completion(_build_summary_messages(text), temperature=0.3, on_token=on_token),
+        aextract_keywords(text),
+    )
+
+    return {
+        "full_summary": full_summary.strip(),
+        "keywords": keywords,
+        "paragraph_summaries": []  # 짧은 원고는 전체 요약만 생성
+    }
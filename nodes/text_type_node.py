@@ -1,25 +1,54 @@
 # 입력된 텍스트 및 첨부된 파일의 내용이
 # '소설 원문 / 시나리오 / 플롯' 중 무엇인지 구분하는 노드
-
-from typing import Dict
-from utils.openai_client import get_client
-import json
+# 1차로 로컬 규칙/특징 기반 분류기로 판단하고, 애매한 경우에만 LLM 호출
+
+from typing import Dict, Optional
+from utils.file_handler import MAX_CHARS
+from utils.prompt_builder import build_manuscript_messages
+from utils.structured_output import (
+    RATIO, STRING, astructured_completion, is_failure, object_schema, structured_completion,
+)
 import re
 
-client = get_client()
-
 # Rule-based 기준값
 MIN_CHARS = 200
 MIN_SENTENCES = 3
 
-
-def analyze_text_type(text: str) -> Dict:
-    """
-    입력 텍스트가 소설 원문 / 시나리오 / 플롯 중 무엇인지 판단
-    """
-
-    text = text.strip()
-
+# 로컬 분류기는 앞부분만 보고 판단 (형식은 앞부분에서 충분히 드러남)
+LOCAL_SAMPLE_CHARS = 5000
+
+# 시나리오 장면 지시문 (S#1, 씬 3, INT. / EXT., CUT TO, F.I. / F.O. 등)
+SCENE_MARKER = re.compile(r"^\s*(S\s*#\s*\d+|씬\s*\d+|INT\.|EXT\.|CUT TO|F\.[IO]\.?|(NA|E|O\.?S\.?|V\.?O\.?)\s*\))", re.IGNORECASE)
+# "#1." 형식의 줄: 시나리오 씬 번호로도 쓰지만 웹소설 회차 제목으로도 흔하므로
+# 화자 줄 / 다른 장면 지시문이 함께 있을 때만 시나리오 근거로 봄
+NUMBERED_HEADING = re.compile(r"^\s*#\s*\d+\.")
+# "이름: 대사" / "이름 (감정) 대사" 형태의 화자 줄
+SPEAKER_LINE = re.compile(r"^\s*[가-힣A-Za-z]{1,10}\s*(\([^)]{0,20}\))?\s*[:：]")
+# 목록형 줄 (플롯/시놉시스)
+BULLET_LINE = re.compile(r"^\s*([-*•·▶■□○●]|\d+[.)]|[①-⑳])\s+")
+# 따옴표로 시작하는 대사 줄 (소설)
+QUOTE_LINE = re.compile(r"^\s*[\"“”'‘’「『]")
+# 문장 끝 어절 ("...했다." 의 "했다")
+SENTENCE_END = re.compile(r"([가-힣]+)[.!?]")
+
+# LLM 판별 응답 스키마
+TEXT_TYPE_SCHEMA = object_schema({
+    "type": {"type": "string", "enum": ["novel_text", "scenario", "plot", "unknown"]},
+    "confidence": RATIO,
+    "reason": STRING,
+})
+
+# 과거 시제 선어말 어미 음절 ("-었다/-았다/-였다/-했다")
+PAST_SYLLABLES = {"었", "았", "였", "했"}
+# ㅆ 받침이지만 과거가 아닌 종결 ("숨기고 있다", "알 수 없다", "하겠다")
+NOT_PAST_ENDINGS = ("있다", "없다", "겠다")
+
+# 한글 음절의 받침 번호 (ㄴ=4)
+_JONG_NIEUN = 4
+
+
+def _rule_based_filter(text: str) -> Optional[Dict]:
+    """LLM 호출 전 분량/문장 수 기준으로 걸러내기 (통과 시 None)"""
     # Rule-based pre-filter
     if len(text) < MIN_CHARS:
         return {
@@ -38,11 +67,121 @@ def analyze_text_type(text: str) -> Dict:
             "message": "문장 수가 부족해 분석할 수 없습니다."
         }
 
-    # LLM 기반 형식 판별
-    prompt = f"""
+    return None
+
+
+def _jongseong(syllable: str) -> int:
+    code = ord(syllable) - 0xAC00
+    if 0 <= code < 11172:
+        return code % 28
+    return 0
+
+
+def extract_text_type_features(text: str) -> Dict:
+    """형식 판별용 특징값 계산 (한 번의 줄 단위 순회)"""
+    sample = text[:LOCAL_SAMPLE_CHARS]
+    lines = [line for line in sample.split("\n") if line.strip()]
+    total_lines = len(lines) or 1
+
+    scene = numbered = speaker = bullet = quote = 0
+    for line in lines:
+        if SCENE_MARKER.match(line):
+            scene += 1
+        elif NUMBERED_HEADING.match(line):
+            numbered += 1
+        elif SPEAKER_LINE.match(line):
+            speaker += 1
+        elif BULLET_LINE.match(line):
+            bullet += 1
+        elif QUOTE_LINE.match(line):
+            quote += 1
+
+    # 문장 종결 시제: "-었다/-았다/-였다/-했다"(과거 서술) vs "-ㄴ다/-는다/있다/없다"(현재 요약체)
+    # ("갔다", "봤다" 같은 축약형은 세지 않음 → 과거 비율은 낮게 잡히고 애매하면 LLM이 판단)
+    past = present = 0
+    endings = SENTENCE_END.findall(sample)
+    for word in endings:
+        if len(word) < 2 or word[-1] != "다":
+            continue
+        if word.endswith(NOT_PAST_ENDINGS):
+            if not word.endswith("겠다"):
+                present += 1
+        elif word[-2] in PAST_SYLLABLES:
+            past += 1
+        elif _jongseong(word[-2]) == _JONG_NIEUN or word.endswith("는다"):
+            present += 1
+    total_endings = len(endings) or 1
+
+    return {
+        "lines": len(lines),
+        "scene_markers": scene,
+        "numbered_headings": numbered,
+        "speaker_ratio": speaker / total_lines,
+        "bullet_ratio": bullet / total_lines,
+        "dialogue_ratio": quote / total_lines,
+        "past_ratio": past / total_endings,
+        "present_ratio": present / total_endings,
+    }
+
+
+def classify_text_type_locally(text: str) -> Optional[Dict]:
+    """
+    특징값 기반 형식 판별
+    - 확신할 수 있는 경우에만 결과 반환, 애매하면 None (→ LLM 판별)
+    - 현재형 서술만으로는 플롯으로 보지 않음 (현재형으로 쓴 소설도 있으므로 LLM이 판단)
+    - 따옴표 대사가 없는 과거형 글은 과거형 비율을 더 높게 요구 (과거형으로 쓴 시놉시스도 있으므로)
+    """
+    f = extract_text_type_features(text)
+
+    numbered_scenes = f["numbered_headings"] >= 2 and (f["scene_markers"] >= 1 or f["speaker_ratio"] >= 0.1)
+    if f["scene_markers"] >= 2 or f["speaker_ratio"] >= 0.3 or numbered_scenes:
+        return {
+            "type": "scenario",
+            "confidence": 0.9,
+            "reason": "장면 지시문 또는 '화자: 대사' 형식의 줄이 많습니다.",
+            "source": "local",
+        }
+
+    if f["bullet_ratio"] >= 0.4:
+        return {
+            "type": "plot",
+            "confidence": 0.85,
+            "reason": "목록형 구성으로 사건을 나열합니다.",
+            "source": "local",
+        }
+
+    has_dialogue = f["dialogue_ratio"] > 0
+    if (
+        f["past_ratio"] >= (0.5 if has_dialogue else 0.7)
+        and f["scene_markers"] == 0
+        and f["speaker_ratio"] < 0.05
+        and f["bullet_ratio"] < 0.1
+    ):
+        reason = "과거형 서술 문장 위주입니다."
+        if has_dialogue:
+            reason = "과거형 서술 문장 위주이며 대사가 따옴표로 서술에 섞여 있습니다."
+        return {
+            "type": "novel_text",
+            "confidence": 0.85,
+            "reason": reason,
+            "source": "local",
+        }
+
+    return None
+
+
+def needs_llm_classification(text: str) -> bool:
+    """규칙 / 로컬 분류기로 판별되지 않아 LLM 호출이 필요한지"""
+    text = text.strip()
+    return _rule_based_filter(text) is None and classify_text_type_locally(text) is None
+
+
+def _build_messages(text: str) -> list:
+    # LLM 기반 형식 판별 (원고가 앞, 판별 지시가 뒤)
+    instructions = """
 당신은 글의 형식을 판별하는 분석가입니다.
 
-아래 텍스트를 읽고, 형식을 판단하세요.
+앞의 텍스트를 읽고, 형식을 판단하세요.
 
 판단 기준:
 - novel_text: 서술 중심의 소설 원문 (장면, 감정, 사건 묘사)
@@ -52,35 +191,58 @@ def analyze_text_type(text: str) -> Dict:
 
 반드시 아래 JSON 형식으로만 응답하세요.
 
-{{
+{
   "type": "novel_text | scenario | plot | unknown",
   "confidence": 0.0,
   "reason": "판단 근거를 한 문장으로 설명"
-}}
-
-텍스트:
-{text}
+}
 """
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "JSON 형식으로만 응답하세요."},
-            {"role": "user", "content": prompt}
-        ],
-        temperature=0.2,
-    )
-
-    content = response.choices[0].message.content.strip()
-
-    try:
-        cleaned = content.strip("`").strip()
-        if cleaned.lower().startswith("json"):
-            cleaned = cleaned[4:].strip()
-        return json.loads(cleaned)
-    except Exception:
+    # 원고 전체를 넘겨받아도 프롬프트 한도까지만 보냄
+    return build_manuscript_messages(text[:MAX_CHARS], instructions)
+
+
+def _text_type_result(result: Dict) -> Dict:
+    if is_failure(result):
         return {
             "type": "unknown",
             "confidence": 0.0,
             "reason": "응답 파싱 실패"
         }
+    return result
+
+
+def analyze_text_type(text: str) -> Dict:
+    """
+    입력 텍스트가 소설 원문 / 시나리오 / 플롯 중 무엇인지 판단
+    """
+
+    text = text.strip()
+
+    filtered = _rule_based_filter(text)
+    if filtered is not None:
+        return filtered
+
+    local = classify_text_type_locally(text)
+    if local is not None:
+        return local
+
+    result = structured_completion(_build_messages(text), "text_type", TEXT_TYPE_SCHEMA, temperature=0.2)
+    return _text_type_result(result)
+
+
+async def aanalyze_text_type(text: str) -> Dict:
+    """analyze_text_type의 비동기 버전"""
+
+    text = text.strip()
+
+    filtered = _rule_based_filter(text)
+    if filtered is not None:
+        return filtered
+
+    local = classify_text_type_locally(text)
+    if local is not None:
+        return local
+
+    result = await astructured_completion(_build_messages(text), "text_type", TEXT_TYPE_SCHEMA, temperature=0.2)
+    return _text_type_result(result)
@@ -0,0 +1,228 @@
+''' 여러 원고를 한 번에 분석하는 배치 실행기
+    - 입력: .txt / .docx / .pdf 파일이 들어 있는 디렉터리 또는 JSONL 파일
+      (JSONL 한 줄 = {"id": "...", "text": "..."})
+    - 하나의 이벤트 루프에서 arun_langgraph_pipeline을 동시에 N개까지 실행
+    - 원고마다 결과 JSON 파일 하나씩 저장 (파일 이름 = 정리한 id + id 해시 → id마다 다른 파일)
+    - 읽을 수 없는 원고(JSONL 파싱 실패, 중복 id 등)는 배치를 멈추지 않고 실패로 집계
+    - 노드 에러가 남은 결과는 부분 실패로 따로 집계 (지연시간 백분위에서 제외)
+    - 마지막에 처리량 / 지연시간 백분위 출력
+
+    사용 예)
+        python -m pipeline.batch manuscripts/ -o results/ -c 8
+        python -m pipeline.batch contest.jsonl -o results/ -c 16 --skip-existing
+        python -m pipeline.batch contest.jsonl --metrics-jsonl results/metrics.jsonl --metrics-port 9108
+        python -m pipeline.batch contest.jsonl -c 16 --hedge
+        python -m pipeline.batch contest.jsonl -c 8 --speculative'''
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import re
+import time
+from pathlib import Path
+
+from utils import call_policy, metrics
+from utils.file_handler import load_from_file, load_from_text_input
+from pipeline.langgraph_pipeline import arun_langgraph_pipeline
+
+SUPPORTED_EXTS = (".txt", ".docx", ".pdf")
+# 결과 파일 이름에 붙이는 id 해시 길이
+ID_HASH_CHARS = 10
+
+
+# =========================
+# 입력 수집
+# =========================
+def _failing_loader(message: str):
+    """호출하면 ValueError를 내는 loader (입력 단계의 문제도 원고 하나의 실패로 집계)"""
+    def loader():
+        raise ValueError(message)
+    return loader
+
+
+def iter_manuscripts(source: str):
+    """
+    (id, loader) 쌍을 순서대로 생성
+    - 원고 본문은 실제로 처리할 때 loader()로 읽어 메모리를 아낌
+    - JSONL의 깨진 줄 / 중복 id는 실패하는 loader로 내보냄 (중복 id는 "id#line-N"으로 따로 기록)
+    """
+    path = Path(source)
+
+    if path.is_dir():
+        for file_path in sorted(path.rglob("*")):
+            if file_path.is_file() and file_path.suffix.lower() in SUPPORTED_EXTS:
+                manuscript_id = str(file_path.relative_to(path))
+                yield manuscript_id, (lambda p=file_path: load_from_file(str(p)))
+        return
+
+    if path.suffix.lower() == ".jsonl":
+        seen = set()
+        with path.open(encoding="utf-8") as f:
+            for line_no, line in enumerate(f, 1):
+                line = line.strip()
+                if not line:
+                    continue
+                try:
+                    record = json.loads(line)
+                except json.JSONDecodeError as e:
+                    yield f"line-{line_no}", _failing_loader(f"JSONL {line_no}번째 줄 파싱 실패: {e}")
+                    continue
+                if not isinstance(record, dict):
+                    yield f"line-{line_no}", _failing_loader(f"JSONL {line_no}번째 줄이 객체가 아닙니다.")
+                    continue
+                manuscript_id = str(record.get("id") or f"line-{line_no}")
+                if manuscript_id in seen:
+                    yield (
+                        f"{manuscript_id}#line-{line_no}",
+                        _failing_loader(f"중복 id: {manuscript_id} (JSONL {line_no}번째 줄)"),
+                    )
+                    continue
+                seen.add(manuscript_id)
+                text = record.get("text", "")
+                yield manuscript_id, (lambda t=text: load_from_text_input(t))
+        return
+
+    raise ValueError(f"디렉터리 또는 .jsonl 파일만 지원합니다: {source}")
+
+
+def _output_path(output_dir: Path, manuscript_id: str) -> Path:
+    """결과 파일 경로: 파일 이름에 못 쓰는 문자를 "_"로 바꾸면 id가 겹칠 수 있어("a/b", "a_b") 원래 id의 해시를 붙임"""
+    safe_id = re.sub(r"[^0-9A-Za-z가-힣._-]+", "_", manuscript_id).strip("_") or "manuscript"
+    digest = hashlib.sha256(manuscript_id.encode("utf-8")).hexdigest()[:ID_HASH_CHARS]
+    return output_dir / f"{safe_id}-{digest}.json"
+
+
+# =========================
+# 통계
+# =========================
+def percentile(values: list, pct: float) -> float:
+    """nearest-rank 방식 백분위 (values가 비어 있으면 0)"""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[min(rank, len(ordered)) - 1]
+
+
+def format_report(latencies: list, failures: int, skipped: int, wall_time: float, partial: int = 0) -> str:
+    done = len(latencies)
+    throughput = done / wall_time if wall_time > 0 else 0.0
+    return "\n".join([
+        "=== 배치 분석 결과 ===",
+        f"완료: {done}건 / 부분 실패: {partial}건 / 실패: {failures}건 / 건너뜀: {skipped}건",
+        f"전체 소요 시간: {wall_time:.2f}s",
+        f"처리량: {throughput:.2f} 원고/s ({throughput * 60:.1f} 원고/min)",
+        f"지연시간 p50: {percentile(latencies, 50):.2f}s",
+        f"지연시간 p95: {percentile(latencies, 95):.2f}s",
+        f"지연시간 p99: {percentile(latencies, 99):.2f}s",
+    ])
+
+
+# =========================
+# 실행
+# =========================
+async def run_batch(
+    source: str,
+    output_dir: str,
+    concurrency: int = 4,
+    skip_existing: bool = False,
+    speculative: bool | None = None,
+) -> dict:
+    """
+    배치 분석 실행
+    - concurrency개의 워커가 원고 목록을 나눠서 처리
+    - 예외로 끝난 원고는 실패, 결과에 노드 에러(errors)가 남은 원고는 부분 실패 (둘 다 지연시간 통계에서 제외)
+    - speculative: 게이트 노드 결과를 기다리지 않고 다음 노드를 미리 실행 (None이면 환경 변수 설정)
+    """
+    out_dir = Path(output_dir)
+    out_dir.mkdir(parents=True, exist_ok=True)
+
+    manuscripts = iter_manuscripts(source)
+    latencies = []
+    failures = 0
+    partial = 0
+    skipped = 0
+
+    async def worker():
+        nonlocal failures, partial, skipped
+        # 하나의 이벤트 루프 안이므로 제너레이터를 워커끼리 공유해도 안전
+        for manuscript_id, loader in manuscripts:
+            out_path = _output_path(out_dir, manuscript_id)
+            if skip_existing and out_path.exists():
+                skipped += 1
+                continue
+
+            started = time.perf_counter()
+            record = {"id": manuscript_id}
+            try:
+                text = await asyncio.to_thread(loader)
+                result = await arun_langgraph_pipeline(text, speculative=speculative)
+                result.pop("text", None)
+                record["result"] = result
+            except Exception as e:
+                failures += 1
+                record["error"] = str(e)
+            elapsed = time.perf_counter() - started
+            record["elapsed"] = round(elapsed, 3)
+
+            if "error" in record:
+                status = "FAIL"
+            elif record["result"].get("errors"):
+                # 노드 에러는 예외 대신 result["errors"]에 남으므로 따로 집계
+                partial += 1
+                status = "PARTIAL"
+            else:
+                latencies.append(elapsed)
+                status = "OK"
+
+            out_path.write_text(json.dumps(record, ensure_ascii=False, indent=2), encoding="utf-8")
+            print(f"[{status}] {manuscript_id} ({elapsed:.2f}s)")
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(max(1, concurrency))))
+    wall_time = time.perf_counter() - started
+
+    print(format_report(latencies, failures, skipped, wall_time, partial))
+    return {
+        "completed": len(latencies),
+        "partial": partial,
+        "failed": failures,
+        "skipped": skipped,
+        "wall_time": wall_time,
+        "p50": percentile(latencies, 50),
+        "p95": percentile(latencies, 95),
+        "p99": percentile(latencies, 99),
+    }
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="원고 여러 편을 LangGraph 파이프라인으로 일괄 분석")
+    parser.add_argument("source", help="원고 디렉터리(.txt/.docx/.pdf) 또는 .jsonl 파일")
+    parser.add_argument("-o", "--output-dir", default="results", help="결과 JSON 저장 디렉터리")
+    parser.add_argument("-c", "--concurrency", type=int, default=4, help="동시에 분석할 원고 수")
+    parser.add_argument("--skip-existing", action="store_true", help="결과 파일이 이미 있는 원고는 건너뜀")
+    parser.add_argument("--metrics-jsonl", help="원고별 계측 결과를 JSON lines로 추가할 파일")
+    parser.add_argument("--metrics-port", type=int, default=metrics.METRICS_PORT, help="Prometheus /metrics 엔드포인트 포트 (0이면 끔)")
+    parser.add_argument("--hedge", action="store_true", help="p95보다 느린 LLM 호출에 중복 요청을 보내 꼬리 지연을 줄임 (요청 수 증가)")
+    parser.add_argument("--speculative", action="store_true", default=None,
+                        help="형식 판별 / 점수 평가와 동시에 다음 분석을 미리 시작 (탈락 원고는 호출 수 증가)")
+    args = parser.parse_args(argv)
+
+    if args.hedge:
+        call_policy.DEFAULT_POLICY["hedge"] = True
+    if args.metrics_jsonl:
+        metrics.METRICS_JSONL_PATH = args.metrics_jsonl
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+
+    asyncio.run(run_batch(
+        args.source, args.output_dir, args.concurrency, args.skip_existing, args.speculative,
+    ))
+
+
+if __name__ == "__main__":
+    from dotenv import load_dotenv
+    load_dotenv()
+    main()
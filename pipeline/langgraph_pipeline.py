@@ -1,17 +1,33 @@
-from typing import TypedDict, Optional
-import json
-from langgraph.graph import StateGraph, END
-
-# 기존 노드 함수들
-from nodes.summary_node import summarize_text
-from nodes.genre_node import analyze_genre
-from nodes.style_node import analyze_style
-from nodes.evaluation_node import evaluate_story
-from nodes.character_node import analyze_characters
-from nodes.character_card_node import extract_character_cards
-from nodes.text_type_node import analyze_text_type
+from typing import Annotated, TypedDict, Optional
+import asyncio
+import contextlib
+import operator
+import os
+import threading
+
+# 기존 노드 함수들 (비동기 버전)
+from nodes.summary_node import asummarize_text
+from nodes.genre_node import aanalyze_genre
+from nodes.style_node import aanalyze_style
+from nodes.evaluation_node import aevaluate_story
+from nodes.character_node import aanalyze_characters
+from nodes.character_card_node import aprepare_character_cards, save_series_cards, series_cards_update
+from nodes.text_type_node import aanalyze_text_type, needs_llm_classification
+from nodes.fused_node import aanalyze_overview, aanalyze_deep
 from nodes.score_gate_node import score_gate_node, route_by_score
 from nodes.route_node import route_by_text_type
+from utils import metrics
+from utils.async_runner import iter_sync, run_sync
+from utils.call_policy import backoff_delay, get_policy
+from utils.openai_client import is_retryable_error
+from utils.speculation import current_speculation, is_speculative, speculation_scope
+from utils.file_handler import MAX_CHARS
+from utils.structured_output import extract_json, is_failure
+
+# fused 모드 기본값 (여러 노드 분석을 한 번의 LLM 호출로 묶음)
+FUSED_MODE = os.getenv("NOVEL_REVIEWER_FUSED", "").lower() in ("1", "true", "yes")
+# 추측 실행 기본값 (분기 노드와 동시에 통과를 가정한 다음 노드를 미리 시작, 탈락 시 비용 낭비)
+SPECULATIVE_MODE = os.getenv("NOVEL_REVIEWER_SPECULATIVE", "").lower() in ("1", "true", "yes")
 
 
 # -------------------------
@@ -19,6 +35,8 @@ from nodes.route_node import route_by_text_type
 # -------------------------
 class AnalysisState(TypedDict):
     text: str
+    # 연재 ID: 있으면 캐릭터 카드를 연재별 저장소에 누적하고 새 회차는 바뀐 부분만 추출
+    series_id: Optional[str]
     text_type: Optional[dict] 
     summary: Optional[dict]
     genre: Optional[dict]
@@ -27,123 +45,348 @@ class AnalysisState(TypedDict):
     style: Optional[dict]
     characters: Optional[dict]
     character_cards: Optional[list]
-    errors: Optional[list]
+    # 병렬 브랜치(style / characters / character_cards)의 에러를 합치기 위한 reducer
+    errors: Annotated[list, operator.add]
 
 
 # -------------------------
 # 2. JSON 파싱 유틸
 # -------------------------
 def parse_llm_response(response):
-    """LLM 응답을 dict로 안전하게 변환"""
-    if isinstance(response, dict):
-        return response
+    """
+    LLM 응답을 dict로 안전하게 변환
+    - 노드 함수는 구조화 출력(utils.structured_output)으로 검증된 값을 반환하므로 대부분 그대로 통과
+    """
     if isinstance(response, str):
-        try:
-            # 코드펜스 제거
-            cleaned = response.strip().strip('`').strip()
-            if cleaned.lower().startswith('json'):
-                cleaned = cleaned[4:].strip()
-            return json.loads(cleaned)
-        except:
+        data, _ = extract_json(response)
+        if data is None:
+            metrics.record_parse_failure()
             return {"raw_response": response, "parse_error": True}
+        return data
     return response
 
 
 # -------------------------
 # 3. 에러 처리 래퍼
 # -------------------------
-def safe_node_wrapper(node_func):
-    """노드 실행 중 에러를 상태에 기록하는 래퍼"""
-    def wrapper(state: AnalysisState):
-        try:
-            return node_func(state)
-        except Exception as e:
-            errors = state.get("errors", [])
-            if errors is None:
-                errors = []
-            errors.append({
-                "node": node_func.__name__,
-                "error": str(e)
-            })
-            return {**state, "errors": errors}
+def _notify_retry(node: str, attempt: int) -> None:
+    # 스트리밍 실행이면 UI가 이미 받은 토큰을 지울 수 있도록 재실행을 알림
+    from langgraph.config import get_config, get_stream_writer
+
+    if get_config().get("configurable", {}).get("stream_tokens"):
+        get_stream_writer()({"node": node, "retry": attempt})
+
+
+def _node_error(node_func, e: Exception) -> dict:
+    metrics.record_error()
+    return {
+        "errors": [{
+            "node": node_func.__name__,
+            "error": str(e)
+        }]
+    }
+
+
+def safe_node_wrapper(node_func, finalize=None):
+    """
+    노드 실행 중 에러를 상태에 기록하는 래퍼
+    - 공유 리스트에 append 하지 않고 새 에러만 반환
+    - 병렬 브랜치의 에러는 errors reducer(operator.add)가 합침
+    - 호출 단위 재시도를 모두 쓰고도 일시적 API 오류로 실패하면 노드 예산(node_retries)만큼
+      백오프 후 노드를 다시 실행 (이미 끝난 호출은 LLM 캐시 / chunk 저장소에서 바로 반환됨)
+    - 노드 실행 시간과 노드 안의 LLM 호출 계측값을 그래프 노드 이름으로 기록
+    - 추측 실행 중이면 미리 계산된 결과를 먼저 확인 (utils.speculation)
+    - finalize(state, result): 결과가 채택된 뒤에만 하는 부수 효과 (연재 저장소 쓰기 등)
+      추측 실행 작업 안에서는 실행되지 않으므로 게이트에서 폐기된 결과는 밖으로 남지 않음
+    """
+    async def run(state: AnalysisState, name: str):
+        node_retries = get_policy(name)["node_retries"]
+        for attempt in range(node_retries + 1):
+            try:
+                return await node_func(state)
+            except Exception as e:
+                if attempt < node_retries and is_retryable_error(e):
+                    metrics.record_node_retry()
+                    _notify_retry(name, attempt + 1)
+                    await asyncio.sleep(backoff_delay(attempt))
+                    continue
+                return _node_error(node_func, e)
+
+    async def wrapper(state: AnalysisState):
+        from langgraph.config import get_config
+
+        name = get_config().get("metadata", {}).get("langgraph_node", node_func.__name__)
+        speculation = current_speculation()
+        with metrics.node_scope(name):
+            result = None
+            if speculation is not None:
+                # 이 노드가 게이트면 다음 노드를 미리 시작, 미리 시작된 노드면 그 결과를 사용
+                speculation.launch(name, state)
+                result = await speculation.take(name, state)
+            if result is None:
+                result = await run(state, name)
+            if finalize is not None and "errors" not in result:
+                try:
+                    result = await finalize(state, result)
+                except Exception as e:
+                    result = _node_error(node_func, e)
+            return result
     return wrapper
 
 
 # -------------------------
 # 4. LangGraph용 노드 래퍼
+#    - 병렬 실행 시 키 충돌이 없도록 자신이 채우는 키만 반환
+#    - 요약 노드만 원고 전체를 chunk 단위로 읽고,
+#      나머지 노드는 프롬프트 한도(MAX_CHARS)까지만 전달
 # -------------------------
-def text_type_node(state: AnalysisState) -> AnalysisState:
-    result = analyze_text_type(state["text"])
+def _llm_text(state: AnalysisState) -> str:
+    return state["text"][:MAX_CHARS]
+
+
+def _token_writer(node: str):
+    """
+    토큰 스트리밍 실행(stream_langgraph_pipeline)이면 LLM 응답 조각을
+    custom 스트림으로 내보내는 콜백 반환 (일반 실행이면 None → 스트리밍 호출 안 함)
+    """
+    from langgraph.config import get_config, get_stream_writer
+
+    # 추측 실행은 채택될지 모르므로 토큰을 내보내지 않음 (채택되면 노드 결과로 한 번에 표시)
+    if is_speculative() or not get_config().get("configurable", {}).get("stream_tokens"):
+        return None
+    writer = get_stream_writer()
+    return lambda token: writer({"node": node, "token": token})
+
+
+async def text_type_node(state: AnalysisState) -> AnalysisState:
+    result = await aanalyze_text_type(_llm_text(state))
     return {
-        **state,
         "text_type": result
     }
 
-def summary_node(state: AnalysisState) -> AnalysisState:
-    result = summarize_text(state["text"])
+async def summary_node(state: AnalysisState) -> AnalysisState:
+    result = await asummarize_text(state["text"], on_token=_token_writer("summary"))
     # summary_node는 이미 dict를 반환하므로 파싱 불필요
     return {
-        **state,
         "summary": result,
     }
 
 
-def genre_node(state: AnalysisState) -> AnalysisState:
-    result = analyze_genre(state["text"], state["summary"])
+async def genre_node(state: AnalysisState) -> AnalysisState:
+    result = await aanalyze_genre(_llm_text(state), state["summary"])
     return {
-        **state,
         "genre": parse_llm_response(result),
     }
 
 
-def style_node(state: AnalysisState) -> AnalysisState:
-    # summary 정보 전달
-    result = analyze_style(state["text"], state.get("summary"))
+async def style_node(state: AnalysisState) -> AnalysisState:
+    # summary 정보 전달 (문체 지표 / 반복 표현은 원고 전체로 계산하고 LLM에는 발췌만 보냄)
+    result = await aanalyze_style(state["text"], state.get("summary"))
     return {
-        **state,
         "style": parse_llm_response(result),
     }
 
 
-def evaluation_node(state: AnalysisState) -> AnalysisState:
+async def evaluation_node(state: AnalysisState) -> AnalysisState:
     genre = state.get("genre")
     if not genre:
         return {
-            **state,
             "evaluation": {
                 "error": "장르 분석 실패로 평가를 진행할 수 없습니다."
             }
         }
 
-    result = evaluate_story(state["text"], genre)
+    # 원고 전체를 넘김: 도입 / 전개 구간별 / 결말 발췌를 고정 토큰 예산 안에서 골라 보냄
+    result = await aevaluate_story(state["text"], genre, state.get("summary"))
     return {
-        **state,
         "evaluation": parse_llm_response(result),
     }
 
 
 
-def character_node(state: AnalysisState) -> AnalysisState:
-    result = analyze_characters(state["text"])
+def _character_observations(state: AnalysisState):
+    # 긴 원고는 summary 단계에서 chunk별 인물 관찰이 모여 있음
+    return (state.get("summary") or {}).get("character_observations")
+
+
+async def character_node(state: AnalysisState) -> AnalysisState:
+    # 원고 전체를 넘김: 인물 색인으로 고른 인물별 발췌만 LLM에 보냄
+    result = await aanalyze_characters(state["text"], _character_observations(state))
     return {
-        **state,
         "characters": parse_llm_response(result),
     }
 
 
-def character_card_node(state: AnalysisState) -> AnalysisState:
-    result = extract_character_cards(state["text"])
+# 연재 저장소에 아직 쓰지 않은 카드 변경분 (노드 결과에만 실리고 save_series_cards_step이 꺼내 저장)
+SERIES_CARDS_PENDING = "_series_cards_pending"
+
+
+async def character_card_node(state: AnalysisState) -> AnalysisState:
+    # 추출만 함: 추측 실행으로 미리 시작해도 저장소는 바꾸지 않음
+    result, pending = await aprepare_character_cards(
+        state["text"], _character_observations(state), state.get("series_id"),
+    )
     return {
-        **state,
         "character_cards": parse_llm_response(result),
+        SERIES_CARDS_PENDING: pending,
     }
 
 
+async def save_series_cards_step(state: AnalysisState, result: dict) -> dict:
+    """
+    카드 노드 / deep 노드의 finalize: 결과가 채택된 뒤 연재 저장소에 변경분을 저장
+    - 상태에는 저장소에 합친 연재 전체 카드를 남김
+    """
+    pending = result.pop(SERIES_CARDS_PENDING, None)
+    if pending:
+        result["character_cards"] = await asyncio.to_thread(save_series_cards, pending)
+    return result
+
+
+
+# fused 모드 노드: 하나의 LLM 호출 결과를 기존 상태 키로 나눠 반환
+async def overview_node(state: AnalysisState) -> AnalysisState:
+    result = await aanalyze_overview(state["text"])
+    return {
+        "summary": result["summary"],
+        "genre": parse_llm_response(result["genre"]),
+    }
+
+
+async def deep_analysis_node(state: AnalysisState) -> AnalysisState:
+    # 원고 전체를 넘김: 문체 지표 / 반복 표현 / 인물 색인은 전체로 계산하고 LLM에는 발췌만 보냄
+    result = await aanalyze_deep(state["text"], state.get("summary"), _character_observations(state))
+    cards = result["character_cards"]
+    pending = None
+    if state.get("series_id") and not is_failure(cards):
+        # fused 호출은 카드 전체를 다시 뽑으므로 저장된 카드에 합칠 변경분으로 넘김 (저장은 finalize)
+        pending = await asyncio.to_thread(series_cards_update, state["series_id"], state["text"], cards)
+    return {
+        "style": result["style"],
+        "characters": result["characters"],
+        "character_cards": cards,
+        SERIES_CARDS_PENDING: pending,
+    }
+
 
 # -------------------------
 # 5. 그래프 구성
 # -------------------------
-def build_langgraph_pipeline():
+DEEP_ANALYSIS_NODES = ["style", "characters", "character_cards"]
+
+
+def route_deep_analysis(state: AnalysisState):
+    """score_gate 통과 시 심화 분석 노드 전체로 분기, 아니면 종료"""
+    from langgraph.graph import END
+
+    if route_by_score(state) == "deep":
+        return DEEP_ANALYSIS_NODES
+    return END
+
+
+def _speculative_router(router, path_map: dict | None = None):
+    """
+    라우터 래퍼: 결정이 나면 선택되지 않은 노드의 추측 작업을 취소
+    (추측 실행이 꺼져 있으면 라우터 결과만 그대로 반환)
+    """
+    def route(state: AnalysisState):
+        decision = router(state)
+        speculation = current_speculation()
+        if speculation is not None:
+            targets = path_map[decision] if path_map else decision
+            speculation.keep_only(targets if isinstance(targets, list) else [targets])
+        return decision
+    return route
+
+
+# 추측 실행 계획: {함께 시작하는 노드: {미리 시작할 노드: 결과가 의존하는 상태 키}}
+# - text_type 판별(LLM)과 동시에 요약 / overview 시작 (소설 원문 가정)
+# - 심화 분석은 입력(원문 + 요약)이 준비되는 즉시 시작 (점수 통과 가정)
+#   기본 그래프는 genre + evaluation, fused 그래프는 evaluation 왕복과 겹침
+SPECULATION_PLANS = {
+    False: {
+        "text_type": {"summary": ("text",)},
+        "genre": {node: ("text", "summary") for node in DEEP_ANALYSIS_NODES},
+    },
+    True: {
+        "text_type": {"overview": ("text",)},
+        "evaluation": {"deep": ("text", "summary")},
+    },
+}
+
+
+def _text_type_needs_llm(state: AnalysisState) -> bool:
+    # 로컬 규칙으로 바로 판별되면 게이트가 즉시 끝나므로 미리 시작할 이득이 없음
+    return needs_llm_classification(_llm_text(state))
+
+
+def _speculation(fused: bool, speculative: bool):
+    if not speculative:
+        return contextlib.nullcontext()
+    nodes = {
+        "summary": summary_node,
+        "style": style_node,
+        "characters": character_node,
+        "character_cards": character_card_node,
+        "overview": overview_node,
+        "deep": deep_analysis_node,
+    }
+    return speculation_scope(SPECULATION_PLANS[fused], nodes, {"text_type": _text_type_needs_llm})
+
+
+def build_fused_langgraph_pipeline():
+    """
+    fused 모드 그래프
+    text_type → overview(요약+키워드+장르) → evaluation → score_gate → deep(문체+캐릭터+카드)
+    - 소설 원고 기준 LLM 호출이 최대 8번 → 3번(+text_type)으로 줄어듦
+    """
+    from langgraph.graph import StateGraph, END
+
+    workflow = StateGraph(AnalysisState)
+
+    workflow.add_node("text_type", safe_node_wrapper(text_type_node))
+    workflow.add_node("overview", safe_node_wrapper(overview_node))
+    workflow.add_node("evaluation", safe_node_wrapper(evaluation_node))
+    workflow.add_node("score_gate", score_gate_node)
+    workflow.add_node("deep", safe_node_wrapper(deep_analysis_node, save_series_cards_step))
+
+    workflow.set_entry_point("text_type")
+
+    # 시나리오/플롯도 overview를 거침 (장르와 함께 요약이 추가 비용 없이 생성됨)
+    text_type_paths = {
+        "novel": "overview",
+        "planning": "overview",
+        "unknown": END,
+    }
+    workflow.add_conditional_edges(
+        "text_type",
+        _speculative_router(route_by_text_type, text_type_paths),
+        text_type_paths,
+    )
+
+    workflow.add_edge("overview", "evaluation")
+    workflow.add_edge("evaluation", "score_gate")
+
+    score_paths = {
+        "deep": "deep",
+        "stop": END,
+    }
+    workflow.add_conditional_edges(
+        "score_gate",
+        _speculative_router(route_by_score, score_paths),
+        score_paths,
+    )
+    workflow.add_edge("deep", END)
+
+    return workflow.compile()
+
+
+def build_langgraph_pipeline(fused: bool = False):
+    if fused:
+        return build_fused_langgraph_pipeline()
+
+    from langgraph.graph import StateGraph, END
+
     workflow = StateGraph(AnalysisState)
 
     # 노드 등록
@@ -154,20 +397,21 @@ def build_langgraph_pipeline():
     workflow.add_node("score_gate", score_gate_node)
     workflow.add_node("style", safe_node_wrapper(style_node))
     workflow.add_node("characters", safe_node_wrapper(character_node))
-    workflow.add_node("character_cards", safe_node_wrapper(character_card_node))
+    workflow.add_node("character_cards", safe_node_wrapper(character_card_node, save_series_cards_step))
 
     # 시작 지점
     workflow.set_entry_point("text_type")
 
     # ===== 1. 텍스트 타입 분기 =====
+    text_type_paths = {
+        "novel": "summary",     # 소설 원문
+        "planning": "genre",    # 시나리오/플롯
+        "unknown": END,
+    }
     workflow.add_conditional_edges(
         "text_type",
-        route_by_text_type,
-        {
-            "novel": "summary",     # 소설 원문
-            "planning": "genre",    # 시나리오/플롯
-            "unknown": END,
-        }
+        _speculative_router(route_by_text_type, text_type_paths),
+        text_type_paths,
     )
 
     # ===== 2. 공통 평가 흐름 =====
@@ -178,19 +422,16 @@ def build_langgraph_pipeline():
     workflow.add_edge("evaluation", "score_gate")
 
     # ===== 3. 점수 기반 분기 =====
+    # 70점 이상이면 심화 분석 노드들을 동시에 실행 (fan-out)
     workflow.add_conditional_edges(
         "score_gate",
-        route_by_score,
-        {
-            "deep": "style",  # 70점 이상
-            "stop": END,     # 70점 미만
-        }
+        _speculative_router(route_deep_analysis),
+        DEEP_ANALYSIS_NODES + [END],
     )
 
     # ===== 4. 심화 분석 =====
-    workflow.add_edge("style", "characters")
-    workflow.add_edge("characters", "character_cards")
-    workflow.add_edge("character_cards", END)
+    # 서로의 결과를 읽지 않으므로 병렬 브랜치로 실행 후 END에서 합류 (fan-in)
+    workflow.add_edge(DEEP_ANALYSIS_NODES, END)
 
     return workflow.compile()
 
@@ -198,36 +439,149 @@ def build_langgraph_pipeline():
 # -------------------------
 # 6. 외부 호출용 실행 함수
 # -------------------------
-_langgraph_pipeline = build_langgraph_pipeline()
+# 그래프는 처음 실행할 때 한 번만 컴파일 (import만 하는 프로세스는 langgraph를 불러오지 않음)
+_pipelines = {}
+_pipelines_lock = threading.Lock()
+
+
+def _get_pipeline(fused: bool):
+    graph = _pipelines.get(fused)
+    if graph is None:
+        with _pipelines_lock:
+            graph = _pipelines.get(fused)
+            if graph is None:
+                graph = _pipelines[fused] = build_langgraph_pipeline(fused)
+    return graph
 
 
-def run_langgraph_pipeline(text: str) -> dict:
+def _initial_state(text: str, series_id: Optional[str] = None) -> AnalysisState:
+    return {
+        # 모든 노드가 같은 원고 문자열로 프롬프트를 시작해야 provider prefix cache가 적중함
+        "text": text.strip(),
+        "series_id": series_id,
+        "text_type": None,
+        "summary": None,
+        "genre": None,
+        "evaluation": None,
+        "score_gate": None,
+        "style": None,
+        "characters": None,
+        "character_cards": None,
+        "errors": [],
+    }
+
+
+def _run_metrics(run, speculation) -> dict:
+    # 노드별 지연 시간 / 토큰 / 재시도 / 캐시 적중 / 파싱 실패 (+ 추측 실행 결과와 낭비 비율)
+    report = run.to_dict()
+    if speculation is not None:
+        report["speculation"] = speculation.report(run)
+    return report
+
+
+async def arun_langgraph_pipeline(
+    text: str,
+    fused: Optional[bool] = None,
+    speculative: Optional[bool] = None,
+    series_id: Optional[str] = None,
+) -> dict:
     """
-    LangGraph 기반 분석 파이프라인 실행 함수
+    LangGraph 기반 분석 파이프라인 실행 함수 (asyncio)
+    - 모든 노드가 AsyncOpenAI로 호출되므로 하나의 이벤트 루프에서
+      여러 원고를 동시에 처리 가능
     
     Args:
         text: 분석할 소설 원문
+        fused: True면 여러 노드 분석을 묶어서 호출 (None이면 NOVEL_REVIEWER_FUSED 설정)
+        speculative: True면 분기 노드와 동시에 다음 노드를 미리 실행 (None이면 NOVEL_REVIEWER_SPECULATIVE 설정)
+        series_id: 연재 ID (있으면 캐릭터 카드를 연재별로 누적하고 새 회차는 바뀐 부분만 추출)
         
     Returns:
         모든 분석 결과를 포함한 dict
     """
-    result = _langgraph_pipeline.invoke(
-        {
-            "text": text,
-            "text_type": None,
-            "summary": None,
-            "genre": None,
-            "evaluation": None,
-            "score_gate": None,
-            "style": None,
-            "characters": None,
-            "character_cards": None,
-            "errors": [],
-        }
-    )
+    if fused is None:
+        fused = FUSED_MODE
+    if speculative is None:
+        speculative = SPECULATIVE_MODE
+
+    with metrics.run_scope() as run:
+        async with _speculation(fused, speculative) as speculation:
+            result = await _get_pipeline(fused).ainvoke(_initial_state(text, series_id))
+    result["metrics"] = _run_metrics(run, speculation)
     return result
 
 
+def run_langgraph_pipeline(
+    text: str,
+    fused: Optional[bool] = None,
+    speculative: Optional[bool] = None,
+    series_id: Optional[str] = None,
+) -> dict:
+    """
+    LangGraph 기반 분석 파이프라인 실행 함수
+    - arun_langgraph_pipeline의 동기 래퍼
+    
+    Args:
+        text: 분석할 소설 원문
+        fused: True면 여러 노드 분석을 묶어서 호출 (None이면 NOVEL_REVIEWER_FUSED 설정)
+        speculative: True면 분기 노드와 동시에 다음 노드를 미리 실행 (None이면 NOVEL_REVIEWER_SPECULATIVE 설정)
+        series_id: 연재 ID (있으면 캐릭터 카드를 연재별로 누적하고 새 회차는 바뀐 부분만 추출)
+        
+    Returns:
+        모든 분석 결과를 포함한 dict
+    """
+    return run_sync(arun_langgraph_pipeline(text, fused, speculative, series_id))
+
+
+async def astream_langgraph_pipeline(
+    text: str,
+    fused: Optional[bool] = None,
+    speculative: Optional[bool] = None,
+    series_id: Optional[str] = None,
+):
+    """
+    분석 파이프라인을 실행하면서 진행 상황을 이벤트로 생성 (asyncio)
+    - ("update", 노드 이름, 그 노드가 반환한 상태 변경분): 노드가 끝날 때마다
+    - ("token", 노드 이름, 응답 조각): 요약처럼 텍스트로 답하는 LLM 호출의 생성 중간 결과
+    - ("retry", 노드 이름, 재실행 번호): 노드가 일시적 오류로 다시 실행됨 (그 노드의 토큰은 처음부터 다시 옴)
+    - ("metrics", "run", 계측 결과): 마지막에 한 번
+    """
+    if fused is None:
+        fused = FUSED_MODE
+    if speculative is None:
+        speculative = SPECULATIVE_MODE
+
+    with metrics.run_scope() as run:
+        async with _speculation(fused, speculative) as speculation:
+            stream = _get_pipeline(fused).astream(
+                _initial_state(text, series_id),
+                config={"configurable": {"stream_tokens": True}},
+                stream_mode=["updates", "custom"],
+            )
+            async for mode, chunk in stream:
+                if mode == "custom":
+                    if "retry" in chunk:
+                        yield ("retry", chunk["node"], chunk["retry"])
+                    else:
+                        yield ("token", chunk["node"], chunk["token"])
+                    continue
+                for node, update in chunk.items():
+                    yield ("update", node, update or {})
+    yield ("metrics", "run", _run_metrics(run, speculation))
+
+
+def stream_langgraph_pipeline(
+    text: str,
+    fused: Optional[bool] = None,
+    speculative: Optional[bool] = None,
+    series_id: Optional[str] = None,
+):
+    """
+    astream_langgraph_pipeline의 동기 버전 (Streamlit 등에서 for 문으로 소비)
+    """
+    return iter_sync(astream_langgraph_pipeline(text, fused, speculative, series_id))
+
+
 # -------------------------
 # 7. 디버깅용 (선택사항)
 # -------------------------
@@ -7,12 +7,12 @@ from nodes.character_node import analyze_characters
 from nodes.character_card_node import extract_character_cards
 from nodes.style_node import analyze_style
 
-def run_pipeline(text: str) -> dict:
+def run_pipeline(text: str, series_id: str | None = None) -> dict:
     summary_info = summarize_text(text) # 요약
     genre_info = analyze_genre(text, summary_info) # 장르
-    evaluation_info = evaluate_story(text, genre_info) # 시장성, 개연성, 독창성
+    evaluation_info = evaluate_story(text, genre_info, summary_info) # 시장성, 개연성, 독창성
     character_info = analyze_characters(text) # 캐릭터성 유지 여부
-    character_cards = extract_character_cards(text) # 캐릭터 카드 추출
+    character_cards = extract_character_cards(text, series_id=series_id) # 캐릭터 카드 추출 (연재 ID가 있으면 새 부분만)
     style_info = analyze_style(text) # 문체 분석
 
     return {
@@ -0,0 +1,62 @@
+''' 배치 실행기(pipeline.batch)의 입력 / 결과 집계
+    - 깨진 JSONL 줄, 겹치는 결과 파일 이름, 노드 에러가 남은 결과 처리 확인'''
+
+import asyncio
+import json
+
+from pipeline import batch
+
+
+def _write_jsonl(path, lines):
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+    return str(path)
+
+
+def test_bad_jsonl_line_becomes_failing_entry(tmp_path):
+    source = _write_jsonl(tmp_path / "in.jsonl", [
+        json.dumps({"id": "a", "text": "본문"}),
+        "{bad json",
+        json.dumps({"id": "b", "text": "본문"}),
+    ])
+    entries = list(batch.iter_manuscripts(source))
+    assert [manuscript_id for manuscript_id, _ in entries] == ["a", "line-2", "b"]
+    try:
+        entries[1][1]()
+    except ValueError as e:
+        assert "2번째 줄" in str(e)
+    else:
+        raise AssertionError("깨진 줄의 loader가 실패하지 않음")
+
+
+def test_duplicate_jsonl_id_gets_its_own_failing_entry(tmp_path):
+    source = _write_jsonl(tmp_path / "in.jsonl", [
+        json.dumps({"id": "a", "text": "첫 번째"}),
+        json.dumps({"id": "a", "text": "두 번째"}),
+    ])
+    ids = [manuscript_id for manuscript_id, _ in batch.iter_manuscripts(source)]
+    assert ids == ["a", "a#line-2"]
+    assert len({batch._output_path(tmp_path, i) for i in ids}) == 2
+
+
+def test_output_paths_do_not_collide_after_sanitising(tmp_path):
+    assert batch._output_path(tmp_path, "a/b") != batch._output_path(tmp_path, "a_b")
+    assert batch._output_path(tmp_path, "a/b") == batch._output_path(tmp_path, "a/b")
+
+
+def test_run_batch_counts_failures_and_partial_results(tmp_path, monkeypatch):
+    async def fake_pipeline(text, speculative=None):
+        errors = [{"node": "evaluation_node", "error": "429"}] if "에러" in text else []
+        return {"text": text, "errors": errors}
+
+    monkeypatch.setattr(batch, "arun_langgraph_pipeline", fake_pipeline)
+    source = _write_jsonl(tmp_path / "in.jsonl", [
+        json.dumps({"id": "ok", "text": "정상 원고"}),
+        "{bad json",
+        json.dumps({"id": "partial", "text": "에러 원고"}),
+    ])
+    out_dir = tmp_path / "out"
+
+    report = asyncio.run(batch.run_batch(source, str(out_dir), concurrency=2))
+
+    assert (report["completed"], report["partial"], report["failed"]) == (1, 1, 1)
+    assert len(list(out_dir.glob("*.json"))) == 3
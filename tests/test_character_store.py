@@ -0,0 +1,102 @@
+''' 연재별 캐릭터 카드 저장소(utils.character_store)와 카드 노드의 delta 추출
+    - 카드 합치기 규칙과, 이미 읽은 chunk를 다시 보내지 않는지 확인 (저장소는 메모리 SQLite)'''
+
+import pytest
+
+from nodes import character_card_node
+from utils.character_store import MAX_PERSONALITY_KEYWORDS, CharacterStore, merge_cards, same_character
+
+EPISODE_1 = "제1화\n\n" + "\n\n".join(
+    f"강도현은 {i}번째 골목에서 발걸음을 멈췄다. 서하윤이 그의 뒤를 조용히 따라왔다." for i in range(20)
+)
+EPISODE_2 = "제2화\n\n" + "\n\n".join(
+    f"한유진이 {i}번째 문을 열었다. 강도현은 낯선 얼굴을 경계했다." for i in range(20)
+)
+
+
+def _card(name, role="조연", keywords=(), traits="설명", warning=""):
+    return {
+        "name": name,
+        "role": role,
+        "personality_keywords": list(keywords),
+        "core_traits": traits,
+        "warning_point": warning,
+    }
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = CharacterStore(":memory:")
+    monkeypatch.setattr(character_card_node, "get_character_store", lambda: store)
+    return store
+
+
+@pytest.fixture
+def llm(monkeypatch):
+    """카드 노드의 LLM 호출 대역: 호출된 프롬프트를 기록하고 responses의 카드를 차례로 반환"""
+    class FakeLLM:
+        def __init__(self):
+            self.prompts = []
+            self.responses = []
+
+        def __call__(self, messages, name, schema, temperature=0.3):
+            self.prompts.append("\n".join(m["content"] for m in messages))
+            return {"cards": self.responses.pop(0) if self.responses else []}
+
+    fake = FakeLLM()
+    monkeypatch.setattr(character_card_node, "structured_completion", fake)
+    return fake
+
+
+def test_same_character_matches_given_name_and_full_name():
+    assert same_character("도현", "강도현")
+    assert same_character(" 강도현 ", "강도현")
+    assert not same_character("현", "강현")
+    assert not same_character("도현", "서하윤")
+
+
+def test_merge_cards_merges_alias_into_stored_card():
+    stored = [_card("강도현", keywords=["과묵"])]
+    merged, changed = merge_cards(stored, [_card("도현", keywords=["헌신"])])
+    assert [c["name"] for c in merged] == ["강도현"]
+    assert merged[0]["personality_keywords"] == ["과묵", "헌신"]
+    assert [c["name"] for c in changed] == ["강도현"]
+
+
+def test_merge_cards_keeps_stored_values_over_unknown():
+    stored = [_card("강도현", role="조연", traits="주인공의 오랜 호위.", warning="감정 표현이 드묾")]
+    update = _card("강도현", role="미상", traits="확인 불가", warning="", keywords=["없음"])
+    merged, changed = merge_cards(stored, [update])
+    assert merged == stored
+    assert changed == []
+
+
+def test_merge_cards_caps_personality_keywords():
+    stored = [_card("강도현", keywords=[f"기존{i}" for i in range(MAX_PERSONALITY_KEYWORDS - 1)])]
+    merged, _ = merge_cards(stored, [_card("강도현", keywords=["새1", "새2", "새3"])])
+    keywords = merged[0]["personality_keywords"]
+    assert len(keywords) == MAX_PERSONALITY_KEYWORDS
+    assert keywords[-1] == "새1"
+
+
+def test_resubmission_without_new_chunks_makes_no_llm_call(store, llm):
+    llm.responses = [[_card("강도현", role="주인공"), _card("서하윤")]]
+    first = character_card_node.extract_character_cards(EPISODE_1, series_id="s1")
+    second = character_card_node.extract_character_cards(EPISODE_1, series_id="s1")
+    assert len(llm.prompts) == 1
+    assert [c["name"] for c in second] == [c["name"] for c in first] == ["강도현", "서하윤"]
+    assert [c["name"] for c in store.get_cards("s1")] == ["강도현", "서하윤"]
+
+
+def test_first_episode_without_cards_switches_to_delta(store, llm):
+    llm.responses = [[], [_card("한유진")]]
+    assert character_card_node.extract_character_cards(EPISODE_1, series_id="s1") == []
+    assert store.has_series("s1")
+    assert store.get_cards("s1") == []
+
+    cards = character_card_node.extract_character_cards(EPISODE_1 + "\n\n" + EPISODE_2, series_id="s1")
+    assert len(llm.prompts) == 2
+    # 두 번째 호출은 delta 프롬프트이며 이미 읽은 1화는 보내지 않음
+    assert "새 회차" in llm.prompts[1]
+    assert "1번째 골목" not in llm.prompts[1]
+    assert [c["name"] for c in cards] == ["한유진"]
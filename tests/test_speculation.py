@@ -0,0 +1,76 @@
+''' 추측 실행(utils.speculation)에서 게이트가 탈락시킨 노드의 부수 효과
+    - 점수 게이트 탈락 시 미리 돌린 카드 노드가 연재 저장소에 쓰지 않는지 확인
+    - LLM은 벤치마크용 가짜 서버(benchmarks.fake_openai_server)로 대신함'''
+
+import pytest
+
+import benchmarks.fake_openai_server as fake_server
+from benchmarks.run_benchmark import make_manuscript
+from nodes import character_card_node
+from pipeline import langgraph_pipeline
+from utils import llm_cache
+from utils.character_store import CharacterStore
+
+LOW_SCORES = {"82": "30", "78": "30", "75": "30"}
+
+
+@pytest.fixture
+def server(monkeypatch):
+    with fake_server.FakeOpenAIServer(latency_ms=100, latency_sigma=0, tokens_per_sec=0, prefill_ms_per_1k=0) as srv:
+        monkeypatch.setenv("OPENAI_BASE_URL", srv.base_url)
+        monkeypatch.setenv("OPENAI_API_KEY", "test")
+        # 실행마다 실제 호출이 일어나도록 응답 캐시는 끔
+        cache = llm_cache.LLMCache(":memory:")
+        cache.enabled = False
+        monkeypatch.setattr(llm_cache, "_cache", cache)
+        yield srv
+
+
+@pytest.fixture
+def rejecting_evaluation(monkeypatch):
+    """평가 응답의 점수를 낮춰 점수 게이트에서 탈락시킴"""
+    canned = fake_server.canned_response
+
+    def low_scores(messages):
+        content = canned(messages)
+        if "전문 평가 AI" in messages[-1]["content"]:
+            for high, low in LOW_SCORES.items():
+                content = content.replace(high, low)
+        return content
+
+    monkeypatch.setattr(fake_server, "canned_response", low_scores)
+
+
+@pytest.fixture
+def store(monkeypatch):
+    store = CharacterStore(":memory:")
+    monkeypatch.setattr(character_card_node, "get_character_store", lambda: store)
+    return store
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_rejected_speculation_leaves_series_store_empty(server, rejecting_evaluation, store, fused):
+    result = langgraph_pipeline.run_langgraph_pipeline(
+        make_manuscript(3000, 1), fused=fused, speculative=True, series_id="series",
+    )
+
+    assert result["score_gate"]["passed"] is False
+    speculation = result["metrics"]["speculation"]
+    card_node = "deep" if fused else "character_cards"
+    assert card_node in speculation["discarded"]
+    assert speculation["wasted_ratio"] > 0
+    assert not store.has_series("series")
+    assert store.get_cards("series") == []
+    assert langgraph_pipeline.SERIES_CARDS_PENDING not in result
+
+
+@pytest.mark.parametrize("fused", [False, True])
+def test_accepted_speculation_saves_series_cards(server, store, fused):
+    result = langgraph_pipeline.run_langgraph_pipeline(
+        make_manuscript(3000, 1), fused=fused, speculative=True, series_id="series",
+    )
+
+    assert result["score_gate"]["passed"] is True
+    assert store.has_series("series")
+    assert [c["name"] for c in store.get_cards("series")] == [c["name"] for c in result["character_cards"]]
+    assert langgraph_pipeline.SERIES_CARDS_PENDING not in result
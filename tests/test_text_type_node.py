@@ -0,0 +1,84 @@
+''' 로컬 형식 판별기(classify_text_type_locally)의 경계 사례
+    - LLM을 건너뛰는 판정이므로 소설을 시나리오 / 플롯으로 잘못 보내지 않는지 확인'''
+
+from nodes.text_type_node import classify_text_type_locally, needs_llm_classification
+
+PAST_PARAGRAPH = (
+    "그는 오래된 문을 천천히 밀었다. 안쪽은 생각보다 어두웠다. 먼지 냄새가 코끝을 찔렀다.\n"
+    "\"누구 있어요?\" 그가 물었다. 대답은 돌아오지 않았다.\n"
+    "창밖으로 비가 내리기 시작했다. 그는 젖은 외투를 벗어 의자에 걸었다.\n"
+)
+
+PRESENT_PARAGRAPH = (
+    "그는 오래된 문을 천천히 민다. 안쪽은 생각보다 어둡다. 먼지 냄새가 코끝을 찌른다.\n"
+    "창밖으로 비가 내리기 시작한다. 그는 젖은 외투를 벗어 의자에 건다.\n"
+    "그녀는 계단 위에서 그를 내려다본다. 두 사람 사이로 긴 침묵이 흐른다.\n"
+)
+
+PRESENT_SYNOPSIS = (
+    "주인공 민준은 평범한 회사원이지만 밤마다 다른 사람의 꿈에 들어가는 능력을 숨기고 있다. "
+    "어느 날 그는 연쇄 실종 사건의 피해자들이 모두 같은 꿈을 꾸었다는 사실을 알게 된다. "
+    "민준은 능력을 드러내고 수사에 협조할지, 지금의 평범한 삶을 지킬지 선택해야 한다. "
+    "결말은 독자의 반응에 따라 두 갈래 중 하나로 선택될 수 있다. "
+    "전체 이야기는 3부작 구성으로 기획되어 있다.\n"
+)
+
+
+def test_numbered_episode_headings_stay_novel():
+    # "#1." 회차 제목을 쓰는 과거형 소설은 시나리오가 아님
+    text = "".join(f"#{i}. 귀환\n{PAST_PARAGRAPH}" for i in range(1, 4))
+    result = classify_text_type_locally(text)
+    assert result is not None and result["type"] == "novel_text"
+
+
+def test_numbered_scenes_with_speaker_lines_are_scenario():
+    # "#1." 씬 번호라도 '화자: 대사' 줄과 함께 있으면 시나리오
+    scene = "민재: 여긴 어디야?\n하윤: 조용히 해. 누가 온다.\n민재가 문 쪽을 돌아본다.\n바람 소리가 들린다.\n"
+    text = "".join(f"#{i}. 폐공장 안\n{scene}" for i in range(1, 4))
+    result = classify_text_type_locally(text)
+    assert result is not None and result["type"] == "scenario"
+
+
+def test_scene_markers_are_scenario():
+    scene = "S#{}. 거리 / 밤\n민재: 늦었잖아.\n하윤: 미안해.\n"
+    text = "".join(scene.format(i) for i in range(1, 4)) * 3
+    result = classify_text_type_locally(text)
+    assert result is not None and result["type"] == "scenario"
+
+
+def test_present_tense_novel_goes_to_llm():
+    # 대사 없는 현재형 소설은 로컬에서 플롯으로 판정하지 않음
+    text = PRESENT_PARAGRAPH * 3
+    assert classify_text_type_locally(text) is None
+    assert needs_llm_classification(text)
+
+
+def test_present_synopsis_with_iss_da_endings_goes_to_llm():
+    # "있다 / 없다" 종결은 ㅆ 받침이어도 과거형이 아님 → 소설로 로컬 판정하지 않음
+    text = PRESENT_SYNOPSIS * 2
+    assert classify_text_type_locally(text) is None
+    assert needs_llm_classification(text)
+
+
+def test_past_tense_without_dialogue_needs_higher_ratio():
+    # 따옴표 대사가 없으면 과거형 비율이 0.7 이상이어야 로컬에서 소설로 판정
+    narration = "그는 문을 열었다. 방은 비어 있었다. 그는 창가에 앉았다. 바람이 불기 시작한다. 밤은 길다.\n"
+    assert classify_text_type_locally(narration * 4) is None
+
+
+def test_local_novel_reason_mentions_only_observed_dialogue():
+    narration = "그는 문을 열었다. 방은 비어 있었다. 그는 창가에 앉았다. 비가 내리기 시작했다.\n"
+    result = classify_text_type_locally(narration * 4)
+    assert result is not None and result["type"] == "novel_text"
+    assert "대사" not in result["reason"]
+
+
+def test_bullet_list_is_plot():
+    text = "".join(f"- {i}화: 주인공이 황실 기사단에 들어가 첫 임무를 맡는다.\n" for i in range(1, 10))
+    result = classify_text_type_locally(text)
+    assert result is not None and result["type"] == "plot"
+
+
+def test_past_tense_novel_is_local():
+    result = classify_text_type_locally(PAST_PARAGRAPH * 3)
+    assert result is not None and result["type"] == "novel_text"
@@ -0,0 +1,104 @@
+''' 동기 코드에서 비동기 파이프라인을 실행하기 위한 헬퍼
+    - 백그라운드 스레드에서 하나의 이벤트 루프를 계속 돌림
+    - 호출마다 asyncio.run()으로 루프를 새로 만들지 않으므로
+      AsyncOpenAI 커넥션 풀이 호출 간에 재사용됨
+    - Streamlit처럼 이미 루프가 돌고 있는 환경에서도 안전하게 호출 가능
+    - iter_sync(): 비동기 제너레이터를 동기 for 문으로 소비 (진행 상황 스트리밍용)'''
+
+import asyncio
+import contextvars
+import queue
+import threading
+
+_loop = None
+_loop_lock = threading.Lock()
+
+
+def _run_loop(loop: asyncio.AbstractEventLoop) -> None:
+    asyncio.set_event_loop(loop)
+    loop.run_forever()
+
+
+def get_background_loop() -> asyncio.AbstractEventLoop:
+    """백그라운드 이벤트 루프 반환 (최초 호출 시 생성)"""
+    global _loop
+    if _loop is None:
+        with _loop_lock:
+            if _loop is None:
+                loop = asyncio.new_event_loop()
+                thread = threading.Thread(
+                    target=_run_loop,
+                    args=(loop,),
+                    name="novel-reviewer-async",
+                    daemon=True,
+                )
+                thread.start()
+                _loop = loop
+    return _loop
+
+
+async def _run_in_context(context: contextvars.Context, coro):
+    # 호출한 스레드의 contextvar 값(캐시 우회 플래그 등)을 태스크에 그대로 옮김
+    for var, value in context.items():
+        var.set(value)
+    return await coro
+
+
+def _ensure_not_in_loop(loop: asyncio.AbstractEventLoop, name: str) -> None:
+    try:
+        running = asyncio.get_running_loop()
+    except RuntimeError:
+        running = None
+    if running is loop:
+        raise RuntimeError(f"{name}()는 백그라운드 루프 안에서 호출할 수 없습니다. await를 사용하세요.")
+
+
+def run_sync(coro):
+    """코루틴을 백그라운드 루프에서 실행하고 결과를 동기적으로 반환"""
+    loop = get_background_loop()
+    try:
+        _ensure_not_in_loop(loop, "run_sync")
+    except RuntimeError:
+        coro.close()
+        raise
+
+    context = contextvars.copy_context()
+    future = asyncio.run_coroutine_threadsafe(_run_in_context(context, coro), loop)
+    return future.result()
+
+
+_DONE = object()
+
+
+def iter_sync(agen):
+    """
+    비동기 제너레이터를 백그라운드 루프에서 돌리면서 값이 나오는 즉시 동기적으로 yield
+    - 소비하는 쪽이 중간에 멈추면(break / 예외) 백그라운드 작업도 취소
+    """
+    loop = get_background_loop()
+    _ensure_not_in_loop(loop, "iter_sync")
+
+    items = queue.Queue()
+
+    async def pump():
+        try:
+            async for item in agen:
+                items.put((item, None))
+        except BaseException as e:
+            items.put((_DONE, e))
+            raise
+        items.put((_DONE, None))
+
+    context = contextvars.copy_context()
+    future = asyncio.run_coroutine_threadsafe(_run_in_context(context, pump()), loop)
+    try:
+        while True:
+            item, error = items.get()
+            if item is _DONE:
+                if error is not None:
+                    raise error
+                return
+            yield item
+    finally:
+        if not future.done():
+            future.cancel()
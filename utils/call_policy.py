@@ -0,0 +1,124 @@
+''' 노드별 LLM 호출 예산 (재시도 / 백오프 / 타임아웃 / hedging)
+    - 재시도 간격은 full jitter 지수 백오프: 같은 순간에 실패한 호출들이 같은 순간에 다시 몰리지 않음
+    - hedging: 응답이 그 노드의 최근 p95 지연 시간을 넘기면 같은 요청을 한 번 더 보내고 먼저 끝난 응답을 사용
+      (실행 전체의 꼬리 지연은 중앙값이 아니라 소수의 느린 호출이 좌우하므로 느린 호출만 중복 요청)
+    - hedging은 요청이 두 배가 될 수 있으므로 기본 꺼짐 (OPENAI_HEDGE=1 또는 노드별 "hedge": True)
+    - 예산은 그래프 노드 이름(utils.metrics의 node_scope) 기준으로 NODE_POLICIES에서 조정'''
+
+import math
+import os
+import random
+import threading
+from collections import deque
+
+from utils import metrics
+
+# =========================
+# 기본 예산
+# =========================
+MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "3"))
+REQUEST_TIMEOUT = float(os.getenv("OPENAI_REQUEST_TIMEOUT", "120"))
+# 노드 전체를 다시 실행하는 횟수 (호출 단위 재시도를 모두 쓰고도 일시적 오류로 실패한 경우)
+NODE_RETRIES = int(os.getenv("NODE_RETRIES", "1"))
+
+# 백오프: attempt번째 재시도 전 0 ~ min(BACKOFF_MAX, BACKOFF_BASE * 2^attempt)초 대기
+BACKOFF_BASE = float(os.getenv("OPENAI_BACKOFF_BASE", "0.5"))
+BACKOFF_MAX = float(os.getenv("OPENAI_BACKOFF_MAX", "20"))
+
+HEDGE_ENABLED = os.getenv("OPENAI_HEDGE", "").lower() in ("1", "true", "yes")
+# hedge 기준 백분위 / 기준을 계산하기 위한 최소 표본 수 (그 전에는 HEDGE_DEFAULT_DELAY 사용)
+HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))
+HEDGE_MIN_SAMPLES = 20
+HEDGE_DEFAULT_DELAY = float(os.getenv("OPENAI_HEDGE_DEFAULT_DELAY", "20"))
+# 관측 p95가 아무리 짧아도 이보다 빨리 중복 요청하지 않음
+HEDGE_MIN_DELAY = float(os.getenv("OPENAI_HEDGE_MIN_DELAY", "2"))
+# 노드별로 보관하는 최근 응답 시간 개수
+LATENCY_WINDOW = 200
+
+DEFAULT_POLICY = {
+    "max_retries": MAX_RETRIES,     # 호출 하나의 재시도 횟수
+    "timeout": REQUEST_TIMEOUT,     # 시도 한 번의 응답 제한 시간 (초)
+    "node_retries": NODE_RETRIES,   # 노드 재실행 횟수
+    "hedge": HEDGE_ENABLED,
+    "hedge_after": None,            # 고정 hedge 기준(초), None이면 관측 p95
+}
+
+# 노드별 조정값 (없는 키는 DEFAULT_POLICY)
+NODE_POLICIES = {
+    # 짧은 JSON 응답: 오래 기다리기보다 빨리 끊고 다시 보냄
+    "text_type": {"timeout": 30},
+    "genre": {"timeout": 60},
+    "evaluation": {"timeout": 60},
+    # chunk 요약을 수십 번 호출하므로 호출 하나가 노드 전체를 실패시키지 않도록 재시도를 넉넉히
+    "summary": {"max_retries": 5},
+    "overview": {"max_retries": 5},
+}
+
+
+def get_policy(node: str | None = None) -> dict:
+    """노드 예산 반환 (node를 생략하면 현재 node_scope의 노드)"""
+    if node is None:
+        node = metrics.current_node()
+    policy = dict(DEFAULT_POLICY)
+    policy.update(NODE_POLICIES.get(node) or {})
+    return policy
+
+
+def configure_node_policy(node: str, **overrides) -> None:
+    """노드 예산 변경 (예: configure_node_policy("evaluation", hedge=True, hedge_after=8))"""
+    unknown = set(overrides) - set(DEFAULT_POLICY)
+    if unknown:
+        raise ValueError(f"unknown policy keys: {sorted(unknown)}")
+    NODE_POLICIES.setdefault(node, {}).update(overrides)
+
+
+def backoff_delay(attempt: int) -> float:
+    """attempt(0부터)번째 재시도 전 대기 시간 (full jitter 지수 백오프)"""
+    return random.uniform(0, min(BACKOFF_MAX, BACKOFF_BASE * 2 ** attempt))
+
+
+# =========================
+# 노드별 응답 시간 (hedge 기준)
+# =========================
+_latency_lock = threading.Lock()
+_latencies = {}
+
+
+def record_latency(seconds: float, node: str | None = None) -> None:
+    """성공한 호출 하나의 응답 시간 (limiter 대기 제외)"""
+    if node is None:
+        node = metrics.current_node() or metrics.UNSCOPED_NODE
+    with _latency_lock:
+        window = _latencies.get(node)
+        if window is None:
+            window = _latencies[node] = deque(maxlen=LATENCY_WINDOW)
+        window.append(seconds)
+
+
+def latency_percentile(node: str, pct: float = HEDGE_PERCENTILE) -> float | None:
+    """노드의 최근 응답 시간 백분위 (표본이 부족하면 None)"""
+    with _latency_lock:
+        window = sorted(_latencies.get(node) or ())
+    if len(window) < HEDGE_MIN_SAMPLES:
+        return None
+    rank = max(1, math.ceil(pct / 100 * len(window)))
+    return window[min(rank, len(window)) - 1]
+
+
+def hedge_delay(policy: dict, node: str | None = None) -> float | None:
+    """중복 요청을 보낼 때까지 기다릴 시간 (hedging을 쓰지 않으면 None)"""
+    if not policy["hedge"]:
+        return None
+    if policy["hedge_after"] is not None:
+        return policy["hedge_after"]
+    if node is None:
+        node = metrics.current_node() or metrics.UNSCOPED_NODE
+    observed = latency_percentile(node)
+    if observed is None:
+        return HEDGE_DEFAULT_DELAY
+    return max(HEDGE_MIN_DELAY, observed)
+
+
+def reset_latencies() -> None:
+    with _latency_lock:
+        _latencies.clear()
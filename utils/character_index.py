@@ -0,0 +1,264 @@
+''' 원고 인물 색인 (캐릭터 분석용 발췌 선택)
+    - LLM 없이 원고에서 인물 이름 후보를 찾음
+        * 호칭:      "도현 씨", "하윤님", "무진 선배"처럼 이름 뒤에 붙는 호칭
+        * 화자 표시: "강도현이 말했다", "이름: 대사" 형식의 대사 화자
+        * 빈도:      흔한 성씨로 시작하는 세 글자 + 조사 ("강도현은", "백무진의")가 반복되는 경우
+    - 성을 뺀 이름(도현)은 같은 이름으로 끝나는 성명(강도현)의 별칭으로 합침
+    - 인물마다 등장하는 문단 목록을 만들고, 주요 인물별로 원고 전체에 고르게 퍼진 문단만 골라 발췌
+      (캐릭터 노드가 원고 앞부분 전체 대신 인물별 발췌만 보내도록)
+    - 같은 원고의 색인은 get_character_index로 한 번만 만들고 재사용'''
+
+import re
+from bisect import bisect_right
+from collections import Counter
+from functools import lru_cache
+
+from utils.text_utils import paragraph_spans, sample_excerpts
+
+# 인물로 보는 최소 언급 수 / 발췌할 주요 인물 수
+MIN_MENTIONS = 3
+MAX_MAJOR_CHARACTERS = 6
+# 캐릭터 노드에 보내는 발췌 전체 분량 (원고가 이보다 짧으면 원고 전체)
+CHARACTER_CONTEXT_CHARS = 12000
+# 발췌 문단 하나의 최대 길이
+PASSAGE_MAX_CHARS = 600
+# 색인을 보관하는 원고 수
+INDEX_CACHE_SIZE = 8
+
+# 빈도 기반 후보에 쓰는 흔한 성씨
+SURNAMES = (
+    "김이박최정강조윤장임한오서신권황안송류전홍고문양손배백허유남심노하곽성차주우구민진나지엄채원천방공현함변염여추도소석선설마길연위표명기반왕금옥육인맹제모탁국어은편용예경봉사부가복태목형피두감음빈동온호범좌팽승간상갈단견당화창옹순"
+)
+# 이름 뒤 호칭 (한 글자 호칭 중 일반 명사 끝과 겹치는 군 / 양 / 공 / 경 등은 제외)
+HONORIFICS = ("씨", "님", "선배", "후배", "오빠", "누나", "언니", "형님")
+# 호칭 앞이나 화자 자리에 와도 이름이 아닌 말 (직함 / 가족 호칭 / 대명사 / 일반 명사)
+NOT_NAMES = {
+    "선생", "사장", "교수", "부장", "과장", "대리", "팀장", "회장", "실장", "원장", "국장", "차장", "이사", "대표",
+    "고객", "여러분", "당신", "그분", "저분", "이분", "어머", "아버", "할머", "할아", "아주머", "아저", "사모", "부모",
+    "하느", "주인", "스승", "공주", "왕자", "도련", "아가", "마님", "나리", "대감", "영감", "폐하", "전하", "기사",
+    "하인", "부인", "그녀", "그들", "우리", "저희", "너희", "자신", "남자", "여자", "소년", "소녀", "노인", "사내",
+    "병사", "아이", "사람", "누군가", "모두", "다들", "상대", "친구", "동생", "엄마", "아빠", "이야기",
+}
+# 대사 화자 표시 동사
+SPEECH_VERBS = "말했다|물었다|대답했다|답했다|외쳤다|소리쳤다|중얼거렸다|속삭였다|덧붙였다|웃었다|말을 이었다"
+
+_PARTICLES = "은|는|이|가|을|를|의|에게|에게서|한테|와|과|도|만|께서"
+HONORIFIC_PATTERN = re.compile(
+    rf"(?<![가-힣])([가-힣]{{2,3}})\s?(?:{'|'.join(HONORIFICS)})(?:{_PARTICLES}|요)?(?![가-힣])"
+)
+SPEAKER_PATTERN = re.compile(
+    rf"(?<![가-힣])([가-힣]{{2,3}})(?:이|가|은|는|께서)\s(?:[가-힣]+\s)?(?:{SPEECH_VERBS})"
+)
+SPEAKER_LINE = re.compile(r"^\s*([가-힣]{2,4})\s*(?:\([^)]{0,20}\))?\s*[:：]", re.MULTILINE)
+FULL_NAME_PATTERN = re.compile(rf"(?<![가-힣])([{SURNAMES}][가-힣]{{2}})({_PARTICLES})(?![가-힣])")
+_SUBJECT_PARTICLES = {"은", "는", "이", "가", "께서"}
+# 빈도 후보가 조사 없이(동사 / 다른 명사의 일부로) 쓰이는 비율이 이보다 높으면 일반 명사로 봄
+MIN_PARTICLE_RATIO = 0.6
+
+
+class CharacterIndex:
+    """
+    원고 하나의 인물 색인
+    - characters: [{"name", "aliases", "mentions", "paragraphs": [문단 번호, ...], "evidence": {...}}] (언급 많은 순)
+    - select_context(): 주요 인물별 발췌 텍스트
+    """
+
+    def __init__(self, text: str):
+        self.text = text
+        self.spans = paragraph_spans(text)
+        self._starts = [start for start, _ in self.spans]
+        self.characters = self._build()
+
+    # -------------------------
+    # 후보 찾기
+    # -------------------------
+    def _candidates(self) -> dict:
+        """이름 → 근거별 횟수"""
+        evidence = {}
+
+        def add(names, kind):
+            for name, count in Counter(names).items():
+                if name in NOT_NAMES:
+                    continue
+                evidence.setdefault(name, Counter())[kind] += count
+
+        add(HONORIFIC_PATTERN.findall(self.text), "honorific")
+        add(SPEAKER_PATTERN.findall(self.text), "speaker")
+        add(SPEAKER_LINE.findall(self.text), "speaker")
+        add(self._frequent_full_names(), "frequency")
+        return evidence
+
+    def _frequent_full_names(self) -> list:
+        """
+        "성 + 두 글자 + 조사" 형태가 반복되는 단어 중 이름처럼 쓰이는 것
+        - 주어 자리(은 / 는 / 이 / 가)에 나온 적이 있고, 조사가 두 종류 이상이고,
+          조사 없이 쓰인 경우(예: "이야기했다", "문고리를"만 반복)가 적어야 함
+        - 복수(-들) / 존칭(-님)으로 끝나는 말("사람들", "부모님")은 제외
+        """
+        particles = {}
+        for stem, particle in FULL_NAME_PATTERN.findall(self.text):
+            particles.setdefault(stem, Counter())[particle] += 1
+        stems = [
+            stem for stem, counts in particles.items()
+            if sum(counts.values()) >= MIN_MENTIONS
+            and len(counts) >= 2
+            and _SUBJECT_PARTICLES & set(counts)
+            and not stem.endswith(("들", "님"))
+        ]
+        if not stems:
+            return []
+
+        # 전체 등장 횟수 (조사가 붙지 않은 경우 / 다른 단어의 일부 포함, 후보가 적으므로 str.count로 충분)
+        names = []
+        for stem in stems:
+            with_particle = sum(particles[stem].values())
+            if with_particle >= MIN_PARTICLE_RATIO * self.text.count(stem):
+                names.extend([stem] * with_particle)
+        return names
+
+    def _build(self) -> list:
+        evidence = self._candidates()
+
+        # 성을 뺀 두 글자 이름은 그 이름으로 끝나는 세 글자 성명의 별칭으로 합침
+        canonical = {}
+        for name in sorted(evidence, key=len, reverse=True):
+            if len(name) == 2:
+                owners = [full for full in evidence if len(full) == 3 and full.endswith(name)]
+                if len(owners) == 1:
+                    canonical[name] = owners[0]
+                    continue
+            canonical[name] = name
+
+        if not canonical:
+            return []
+
+        # 이름 / 별칭 실제 언급 위치 (긴 이름 먼저, 단어 중간은 제외)
+        names = sorted(canonical, key=len, reverse=True)
+        mention = re.compile(rf"(?<![가-힣])(?:{'|'.join(map(re.escape, names))})")
+        mentions = Counter()
+        paragraphs = {}
+        for m in mention.finditer(self.text):
+            name = canonical[m.group()]
+            mentions[name] += 1
+            paragraph = bisect_right(self._starts, m.start()) - 1
+            found = paragraphs.setdefault(name, [])
+            if paragraph >= 0 and (not found or found[-1] != paragraph):
+                found.append(paragraph)
+
+        characters = []
+        for name, count in mentions.items():
+            if count < MIN_MENTIONS:
+                continue
+            merged = Counter()
+            for alias, owner in canonical.items():
+                if owner == name:
+                    merged.update(evidence.get(alias, {}))
+            characters.append({
+                "name": name,
+                "aliases": sorted(alias for alias, owner in canonical.items() if owner == name and alias != name),
+                "mentions": count,
+                "paragraphs": paragraphs.get(name, []),
+                "evidence": dict(merged),
+            })
+        characters.sort(key=lambda c: c["mentions"], reverse=True)
+        return characters
+
+    # -------------------------
+    # 발췌
+    # -------------------------
+    def major(self, limit: int = MAX_MAJOR_CHARACTERS) -> list:
+        return self.characters[:limit]
+
+    def paragraph(self, number: int) -> str:
+        start, end = self.spans[number]
+        return self.text[start:end].strip()
+
+    def _passage_line(self, number: int) -> str:
+        return f"(문단 {number + 1}/{len(self.spans)}) {self.paragraph(number)[:PASSAGE_MAX_CHARS]}"
+
+    def passages(self, character: dict, max_chars: int, exclude: set = None) -> list:
+        """
+        인물이 등장하는 문단 중 원고 전체에 고르게 퍼지도록 고른 문단 번호 (처음 / 마지막 등장 포함, 원고 순서)
+        - 처음, 마지막, 가운데, 사분점 ... 순서로 채우다가 max_chars를 넘으면 멈춤
+        """
+        candidates = [p for p in character["paragraphs"] if not exclude or p not in exclude]
+        chosen = []
+        used = 0
+        for i in _spread_order(len(candidates)):
+            number = candidates[i]
+            size = len(self._passage_line(number)) + 1
+            if used + size > max_chars:
+                if chosen:
+                    break
+                continue
+            chosen.append(number)
+            used += size
+        return sorted(chosen)
+
+    def select_context(self, max_chars: int = CHARACTER_CONTEXT_CHARS) -> str:
+        """
+        주요 인물 목록 + 인물별 발췌
+        - 발췌 분량은 언급 수의 제곱근에 비례해 나눔 (주인공이 발췌를 독차지하지 않도록)
+        - 이미 다른 인물 발췌에 들어간 문단은 다시 넣지 않음
+        """
+        major = self.major()
+        total = len(self.spans)
+        lines = ["[인물 색인: 원고 전체에서 찾은 주요 인물]"]
+        for c in major:
+            alias = f", 별칭: {', '.join(c['aliases'])}" if c["aliases"] else ""
+            lines.append(f"- {c['name']} (언급 {c['mentions']:,}회, 등장 문단 {len(c['paragraphs']):,}/{total:,}{alias})")
+
+        weights = [c["mentions"] ** 0.5 for c in major]
+        # 인물 목록과 인물별 제목 줄을 뺀 나머지를 발췌에 씀
+        budget = max(0, max_chars - sum(len(line) + 1 for line in lines) - sum(len(c["name"]) + 12 for c in major))
+        used = set()
+        for c, weight in zip(major, weights):
+            chosen = self.passages(c, int(budget * weight / sum(weights)), used)
+            if not chosen:
+                continue
+            used.update(chosen)
+            lines.append(f"\n[{c['name']} 등장 발췌]")
+            lines.extend(self._passage_line(number) for number in chosen)
+        return "\n".join(lines)
+
+
+def _spread_order(n: int) -> list:
+    """0..n-1을 처음, 마지막, 가운데, 사분점 ... 순서로 (앞부분부터 고르게 채우는 순서)"""
+    if n <= 0:
+        return []
+    order = [0] + ([n - 1] if n > 1 else [])
+    seen = set(order)
+    intervals = [(0, n - 1)]
+    while intervals:
+        next_intervals = []
+        for lo, hi in intervals:
+            mid = (lo + hi) // 2
+            if mid not in seen:
+                seen.add(mid)
+                order.append(mid)
+            if mid - lo > 1:
+                next_intervals.append((lo, mid))
+            if hi - mid > 1:
+                next_intervals.append((mid, hi))
+        intervals = next_intervals
+    return order
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def get_character_index(text: str) -> CharacterIndex:
+    """원고의 인물 색인 (같은 원고면 만들어 둔 색인 재사용)"""
+    return CharacterIndex(text)
+
+
+def build_character_context(text: str, max_chars: int = CHARACTER_CONTEXT_CHARS) -> tuple[str, str]:
+    """
+    캐릭터 분석 노드에 보낼 (라벨, 본문)
+    - 원고가 max_chars 이하면 원고 전체
+    - 인물을 찾았으면 인물 목록 + 인물별 발췌, 못 찾았으면 앞 / 중간 / 뒤 발췌
+    """
+    if len(text) <= max_chars:
+        return "소설 원문", text
+    index = get_character_index(text)
+    if not index.characters:
+        return "원고 발췌", sample_excerpts(text, max_chars)
+    return "인물별 발췌", index.select_context(max_chars)
@@ -0,0 +1,185 @@
+''' 연재별 캐릭터 카드 저장소 (SQLite)
+    - 연재 ID(series_id)마다 현재 캐릭터 카드와, 카드 추출에 이미 반영한 chunk 해시를 보관
+    - 새 회차를 올리면 처음 보는 chunk만 LLM에 보내 새 인물 / 바뀐 특성(delta)만 받고 저장된 카드에 합침
+      (회차만 올리든 누적 원고를 올리든 이미 읽은 chunk는 다시 보내지 않음)
+    - merge_cards: 갱신 카드를 저장된 카드에 합치는 규칙 (카드 노드의 delta 추출과 fused 모드가 함께 사용)'''
+
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHARACTER_STORE_PATH = os.getenv(
+    "CHARACTER_STORE_PATH", os.path.join(ROOT_DIR, ".cache", "character_store.sqlite3")
+)
+
+# 카드 하나에 남기는 성격 키워드 수 (먼저 자리 잡은 키워드 우선)
+MAX_PERSONALITY_KEYWORDS = 8
+# 갱신 카드에서 이 값이면 저장된 값을 유지 (새 회차에서 드러나지 않았다는 뜻)
+UNKNOWN_VALUES = {"", "미상", "확인 불가", "없음"}
+
+
+def _informative(value) -> bool:
+    return isinstance(value, str) and value.strip() not in UNKNOWN_VALUES
+
+
+def same_character(a: str, b: str) -> bool:
+    """같은 인물 이름인지 (성을 뺀 이름 "도현"과 성명 "강도현"도 같은 인물로 봄)"""
+    a, b = a.strip(), b.strip()
+    if a == b:
+        return True
+    short, long = sorted((a, b), key=len)
+    return len(short) >= 2 and len(long) == len(short) + 1 and long.endswith(short)
+
+
+def merge_cards(stored: list, updates: list) -> tuple[list, list]:
+    """
+    갱신 카드를 저장된 카드에 합침
+    - 저장된 인물: 역할 / 핵심 특징 / 주의점은 갱신 값이 있으면 교체, 성격 키워드는 합집합
+    - 처음 보는 인물: 카드 추가
+    Returns:
+        (합친 전체 카드 목록, 새로 추가되거나 바뀐 카드 목록)
+    """
+    merged = [dict(card) for card in stored]
+    changed = {}
+    for update in updates:
+        name = (update.get("name") or "").strip()
+        if not _informative(name):
+            continue
+        card = next((c for c in merged if same_character(c["name"], name)), None)
+        if card is None:
+            card = {**update, "name": name}
+            merged.append(card)
+            changed[name] = card
+            continue
+
+        before = dict(card)
+        for field in ("role", "core_traits", "warning_point"):
+            if _informative(update.get(field)):
+                card[field] = update[field].strip()
+        keywords = list(card.get("personality_keywords") or [])
+        for keyword in update.get("personality_keywords") or []:
+            if _informative(keyword) and keyword not in keywords and len(keywords) < MAX_PERSONALITY_KEYWORDS:
+                keywords.append(keyword)
+        card["personality_keywords"] = keywords
+        if card != before:
+            changed[card["name"]] = card
+    return merged, list(changed.values())
+
+
+class CharacterStore:
+    """series_id → 캐릭터 카드 / 반영한 chunk 해시 저장소 (thread-safe)"""
+
+    def __init__(self, path: str = CHARACTER_STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS series_cards (
+                    series_id TEXT NOT NULL,
+                    name TEXT NOT NULL,
+                    card TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (series_id, name)
+                )
+                """
+            )
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS series_chunks (
+                    series_id TEXT NOT NULL,
+                    chunk_hash TEXT NOT NULL,
+                    created_at REAL NOT NULL,
+                    PRIMARY KEY (series_id, chunk_hash)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_cards(self, series_id: str) -> list:
+        """저장된 카드 목록 (처음 등록된 순서)"""
+        with self._lock:
+            rows = self._connect().execute(
+                "SELECT card FROM series_cards WHERE series_id = ? ORDER BY created_at, rowid",
+                (series_id,),
+            ).fetchall()
+        return [json.loads(card) for card, in rows]
+
+    def has_series(self, series_id: str) -> bool:
+        """카드 추출에 반영한 chunk가 하나라도 있는지 (카드가 0장인 연재도 첫 회차 이후면 True)"""
+        with self._lock:
+            row = self._connect().execute(
+                "SELECT 1 FROM series_chunks WHERE series_id = ? LIMIT 1", (series_id,)
+            ).fetchone()
+        return row is not None
+
+    def seen_chunks(self, series_id: str, hashes: list) -> set:
+        """hashes 중 이미 카드에 반영한 chunk 해시"""
+        found = set()
+        with self._lock:
+            conn = self._connect()
+            unique = list(dict.fromkeys(hashes))
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT chunk_hash FROM series_chunks WHERE series_id = ? AND chunk_hash IN ({placeholders})",
+                    [series_id, *batch],
+                )
+                found.update(h for h, in rows)
+        return found
+
+    def save(self, series_id: str, cards: list, chunk_hashes: list) -> None:
+        """바뀐 카드와 이번에 반영한 chunk 해시를 한 트랜잭션으로 저장 (카드는 이름 기준 덮어쓰기)"""
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.executemany(
+                    """
+                    INSERT INTO series_cards (series_id, name, card, created_at, updated_at) VALUES (?, ?, ?, ?, ?)
+                    ON CONFLICT (series_id, name) DO UPDATE SET card = excluded.card, updated_at = excluded.updated_at
+                    """,
+                    [(series_id, c["name"], json.dumps(c, ensure_ascii=False), now, now) for c in cards],
+                )
+                conn.executemany(
+                    "INSERT OR IGNORE INTO series_chunks (series_id, chunk_hash, created_at) VALUES (?, ?, ?)",
+                    [(series_id, h, now) for h in chunk_hashes],
+                )
+
+    def clear(self, series_id: str) -> None:
+        """연재 하나의 카드 / chunk 기록 삭제 (처음부터 다시 추출)"""
+        with self._lock:
+            conn = self._connect()
+            with conn:
+                conn.execute("DELETE FROM series_cards WHERE series_id = ?", (series_id,))
+                conn.execute("DELETE FROM series_chunks WHERE series_id = ?", (series_id,))
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_character_store() -> CharacterStore:
+    """프로세스 공유 캐릭터 카드 저장소 반환"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = CharacterStore()
+    return _store
@@ -0,0 +1,98 @@
+''' chunk 단위 중간 결과 저장소 (SQLite)
+    - 원고를 문단/회차 경계로 나눈 chunk의 해시를 키로 중간 결과(요약, 인물 관찰)를 보관
+    - 같은 연재 원고에 새 회차만 추가해 다시 올리면, 바뀐 chunk만 다시 계산
+    - kind 값에 버전을 붙여(예: "summary:v1") 프롬프트가 바뀌면 자연스럽게 무효화'''
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", os.path.join(ROOT_DIR, ".cache", "chunk_store.sqlite3"))
+
+
+def chunk_hash(chunk: str) -> str:
+    return hashlib.sha256(chunk.encode("utf-8")).hexdigest()
+
+
+class ChunkStore:
+    """chunk 해시 → 중간 결과(JSON) 저장소 (thread-safe)"""
+
+    def __init__(self, path: str = CHUNK_STORE_PATH):
+        self.path = path
+        self._conn = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS chunk_results (
+                    chunk_hash TEXT NOT NULL,
+                    kind TEXT NOT NULL,
+                    value TEXT NOT NULL,
+                    updated_at REAL NOT NULL,
+                    PRIMARY KEY (chunk_hash, kind)
+                )
+                """
+            )
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def get_many(self, kind: str, hashes: list) -> dict:
+        """저장된 결과를 {chunk_hash: value} 형태로 반환 (없는 해시는 제외)"""
+        if not hashes:
+            return {}
+
+        found = {}
+        with self._lock:
+            conn = self._connect()
+            unique = list(dict.fromkeys(hashes))
+            # SQLite 변수 개수 제한을 피하기 위해 나눠서 조회
+            for i in range(0, len(unique), 500):
+                batch = unique[i:i + 500]
+                placeholders = ",".join("?" * len(batch))
+                rows = conn.execute(
+                    f"SELECT chunk_hash, value FROM chunk_results WHERE kind = ? AND chunk_hash IN ({placeholders})",
+                    [kind, *batch],
+                )
+                for h, value in rows:
+                    found[h] = json.loads(value)
+        return found
+
+    def put_many(self, kind: str, items: dict) -> None:
+        """{chunk_hash: value} 저장"""
+        if not items:
+            return
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            conn.executemany(
+                "INSERT OR REPLACE INTO chunk_results (chunk_hash, kind, value, updated_at) VALUES (?, ?, ?, ?)",
+                [(h, kind, json.dumps(v, ensure_ascii=False), now) for h, v in items.items()],
+            )
+            conn.commit()
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_chunk_store() -> ChunkStore:
+    """프로세스 공유 chunk 저장소 반환"""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = ChunkStore()
+    return _store
@@ -1,38 +1,137 @@
-''' 사용자가 업로드한 파일(.tex, .docx, .pdf)및 직접 입력한 내용을 적절한 전처리 작업 진행
-    - .tet => 파일 읽기
-    - .docx => 파라그래프 텍스트 추출
+''' 사용자가 업로드한 파일(.txt, .docx, .pdf)및 직접 입력한 내용을 적절한 전처리 작업 진행
+    - .txt => 파일 읽기
+    - .docx => 본문 파라그래프 텍스트 추출 (python-docx Document.paragraphs와 같은 범위, 표 / 텍스트 상자 제외)
     - .pdf => 페이지 텍스트 추출
-    - 직접 입력 => 문자열 + 길이 제한'''
+    - 직접 입력 => 문자열 + 길이 제한
+    - iter_text_from_file(): 텍스트를 조금씩 생성하는 스트리밍 API
+        * 글자 수 한도에 도달하면 그 즉시 읽기를 멈춤 (900쪽 PDF도 필요한 페이지까지만 파싱)
+        * 파일 전체를 메모리에 올리지 않음'''
 
 from pathlib import Path
-import docx
-from pypdf import PdfReader
+import zipfile
+from xml.etree.ElementTree import iterparse
 
+# LLM 한 번의 프롬프트에 넣는 원문 최대 길이
 MAX_CHARS = 30000
+# 업로드 원고 최대 길이 (요약 노드는 이 길이까지 chunk 단위로 나눠서 처리)
+MAX_MANUSCRIPT_CHARS = 1_000_000
 
-def load_from_text_input(text: str) -> str:
+# .txt를 읽을 때 한 번에 읽는 글자 수
+TXT_BLOCK_CHARS = 64 * 1024
+
+# DOCX(WordprocessingML) 태그
+_W = "{http://schemas.openxmlformats.org/wordprocessingml/2006/main}"
+
+
+def load_from_text_input(text: str, max_chars: int = MAX_MANUSCRIPT_CHARS) -> str:
     text = text.strip()
-    return text[:MAX_CHARS]
+    return text[:max_chars]
 
 
-def load_from_file(file_path: str) -> str:
-    path = Path(file_path)
-    ext = path.suffix.lower()
+# =========================
+# 형식별 스트리밍 로더
+# =========================
+def _iter_txt(path: Path):
+    with path.open(encoding="utf-8", errors="ignore") as f:
+        while True:
+            block = f.read(TXT_BLOCK_CHARS)
+            if not block:
+                return
+            yield block
+
+
+def _iter_docx(path: Path):
+    # python-docx는 문서 전체를 트리로 올리므로, document.xml을 흘려 읽으면서 본문 문단만 추출
+    # - 본문 문단: w:body의 직계 w:p (표 셀 / 문단 안 텍스트 상자의 w:p는 제외)
+    # - 다 읽은 본문 요소는 w:body에서 떼어내 파싱한 트리가 쌓이지 않게 함
+    with zipfile.ZipFile(path) as archive, archive.open("word/document.xml") as xml:
+        first = True
+        stack = []
+        body = None
+        in_paragraph = False    # 본문 문단 안
+        nested = 0              # 본문 문단 안에서 열려 있는 하위 문단 수 (텍스트 상자)
+        parts = []
+        for event, elem in iterparse(xml, events=("start", "end")):
+            tag = elem.tag
+            if event == "start":
+                if tag == _W + "body":
+                    body = elem
+                elif tag == _W + "p":
+                    if stack and stack[-1] == _W + "body":
+                        in_paragraph = True
+                    elif in_paragraph:
+                        nested += 1
+                stack.append(tag)
+                continue
+
+            stack.pop()
+            collecting = in_paragraph and not nested
+            if tag == _W + "t":
+                if collecting:
+                    parts.append(elem.text or "")
+            elif tag == _W + "tab":
+                if collecting:
+                    parts.append("\t")
+            elif tag in (_W + "br", _W + "cr"):
+                if collecting:
+                    parts.append("\n")
+            elif tag == _W + "p":
+                if nested:
+                    nested -= 1
+                elif in_paragraph:
+                    yield ("" if first else "\n") + "".join(parts)
+                    first = False
+                    in_paragraph = False
+                    parts = []
+
+            if body is not None and stack and stack[-1] == _W + "body":
+                body.remove(elem)
 
-    if ext == ".txt":
-        content = path.read_text(encoding="utf-8", errors="ignore")
 
-    elif ext == ".docx":
-        doc = docx.Document(path)
-        content = "\n".join([p.text for p in doc.paragraphs])
+def _iter_pdf(path: Path):
+    from pypdf import PdfReader
 
-    elif ext == ".pdf":
-        reader = PdfReader(path)
-        content = ""
-        for page in reader.pages:
-            content += page.extract_text() or ""
+    # 페이지는 접근할 때 파싱되므로 필요한 페이지까지만 추출됨
+    reader = PdfReader(path)
+    for i, page in enumerate(reader.pages):
+        text = page.extract_text() or ""
+        yield text if i == 0 else "\n" + text
 
-    else:
+
+_LOADERS = {
+    ".txt": _iter_txt,
+    ".docx": _iter_docx,
+    ".pdf": _iter_pdf,
+}
+
+
+def iter_text_from_file(file_path: str, max_chars: int = MAX_MANUSCRIPT_CHARS):
+    """
+    파일 텍스트를 조각 단위로 생성
+    - 누적 글자 수가 max_chars에 도달하면 마지막 조각을 잘라서 내보내고 종료
+    """
+    path = Path(file_path)
+    ext = path.suffix.lower()
+
+    loader = _LOADERS.get(ext)
+    if loader is None:
         raise ValueError(f"지원하지 않는 파일 형식: {ext}")
 
-    return content[:MAX_CHARS]
+    remaining = max_chars
+    pieces = loader(path)
+    try:
+        for piece in pieces:
+            if not piece:
+                continue
+            if len(piece) >= remaining:
+                yield piece[:remaining]
+                return
+            remaining -= len(piece)
+            yield piece
+    finally:
+        # 한도에 도달해 일찍 끝나도 파일 핸들을 바로 닫음
+        pieces.close()
+
+
+def load_from_file(file_path: str, max_chars: int = MAX_MANUSCRIPT_CHARS) -> str:
+    return "".join(iter_text_from_file(file_path, max_chars))
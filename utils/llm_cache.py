@@ -0,0 +1,215 @@
+''' LLM 응답 캐시 (content-addressed, SQLite 저장)
+    - 키: model + messages + temperature + 프롬프트 버전의 해시
+    - 같은 원고를 다시 분석하면 LLM을 다시 호출하지 않고 저장된 응답 사용
+    - 용량 / 보관 기간 기준 LRU 정리
+    - hit / miss 카운터, 캐시 우회 스위치 제공'''
+
+import contextvars
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+
+# =========================
+# 설정
+# =========================
+ROOT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# 프롬프트 구조 / 응답 해석 방식이 바뀌면 올려서 기존 캐시를 무효화
+PROMPT_VERSION = "1"
+
+CACHE_PATH = os.getenv("LLM_CACHE_PATH", os.path.join(ROOT_DIR, ".cache", "llm_cache.sqlite3"))
+CACHE_MAX_BYTES = int(os.getenv("LLM_CACHE_MAX_BYTES", str(200 * 1024 * 1024)))
+CACHE_MAX_AGE = float(os.getenv("LLM_CACHE_MAX_AGE_DAYS", "30")) * 24 * 60 * 60
+CACHE_ENABLED = os.getenv("LLM_CACHE_DISABLED", "").lower() not in ("1", "true", "yes")
+
+# 저장 N번마다 한 번씩 정리
+EVICT_EVERY = 100
+
+# 스레드 / asyncio 태스크 단위 캐시 우회 플래그
+_bypass = contextvars.ContextVar("llm_cache_bypass", default=False)
+
+
+def make_cache_key(
+    model: str,
+    messages: list,
+    temperature: float,
+    prompt_version: str = PROMPT_VERSION,
+    response_format: dict | None = None,
+) -> str:
+    """요청 내용으로 캐시 키(sha256) 생성 (response_format이 없으면 기존 키와 동일)"""
+    request = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "prompt_version": prompt_version,
+    }
+    if response_format is not None:
+        request["response_format"] = response_format
+    payload = json.dumps(request, ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class LLMCache:
+    """SQLite 기반 LLM 응답 저장소 (thread-safe)"""
+
+    def __init__(self, path: str = CACHE_PATH, max_bytes: int = CACHE_MAX_BYTES, max_age: float = CACHE_MAX_AGE):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.max_age = max_age
+        self.enabled = CACHE_ENABLED
+
+        self.hits = 0
+        self.misses = 0
+        self.writes = 0
+        self.evictions = 0
+
+        self._conn = None
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # 내부 유틸
+    # -------------------------
+    def _connect(self) -> sqlite3.Connection:
+        if self._conn is None:
+            if self.path != ":memory:":
+                os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            conn = sqlite3.connect(self.path, check_same_thread=False, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS llm_cache (
+                    key TEXT PRIMARY KEY,
+                    value TEXT NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_llm_cache_accessed ON llm_cache(accessed_at)")
+            conn.commit()
+            self._conn = conn
+        return self._conn
+
+    def _is_bypassed(self) -> bool:
+        return not self.enabled or _bypass.get()
+
+    # -------------------------
+    # 조회 / 저장
+    # -------------------------
+    def get(self, key: str):
+        """캐시된 응답 반환 (없거나 만료되면 None)"""
+        if self._is_bypassed():
+            return None
+
+        now = time.time()
+        with self._lock:
+            conn = self._connect()
+            row = conn.execute(
+                "SELECT value, created_at FROM llm_cache WHERE key = ?", (key,)
+            ).fetchone()
+
+            if row is None or now - row[1] > self.max_age:
+                self.misses += 1
+                return None
+
+            conn.execute("UPDATE llm_cache SET accessed_at = ? WHERE key = ?", (now, key))
+            conn.commit()
+            self.hits += 1
+            return row[0]
+
+    def set(self, key: str, value: str) -> None:
+        """응답 저장 (주기적으로 정리 수행)"""
+        if self._is_bypassed() or value is None:
+            return
+
+        now = time.time()
+        size = len(value.encode("utf-8"))
+        with self._lock:
+            conn = self._connect()
+            conn.execute(
+                "INSERT OR REPLACE INTO llm_cache (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, value, size, now, now),
+            )
+            conn.commit()
+            self.writes += 1
+            if self.writes % EVICT_EVERY == 0:
+                self._evict_locked(now)
+
+    # -------------------------
+    # 정리 (LRU)
+    # -------------------------
+    def _evict_locked(self, now: float) -> None:
+        conn = self._connect()
+
+        # 1. 보관 기간 초과 항목 삭제
+        cur = conn.execute("DELETE FROM llm_cache WHERE created_at < ?", (now - self.max_age,))
+        self.evictions += cur.rowcount
+
+        # 2. 용량 초과 시 가장 오래 사용되지 않은 항목부터 삭제
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM llm_cache").fetchone()[0]
+        if total > self.max_bytes:
+            excess = total - self.max_bytes
+            victims = []
+            for key, size in conn.execute("SELECT key, size FROM llm_cache ORDER BY accessed_at ASC"):
+                victims.append((key,))
+                excess -= size
+                if excess <= 0:
+                    break
+            conn.executemany("DELETE FROM llm_cache WHERE key = ?", victims)
+            self.evictions += len(victims)
+
+        conn.commit()
+
+    def evict(self) -> None:
+        """보관 기간 / 용량 기준 정리를 즉시 수행"""
+        with self._lock:
+            self._evict_locked(time.time())
+
+    def clear(self) -> None:
+        with self._lock:
+            conn = self._connect()
+            conn.execute("DELETE FROM llm_cache")
+            conn.commit()
+
+    # -------------------------
+    # 우회 / 통계
+    # -------------------------
+    @contextmanager
+    def bypass(self):
+        """이 블록 안의 호출(스레드 / asyncio 태스크)은 캐시를 사용하지 않고 LLM을 직접 호출"""
+        token = _bypass.set(True)
+        try:
+            yield
+        finally:
+            _bypass.reset(token)
+
+    def stats(self) -> dict:
+        total = self.hits + self.misses
+        return {
+            "enabled": self.enabled,
+            "hits": self.hits,
+            "misses": self.misses,
+            "writes": self.writes,
+            "evictions": self.evictions,
+            "hit_rate": self.hits / total if total else 0.0,
+        }
+
+
+_cache = None
+_cache_lock = threading.Lock()
+
+
+def get_cache() -> LLMCache:
+    """프로세스 공유 캐시 인스턴스 반환"""
+    global _cache
+    if _cache is None:
+        with _cache_lock:
+            if _cache is None:
+                _cache = LLMCache()
+    return _cache
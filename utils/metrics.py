@@ -0,0 +1,370 @@
+''' 노드별 / 실행별 계측 (지연 시간, 토큰, 재시도, hedge, 캐시, repair, 파싱 실패)
+    - run_scope(): 파이프라인 한 번의 실행 범위, node_scope(): 노드 하나의 실행 범위
+    - 범위는 contextvar로 전달되므로 노드 안에서 만든 asyncio 태스크(병렬 LLM 호출)도 같은 노드로 집계됨
+    - LLM 호출부(utils.openai_client)와 응답 파서가 record_*()로 값을 기록
+    - 실행이 끝나면 RunMetrics.to_dict()를 결과에 붙이고, 필요하면 JSON lines로 남김
+    - 프로세스 누적값은 Prometheus 텍스트 형식으로 내보냄 (render_prometheus / start_metrics_server)'''
+
+import contextvars
+import json
+import os
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+# 실행별 계측 결과를 JSON lines로 남길 경로 (비우면 기록하지 않음)
+METRICS_JSONL_PATH = os.getenv("METRICS_JSONL_PATH", "")
+# Prometheus 엔드포인트 포트 (0이면 띄우지 않음)
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+
+# 노드 실행 시간 히스토그램 구간 (초)
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120)
+
+# 노드 밖(노드 래퍼를 거치지 않는 호출)에서 기록된 값이 모이는 이름
+UNSCOPED_NODE = "_unscoped"
+
+_COUNTER_FIELDS = (
+    "llm_calls",
+    "prompt_tokens",
+    "cached_tokens",
+    "completion_tokens",
+    "retries",
+    "hedges",
+    "hedge_wins",
+    "node_retries",
+    "cache_hits",
+    "repairs",
+    "parse_failures",
+    "errors",
+)
+
+
+def _empty_node() -> dict:
+    node = {"runs": 0, "wall_time": 0.0, "queue_wait": 0.0}
+    node.update({field: 0 for field in _COUNTER_FIELDS})
+    return node
+
+
+class RunMetrics:
+    """파이프라인 한 번의 실행에서 모인 노드별 계측값 (thread-safe)"""
+
+    def __init__(self):
+        self.run_id = uuid.uuid4().hex
+        self.started_at = time.time()
+        self.wall_time = None
+        self.nodes = {}
+        self._lock = threading.Lock()
+
+    def _node(self, name: str) -> dict:
+        node = self.nodes.get(name)
+        if node is None:
+            node = self.nodes[name] = _empty_node()
+        return node
+
+    def add(self, name: str, **values) -> None:
+        with self._lock:
+            node = self._node(name)
+            for field, value in values.items():
+                node[field] += value
+
+    def totals(self) -> dict:
+        with self._lock:
+            total = _empty_node()
+            for node in self.nodes.values():
+                for field, value in node.items():
+                    total[field] += value
+        del total["runs"]
+        return total
+
+    def to_dict(self) -> dict:
+        with self._lock:
+            nodes = {
+                name: {k: round(v, 4) if isinstance(v, float) else v for k, v in node.items()}
+                for name, node in self.nodes.items()
+            }
+        totals = self.totals()
+        totals["wall_time"] = round(self.wall_time or 0.0, 4)
+        totals["queue_wait"] = round(totals["queue_wait"], 4)
+        return {"run_id": self.run_id, "started_at": self.started_at, "totals": totals, "nodes": nodes}
+
+
+# =========================
+# 프로세스 누적 집계 (Prometheus용)
+# =========================
+class _Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.nodes = {}
+        self.histograms = {}
+        self.routes = {}
+        self.speculations = {}
+        self.runs = 0
+        self.run_wall_time = 0.0
+
+    def add(self, name: str, **values) -> None:
+        with self._lock:
+            node = self.nodes.setdefault(name, _empty_node())
+            for field, value in values.items():
+                node[field] += value
+
+    def observe_node(self, name: str, seconds: float) -> None:
+        with self._lock:
+            buckets = self.histograms.setdefault(name, [0] * len(LATENCY_BUCKETS))
+            for i, bound in enumerate(LATENCY_BUCKETS):
+                if seconds <= bound:
+                    buckets[i] += 1
+
+    def observe_run(self, seconds: float) -> None:
+        with self._lock:
+            self.runs += 1
+            self.run_wall_time += seconds
+
+    def route(self, router: str, decision: str) -> None:
+        with self._lock:
+            key = (router, decision)
+            self.routes[key] = self.routes.get(key, 0) + 1
+
+    def speculation(self, outcome: str) -> None:
+        with self._lock:
+            self.speculations[outcome] = self.speculations.get(outcome, 0) + 1
+
+    def snapshot(self):
+        with self._lock:
+            return (
+                {name: dict(node) for name, node in self.nodes.items()},
+                {name: list(b) for name, b in self.histograms.items()},
+                dict(self.routes),
+                dict(self.speculations),
+                self.runs,
+                self.run_wall_time,
+            )
+
+
+_registry = _Registry()
+
+_current_run = contextvars.ContextVar("metrics_current_run", default=None)
+_current_node = contextvars.ContextVar("metrics_current_node", default=None)
+
+
+def current_run():
+    return _current_run.get()
+
+
+def current_node():
+    return _current_node.get()
+
+
+def _add(**values) -> None:
+    name = _current_node.get() or UNSCOPED_NODE
+    run = _current_run.get()
+    if run is not None:
+        run.add(name, **values)
+    _registry.add(name, **values)
+
+
+# =========================
+# 실행 / 노드 범위
+# =========================
+@contextmanager
+def run_scope():
+    """파이프라인 한 번의 실행 범위 (RunMetrics 반환)"""
+    run = RunMetrics()
+    token = _current_run.set(run)
+    started = time.perf_counter()
+    try:
+        yield run
+    finally:
+        run.wall_time = time.perf_counter() - started
+        _current_run.reset(token)
+        _registry.observe_run(run.wall_time)
+        if METRICS_JSONL_PATH:
+            append_jsonl(run, METRICS_JSONL_PATH)
+
+
+@contextmanager
+def node_scope(name: str):
+    """노드 하나의 실행 범위 (실행 시간 기록)"""
+    token = _current_node.set(name)
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        elapsed = time.perf_counter() - started
+        _current_node.reset(token)
+        run = _current_run.get()
+        if run is not None:
+            run.add(name, runs=1, wall_time=elapsed)
+        _registry.add(name, runs=1, wall_time=elapsed)
+        _registry.observe_node(name, elapsed)
+
+
+# =========================
+# 기록 함수
+# =========================
+def record_llm_call(queue_wait: float, retries: int, usage=None) -> None:
+    """API 호출 한 번 (limiter 대기 시간, 재시도 횟수, 응답 usage)"""
+    details = getattr(usage, "prompt_tokens_details", None)
+    _add(
+        llm_calls=1,
+        queue_wait=queue_wait,
+        retries=retries,
+        prompt_tokens=getattr(usage, "prompt_tokens", None) or 0,
+        cached_tokens=getattr(details, "cached_tokens", None) or 0,
+        completion_tokens=getattr(usage, "completion_tokens", None) or 0,
+    )
+
+
+def record_hedge() -> None:
+    """느린 요청에 중복 요청(hedge)을 보냄"""
+    _add(hedges=1)
+
+
+def record_hedge_win() -> None:
+    """중복 요청이 원래 요청보다 먼저 끝남"""
+    _add(hedge_wins=1)
+
+
+def record_node_retry() -> None:
+    _add(node_retries=1)
+
+
+def record_cache_hit() -> None:
+    _add(cache_hits=1)
+
+
+def record_repair() -> None:
+    """스키마 검증에 실패한 응답을 고치기 위한 재요청 한 번"""
+    _add(repairs=1)
+
+
+def record_parse_failure() -> None:
+    _add(parse_failures=1)
+
+
+def record_error() -> None:
+    _add(errors=1)
+
+
+def record_route(router: str, decision: str) -> None:
+    _registry.route(router, decision)
+
+
+def record_speculation(outcome: str) -> None:
+    """추측 실행한 노드 하나의 결과 (used / discarded / failed)"""
+    _registry.speculation(outcome)
+
+
+# =========================
+# 내보내기
+# =========================
+def append_jsonl(run: RunMetrics, path: str) -> None:
+    """실행 하나의 계측 결과를 JSON lines 파일에 추가"""
+    directory = os.path.dirname(path)
+    if directory:
+        os.makedirs(directory, exist_ok=True)
+    line = json.dumps(run.to_dict(), ensure_ascii=False)
+    with open(path, "a", encoding="utf-8") as f:
+        f.write(line + "\n")
+
+
+def render_prometheus() -> str:
+    """프로세스 누적 계측값을 Prometheus 텍스트 형식으로 반환"""
+    nodes, histograms, routes, speculations, runs, run_wall_time = _registry.snapshot()
+    lines = []
+
+    def metric(name, kind, help_text, samples):
+        lines.append(f"# HELP novel_reviewer_{name} {help_text}")
+        lines.append(f"# TYPE novel_reviewer_{name} {kind}")
+        for labels, value in samples:
+            label_text = ",".join(f'{k}="{v}"' for k, v in labels.items())
+            lines.append(f"novel_reviewer_{name}{{{label_text}}} {value}" if labels else f"novel_reviewer_{name} {value}")
+
+    metric("runs_total", "counter", "Pipeline runs", [({}, runs)])
+    metric("run_wall_seconds_total", "counter", "Total pipeline wall time", [({}, round(run_wall_time, 6))])
+
+    counters = [
+        ("node_runs_total", "runs", "Node executions"),
+        ("node_errors_total", "errors", "Node executions that raised"),
+        ("llm_calls_total", "llm_calls", "LLM API calls"),
+        ("llm_retries_total", "retries", "LLM API retries"),
+        ("llm_hedges_total", "hedges", "Duplicate requests sent for slow LLM calls"),
+        ("llm_hedge_wins_total", "hedge_wins", "Hedged requests that finished first"),
+        ("node_retries_total", "node_retries", "Node re-runs after a retryable failure"),
+        ("llm_cache_hits_total", "cache_hits", "LLM response cache hits"),
+        ("llm_repairs_total", "repairs", "Structured output repair calls"),
+        ("parse_failures_total", "parse_failures", "LLM responses that failed to parse"),
+        ("queue_wait_seconds_total", "queue_wait", "Time spent waiting for the rate limiter"),
+    ]
+    for name, field, help_text in counters:
+        metric(name, "counter", help_text, [({"node": n}, round(v[field], 6)) for n, v in sorted(nodes.items())])
+
+    metric(
+        "llm_tokens_total", "counter", "LLM tokens by kind",
+        [
+            ({"node": n, "kind": kind}, v[f"{kind}_tokens"])
+            for n, v in sorted(nodes.items())
+            for kind in ("prompt", "cached", "completion")
+        ],
+    )
+
+    lines.append("# HELP novel_reviewer_node_wall_seconds Node wall time")
+    lines.append("# TYPE novel_reviewer_node_wall_seconds histogram")
+    for n, buckets in sorted(histograms.items()):
+        for bound, count in zip(LATENCY_BUCKETS, buckets):
+            lines.append(f'novel_reviewer_node_wall_seconds_bucket{{node="{n}",le="{bound}"}} {count}')
+        lines.append(f'novel_reviewer_node_wall_seconds_bucket{{node="{n}",le="+Inf"}} {nodes[n]["runs"]}')
+        lines.append(f'novel_reviewer_node_wall_seconds_sum{{node="{n}"}} {round(nodes[n]["wall_time"], 6)}')
+        lines.append(f'novel_reviewer_node_wall_seconds_count{{node="{n}"}} {nodes[n]["runs"]}')
+
+    metric(
+        "route_decisions_total", "counter", "Routing decisions",
+        [({"router": r, "decision": d}, count) for (r, d), count in sorted(routes.items())],
+    )
+    metric(
+        "speculative_nodes_total", "counter", "Speculatively started nodes by outcome",
+        [({"outcome": o}, count) for o, count in sorted(speculations.items())],
+    )
+    return "\n".join(lines) + "\n"
+
+
+def _metrics_handler_class():
+    # http.server는 엔드포인트를 띄울 때만 import
+    from http.server import BaseHTTPRequestHandler
+
+    class MetricsHandler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split("?")[0] != "/metrics":
+                self.send_error(404)
+                return
+            body = render_prometheus().encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            # 스크레이프마다 stderr에 로그를 남기지 않음
+            pass
+
+    return MetricsHandler
+
+
+_server = None
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = "0.0.0.0"):
+    """
+    /metrics 엔드포인트를 백그라운드 스레드로 띄움 (이미 떠 있으면 그대로 반환)
+    """
+    from http.server import ThreadingHTTPServer
+
+    global _server
+    with _server_lock:
+        if _server is None:
+            _server = ThreadingHTTPServer((host, port), _metrics_handler_class())
+            thread = threading.Thread(target=_server.serve_forever, name="novel-reviewer-metrics", daemon=True)
+            thread.start()
+    return _server
@@ -0,0 +1,225 @@
+''' 원고 n-gram 색인 (반복 표현 탐지)
+    - 원고를 어절 단위 토큰으로 나누고 2~NGRAM_MAX_N 어절 n-gram을 64비트 해시로 만들어 정렬해 둠
+      (토큰 해시 / n-gram 해시 / 정렬 모두 NumPy 배열 연산, 원고 길이에 대해 거의 선형)
+    - 문장 경계(종결 부호, 줄바꿈)를 넘는 n-gram은 만들지 않음
+    - 같은 원고의 색인은 get_ngram_index로 한 번만 만들고 여러 노드가 재사용
+      (그래프 상태의 text 객체가 같으므로 한 번의 실행 안에서는 항상 캐시 적중)
+    - top_repeated: 많이 반복된 표현을 횟수 / 위치와 함께 반환 (더 긴 표현에 포함되는 짧은 표현은 합침)'''
+
+from functools import lru_cache
+
+# 색인하는 n-gram 길이 (어절 수)
+NGRAM_MIN_N = 2
+NGRAM_MAX_N = 6
+# 반복 표현으로 보는 최소 횟수 / 최소 글자 수 (공백 포함)
+REPEAT_MIN_COUNT = 3
+REPEAT_MIN_CHARS = 6
+# 긴 표현의 횟수가 짧은 표현 횟수의 이 비율 이상이면 짧은 표현은 긴 표현에 합침
+SUBSUME_RATIO = 0.8
+# n마다 횟수 상위 몇 개까지 후보로 볼지 (합치기 단계의 파이썬 연산량 제한)
+CANDIDATES_PER_N = 200
+# 결과에 넣는 위치 수 (전체 횟수는 count)
+MAX_POSITIONS = 20
+# 색인을 보관하는 원고 수 (동시에 분석 중인 원고 수 정도)
+INDEX_CACHE_SIZE = 8
+
+# 문장 경계: n-gram이 이 문자를 넘지 않음
+SENTENCE_BREAKS = ".!?…\n"
+
+_CHAR_BASE = 0x100000001B3          # 토큰 해시용 다항식 밑 (홀수 → mod 2^64 역원 존재)
+_TOKEN_BASE = 0x9E3779B97F4A7C15    # n-gram 해시용 밑
+
+
+def _word_mask(codes):
+    """어절을 이루는 글자 (한글, 영문, 숫자, 한자), 나머지는 구분자"""
+    return (
+        ((codes >= 0xAC00) & (codes <= 0xD7A3))
+        | ((codes >= 0x3131) & (codes <= 0x318E))
+        | ((codes >= ord("0")) & (codes <= ord("9")))
+        | ((codes >= ord("A")) & (codes <= ord("Z")))
+        | ((codes >= ord("a")) & (codes <= ord("z")))
+        | ((codes >= 0x4E00) & (codes <= 0x9FFF))
+    )
+
+
+def _tokenize(text: str):
+    """
+    (토큰 시작 위치, 토큰 끝 위치, 토큰 해시, 토큰 뒤 문장 경계 여부) 배열 반환
+    - 토큰 해시는 글자 다항식 해시 (접두 누적합 차이 × 시작 위치 역거듭제곱 → 위치와 무관)
+    """
+    import numpy as np
+
+    codes = np.frombuffer(text.encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    word = _word_mask(codes)
+    edges = np.diff(word.astype(np.int8), prepend=0, append=0)
+    starts = np.flatnonzero(edges == 1)
+    ends = np.flatnonzero(edges == -1)
+    if not len(starts):
+        empty = np.zeros(0, dtype=np.int64)
+        return empty, empty, np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=bool)
+
+    n = len(codes)
+    powers = np.empty(n, dtype=np.uint64)
+    powers[0] = 1
+    powers[1:] = _CHAR_BASE
+    powers = np.cumprod(powers)
+    inverse = np.empty(n, dtype=np.uint64)
+    inverse[0] = 1
+    inverse[1:] = pow(_CHAR_BASE, -1, 2 ** 64)
+    inverse = np.cumprod(inverse)
+    prefix = np.zeros(n + 1, dtype=np.uint64)
+    np.cumsum(codes * powers, out=prefix[1:])
+
+    lengths = (ends - starts).astype(np.uint64)
+    hashes = (prefix[ends] - prefix[starts]) * inverse[starts] * np.uint64(_TOKEN_BASE) + lengths
+
+    breaks = np.isin(codes, [ord(ch) for ch in SENTENCE_BREAKS])
+    break_count = np.zeros(n + 1, dtype=np.int64)
+    np.cumsum(breaks, out=break_count[1:])
+    # 토큰 t와 t+1 사이(마지막 토큰은 원고 끝까지)에 문장 경계가 있는지
+    gap_end = np.r_[starts[1:], n]
+    sentence_end = break_count[gap_end] > break_count[ends]
+    return starts, ends, hashes, sentence_end
+
+
+def _combine(hashes, i, n):
+    """토큰 i..i+n-1 의 n-gram 해시"""
+    import numpy as np
+
+    key = hashes[i].copy()
+    for k in range(1, n):
+        key = key * np.uint64(_TOKEN_BASE) + hashes[i + k]
+    return key
+
+
+class NgramIndex:
+    """
+    원고 하나의 n-gram 색인
+    - count(phrase) / positions(phrase): 표현의 등장 횟수 / 글자 위치
+    - top_repeated(): 반복이 많은 표현 목록
+    """
+
+    def __init__(self, text: str, max_n: int = NGRAM_MAX_N):
+        import numpy as np
+
+        self.text = text
+        self.max_n = max_n
+        self.starts, self.ends, self.hashes, sentence_end = _tokenize(text)
+        # 토큰 i 앞까지의 문장 경계 수: [i, i+n-1) 구간에 경계가 없으면 같은 문장 안의 n-gram
+        self._break_count = np.r_[0, np.cumsum(sentence_end)]
+
+        # n별 (정렬된 해시, 해당 n-gram의 첫 토큰 번호)
+        self._keys = {}
+        tokens = len(self.hashes)
+        for n in range(1, max_n + 1):
+            if tokens < n:
+                break
+            first = np.arange(tokens - n + 1)
+            first = first[self._break_count[first + n - 1] == self._break_count[first]]
+            keys = _combine(self.hashes, first, n)
+            order = np.argsort(keys)
+            self._keys[n] = (keys[order], first[order])
+
+    # -------------------------
+    # 조회
+    # -------------------------
+    def _occurrences(self, phrase: str):
+        """표현이 시작하는 토큰 번호 배열 (표현의 어절 수, 배열)"""
+        import numpy as np
+
+        _, _, hashes, _ = _tokenize(phrase)
+        n = len(hashes)
+        if not n or n > len(self.hashes):
+            return n, np.zeros(0, dtype=np.int64)
+
+        # 색인된 길이까지는 해시로 찾고, 더 긴 표현은 나머지 토큰을 직접 비교
+        head = min(n, self.max_n)
+        keys, first = self._keys[head]
+        key = _combine(hashes, np.zeros(1, dtype=np.int64), head)[0]
+        lo = np.searchsorted(keys, key, side="left")
+        hi = np.searchsorted(keys, key, side="right")
+        found = np.sort(first[lo:hi])
+        if n > head:
+            found = found[found + n <= len(self.hashes)]
+            for k in range(head, n):
+                found = found[self.hashes[found + k] == hashes[k]]
+            found = found[self._break_count[found + n - 1] == self._break_count[found]]
+        return n, found
+
+    def count(self, phrase: str) -> int:
+        return int(len(self._occurrences(phrase)[1]))
+
+    def positions(self, phrase: str) -> list:
+        """표현이 등장하는 글자 위치 (원고 앞부터)"""
+        return [int(self.starts[i]) for i in self._occurrences(phrase)[1]]
+
+    def phrase_at(self, token: int, n: int) -> str:
+        """토큰 token부터 n어절의 원문 (공백은 한 칸으로)"""
+        return " ".join(self.text[self.starts[token]:self.ends[token + n - 1]].split())
+
+    def _tokens_at(self, token: int, n: int) -> str:
+        # 구두점을 뺀 어절만 공백으로 이은 형태 (표현끼리 포함 관계 비교용)
+        return " ".join(self.text[self.starts[i]:self.ends[i]] for i in range(token, token + n))
+
+    # -------------------------
+    # 반복 표현
+    # -------------------------
+    def top_repeated(
+        self,
+        limit: int = 10,
+        min_count: int = REPEAT_MIN_COUNT,
+        min_chars: int = REPEAT_MIN_CHARS,
+        max_positions: int = MAX_POSITIONS,
+    ) -> list:
+        """
+        많이 반복된 표현 (반복된 어절 수 = 횟수 × 길이가 큰 순)
+        - 더 긴 반복 표현에 포함되고 횟수도 비슷한 짧은 표현은 제외 (같은 반복을 두 번 세지 않음)
+        Returns:
+            [{"phrase": str, "count": int, "positions": [글자 위치, ...]}, ...]
+        """
+        import numpy as np
+
+        candidates = []
+        for n in range(max(NGRAM_MIN_N, 1), self.max_n + 1):
+            if n not in self._keys:
+                break
+            keys, first = self._keys[n]
+            if not len(keys):
+                continue
+            run_starts = np.flatnonzero(np.r_[True, keys[1:] != keys[:-1]])
+            counts = np.diff(run_starts, append=len(keys))
+            frequent = np.flatnonzero(counts >= min_count)
+            frequent = frequent[np.argsort(-counts[frequent], kind="stable")][:CANDIDATES_PER_N]
+            for run in frequent:
+                start, count = run_starts[run], int(counts[run])
+                tokens = np.sort(first[start:start + count])
+                phrase = self.phrase_at(int(tokens[0]), n)
+                if len(phrase) >= min_chars:
+                    candidates.append((n, count, phrase, self._tokens_at(int(tokens[0]), n), tokens))
+
+        # 긴 표현부터 채택하고, 채택된 긴 표현에 포함되는 짧은 표현은 합침
+        candidates.sort(key=lambda c: (-c[0], -c[1]))
+        kept = []
+        for n, count, phrase, words, tokens in candidates:
+            if any(
+                f" {words} " in f" {other} " and other_count >= count * SUBSUME_RATIO
+                for _, other_count, _, other, _ in kept
+            ):
+                continue
+            kept.append((n, count, phrase, words, tokens))
+
+        kept.sort(key=lambda c: (-c[0] * c[1], -c[1]))
+        return [
+            {
+                "phrase": phrase,
+                "count": count,
+                "positions": [int(self.starts[i]) for i in tokens[:max_positions]],
+            }
+            for n, count, phrase, _, tokens in kept[:limit]
+        ]
+
+
+@lru_cache(maxsize=INDEX_CACHE_SIZE)
+def get_ngram_index(text: str) -> NgramIndex:
+    """원고의 n-gram 색인 (같은 원고면 만들어 둔 색인 재사용)"""
+    return NgramIndex(text)
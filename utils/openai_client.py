@@ -1,8 +1,437 @@
+''' 모든 노드가 공유하는 OpenAI 클라이언트
+    - 프로세스 전체에서 하나의 클라이언트(= 하나의 HTTP 커넥션 풀)만 생성
+    - keep-alive 커넥션을 재사용해 노드마다 TLS 핸드셰이크를 반복하지 않음
+    - 풀 크기 / 타임아웃은 환경 변수로 조정
+    - 동기(OpenAI) / 비동기(AsyncOpenAI) 호출 모두 이 모듈을 거침
+    - 모든 호출은 LLM 응답 캐시(utils.llm_cache)를 먼저 확인
+    - 실제 API 호출은 공유 rate limiter(utils.rate_limiter)를 거침
+      (SDK 자체 재시도는 끄고, 429는 limiter가 Retry-After를 반영해 재시도)
+    - 재시도 횟수 / 타임아웃 / 백오프 / hedging은 노드별 예산(utils.call_policy)을 따름
+    - 응답 usage의 프롬프트/캐시 적중(cached_tokens)/생성 토큰 수를 누적 집계
+      (노드별 대기 시간 / 재시도 / 캐시 적중은 utils.metrics에 기록)
+    - achat_completion(on_token=...)은 응답을 스트리밍으로 받아 토큰 조각마다 콜백 호출
+    - response_format(JSON 스키마)은 그대로 API에 전달 (검증 / repair는 utils.structured_output)
+    - openai / httpx는 무거우므로 실제 API를 처음 호출할 때 import
+      (캐시 적중만으로 끝나는 실행, 워커 프로세스 기동, Streamlit 첫 로딩이 빨라짐)'''
+
+import asyncio
+import hashlib
+import json
 import os
-from openai import OpenAI
+import threading
+import time
+import weakref
 
-def get_client():
+from utils import metrics
+from utils.call_policy import REQUEST_TIMEOUT, backoff_delay, get_policy, hedge_delay, record_latency
+from utils.llm_cache import PROMPT_VERSION, get_cache, make_cache_key
+from utils.rate_limiter import (
+    COMPLETION_TOKEN_ESTIMATE,
+    estimate_prompt_tokens,
+    get_rate_limiter,
+    parse_retry_after,
+)
+
+# =========================
+# 커넥션 풀 / 타임아웃 설정
+# =========================
+MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "20"))
+MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("OPENAI_MAX_KEEPALIVE_CONNECTIONS", "10"))
+KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+# 같은 원고 prefix를 가진 요청이 같은 캐시 서버로 가도록 prompt_cache_key를 함께 전송
+# (OpenAI 호환 서버가 이 필드를 거부하면 0으로 끔)
+SEND_PROMPT_CACHE_KEY = os.getenv("OPENAI_PROMPT_CACHE_KEY", "1").lower() not in ("0", "false", "no")
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+_client = None
+_client_lock = threading.Lock()
+
+# AsyncOpenAI의 커넥션 풀은 생성된 이벤트 루프에 묶이므로 루프별로 하나씩 보관
+_async_clients = weakref.WeakKeyDictionary()
+
+
+def _get_api_key() -> str:
     api_key = os.getenv("OPENAI_API_KEY")
     if not api_key:
         raise RuntimeError("OPENAI_API_KEY is not set")
-    return OpenAI(api_key=api_key)
+    return api_key
+
+
+def _api_errors():
+    """(RateLimitError, 일시적 오류로 보고 재시도하는 예외들) - 429는 limiter가 별도 처리"""
+    from openai import APIConnectionError, APITimeoutError, InternalServerError, RateLimitError
+
+    return RateLimitError, (APIConnectionError, APITimeoutError, InternalServerError)
+
+
+def _pool_settings():
+    import httpx
+
+    timeout = httpx.Timeout(REQUEST_TIMEOUT, connect=CONNECT_TIMEOUT)
+    limits = httpx.Limits(
+        max_connections=MAX_CONNECTIONS,
+        max_keepalive_connections=MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry=KEEPALIVE_EXPIRY,
+    )
+    return timeout, limits
+
+
+def _build_client():
+    from openai import DefaultHttpxClient, OpenAI
+
+    api_key = _get_api_key()
+    timeout, limits = _pool_settings()
+    http_client = DefaultHttpxClient(limits=limits, timeout=timeout)
+    return OpenAI(api_key=api_key, http_client=http_client, timeout=timeout, max_retries=0)
+
+
+def _build_async_client():
+    from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+
+    api_key = _get_api_key()
+    timeout, limits = _pool_settings()
+    http_client = DefaultAsyncHttpxClient(limits=limits, timeout=timeout)
+    return AsyncOpenAI(api_key=api_key, http_client=http_client, timeout=timeout, max_retries=0)
+
+
+def get_client():
+    """
+    공유 OpenAI 클라이언트 반환
+    - 최초 호출 시 한 번만 생성 (thread-safe)
+    - OpenAI 클라이언트는 스레드 간 공유 가능
+    """
+    global _client
+    if _client is None:
+        with _client_lock:
+            if _client is None:
+                _client = _build_client()
+    return _client
+
+
+def get_async_client():
+    """
+    현재 이벤트 루프에서 공유되는 AsyncOpenAI 클라이언트 반환
+    - 반드시 실행 중인 이벤트 루프 안에서 호출
+    """
+    loop = asyncio.get_running_loop()
+    client = _async_clients.get(loop)
+    if client is None:
+        client = _build_async_client()
+        _async_clients[loop] = client
+    return client
+
+
+# =========================
+# 토큰 사용량 집계
+# =========================
+_usage_lock = threading.Lock()
+_usage = {"requests": 0, "prompt_tokens": 0, "cached_tokens": 0, "completion_tokens": 0}
+
+
+def _record_usage(usage) -> None:
+    if usage is None:
+        return
+    details = getattr(usage, "prompt_tokens_details", None)
+    cached = getattr(details, "cached_tokens", None) or 0
+    with _usage_lock:
+        _usage["requests"] += 1
+        _usage["prompt_tokens"] += getattr(usage, "prompt_tokens", None) or 0
+        _usage["cached_tokens"] += cached
+        _usage["completion_tokens"] += getattr(usage, "completion_tokens", None) or 0
+
+
+def get_usage_stats() -> dict:
+    """API 호출 누적 토큰 사용량 (cached_ratio: 프롬프트 토큰 중 provider 캐시 적중 비율)"""
+    with _usage_lock:
+        stats = dict(_usage)
+    stats["cached_ratio"] = stats["cached_tokens"] / stats["prompt_tokens"] if stats["prompt_tokens"] else 0.0
+    return stats
+
+
+def reset_usage_stats() -> None:
+    with _usage_lock:
+        for key in _usage:
+            _usage[key] = 0
+
+
+# =========================
+# rate limit 적용 호출
+# =========================
+def _used_tokens(usage):
+    return getattr(usage, "total_tokens", None)
+
+
+async def _aread_stream(stream, on_token):
+    """스트리밍 응답을 읽으면서 조각마다 on_token 호출, (본문, usage) 반환"""
+    parts = []
+    usage = None
+    async for chunk in stream:
+        if getattr(chunk, "usage", None) is not None:
+            usage = chunk.usage
+        if chunk.choices:
+            delta = chunk.choices[0].delta.content
+            if delta:
+                parts.append(delta)
+                on_token(delta)
+    return "".join(parts), usage
+
+
+def _request_options(messages: list) -> dict:
+    # 마지막 지시 메시지를 뺀 앞부분(공통 system + 원고)이 같은 요청끼리 같은 키를 가짐
+    if not SEND_PROMPT_CACHE_KEY or len(messages) < 2:
+        return {}
+    prefix = json.dumps(messages[:-1], ensure_ascii=False, sort_keys=True)
+    return {"extra_body": {"prompt_cache_key": hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:32]}}
+
+
+def _format_options(response_format) -> dict:
+    return {} if response_format is None else {"response_format": response_format}
+
+
+def _stream_options(on_token) -> dict:
+    if on_token is None:
+        return {}
+    # 마지막 조각에 usage를 받아 rate limiter / 토큰 집계에 반영
+    return {"stream": True, "stream_options": {"include_usage": True}}
+
+
+def _is_quota_exhausted(error) -> bool:
+    # 결제 한도 초과는 기다려도 풀리지 않으므로 재시도하지 않음
+    return getattr(error, "code", None) == "insufficient_quota"
+
+
+def is_retryable_error(error) -> bool:
+    """다시 시도하면 성공할 수 있는 API 오류인지 (노드 재실행 판단용)"""
+    RateLimitError, transient_errors = _api_errors()
+    if isinstance(error, RateLimitError):
+        return not _is_quota_exhausted(error)
+    return isinstance(error, transient_errors)
+
+
+def _create(messages: list, model: str, temperature: float, response_format=None):
+    """
+    동기 호출 (노드 예산의 재시도 / 타임아웃 적용)
+    - 스레드에서 도는 요청은 취소할 수 없으므로 hedging은 비동기 호출에서만 사용
+    """
+    RateLimitError, transient_errors = _api_errors()
+    policy = get_policy()
+    limiter = get_rate_limiter()
+    tokens = estimate_prompt_tokens(messages) + COMPLETION_TOKEN_ESTIMATE
+    queue_wait = 0.0
+    usage = None
+    attempt = 0
+
+    try:
+        for attempt in range(policy["max_retries"] + 1):
+            waited = time.perf_counter()
+            limiter.acquire(tokens)
+            queue_wait += time.perf_counter() - waited
+            started = time.perf_counter()
+            try:
+                response = get_client().chat.completions.create(
+                    model=model,
+                    messages=messages,
+                    temperature=temperature,
+                    timeout=policy["timeout"],
+                    **_request_options(messages),
+                    **_format_options(response_format),
+                )
+            except RateLimitError as e:
+                limiter.release_failed(rate_limited=True, retry_after=parse_retry_after(e))
+                if attempt >= policy["max_retries"] or _is_quota_exhausted(e):
+                    raise
+                continue
+            except transient_errors:
+                limiter.release_failed()
+                if attempt >= policy["max_retries"]:
+                    raise
+                time.sleep(backoff_delay(attempt))
+                continue
+            except BaseException:
+                limiter.release_failed()
+                raise
+
+            usage = getattr(response, "usage", None)
+            limiter.release(tokens, _used_tokens(usage))
+            _record_usage(usage)
+            record_latency(time.perf_counter() - started)
+            return response.choices[0].message.content
+    finally:
+        # 실패한 호출도 대기 시간 / 재시도 횟수는 남김
+        metrics.record_llm_call(queue_wait, attempt, usage)
+
+
+async def _asend(call: dict, request: dict, on_token=None):
+    """
+    요청 한 번 (limiter 자리 확보 → API 호출 → 자리 반납), 본문 반환
+    - call: 한 번의 논리적 호출에서 공유하는 집계값 (queue_wait, usage, streamed)
+    """
+    RateLimitError, _ = _api_errors()
+    limiter = get_rate_limiter()
+    tokens = call["tokens"]
+
+    waited = time.perf_counter()
+    await limiter.aacquire(tokens)
+    call["queue_wait"] += time.perf_counter() - waited
+    started = time.perf_counter()
+
+    try:
+        response = await get_async_client().chat.completions.create(**request, **_stream_options(on_token))
+        if on_token is None:
+            content, usage = response.choices[0].message.content, getattr(response, "usage", None)
+        else:
+            def emit(token):
+                call["streamed"] = True
+                on_token(token)
+
+            content, usage = await _aread_stream(response, emit)
+    except RateLimitError as e:
+        limiter.release_failed(rate_limited=True, retry_after=parse_retry_after(e))
+        raise
+    except BaseException:
+        # 취소(CancelledError, hedge에서 진 요청 포함)도 자리는 반드시 반납
+        limiter.release_failed()
+        raise
+
+    limiter.release(tokens, _used_tokens(usage))
+    _record_usage(usage)
+    record_latency(time.perf_counter() - started)
+    call["usage"] = usage
+    return content
+
+
+async def _ahedged(send, delay: float):
+    """
+    send()를 실행하고 delay초 안에 끝나지 않으면 같은 요청을 하나 더 보내 먼저 성공한 결과 반환
+    - 남은 요청은 취소 (둘 다 실패하면 먼저 실패한 쪽의 예외)
+    """
+    tasks = [asyncio.ensure_future(send())]
+    try:
+        done, _ = await asyncio.wait(tasks, timeout=delay)
+        if not done:
+            metrics.record_hedge()
+            tasks.append(asyncio.ensure_future(send()))
+
+        pending = set(tasks)
+        error = None
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    if task is not tasks[0]:
+                        metrics.record_hedge_win()
+                    return task.result()
+                error = error or task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            if not task.done():
+                task.cancel()
+
+
+async def _acreate(messages: list, model: str, temperature: float, on_token=None, response_format=None):
+    """
+    비동기 호출 (노드 예산의 재시도 / 타임아웃 / hedging 적용)
+    - 스트리밍 호출은 토큰이 중복으로 나가지 않도록 hedging하지 않고, 토큰을 내보낸 뒤의 오류는 재시도하지 않음
+    """
+    RateLimitError, transient_errors = _api_errors()
+    policy = get_policy()
+    delay = None if on_token is not None else hedge_delay(policy)
+    call = {
+        "tokens": estimate_prompt_tokens(messages) + COMPLETION_TOKEN_ESTIMATE,
+        "queue_wait": 0.0,
+        "usage": None,
+        "streamed": False,
+    }
+    request = {
+        "model": model,
+        "messages": messages,
+        "temperature": temperature,
+        "timeout": policy["timeout"],
+        **_request_options(messages),
+        **_format_options(response_format),
+    }
+    attempt = 0
+
+    try:
+        for attempt in range(policy["max_retries"] + 1):
+            try:
+                if delay is None:
+                    return await _asend(call, request, on_token)
+                return await _ahedged(lambda: _asend(call, request), delay)
+            except RateLimitError as e:
+                if attempt >= policy["max_retries"] or _is_quota_exhausted(e) or call["streamed"]:
+                    raise
+            except transient_errors:
+                if attempt >= policy["max_retries"] or call["streamed"]:
+                    raise
+                await asyncio.sleep(backoff_delay(attempt))
+    finally:
+        # 실패한 호출도 대기 시간 / 재시도 횟수는 남김
+        metrics.record_llm_call(call["queue_wait"], attempt, call["usage"])
+
+
+# =========================
+# 공통 호출 함수
+# =========================
+def chat_completion(
+    messages: list,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.3,
+    prompt_version: str = PROMPT_VERSION,
+    response_format: dict | None = None,
+) -> str:
+    """
+    chat completion 호출 후 응답 본문(content) 반환
+    - 동일한 요청은 캐시된 응답을 반환
+    - response_format: OpenAI response_format (구조화 출력 스키마), 캐시 키에도 포함
+    """
+    cache = get_cache()
+    key = make_cache_key(model, messages, temperature, prompt_version, response_format)
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.record_cache_hit()
+        return cached
+
+    content = _create(messages, model, temperature, response_format)
+    cache.set(key, content)
+    return content
+
+
+async def achat_completion(
+    messages: list,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.3,
+    prompt_version: str = PROMPT_VERSION,
+    on_token=None,
+    response_format: dict | None = None,
+) -> str:
+    """
+    chat_completion의 비동기 버전
+    - on_token이 있으면 응답을 스트리밍으로 받아 조각마다 on_token(str) 호출
+      (캐시 적중 시에는 전체 응답으로 한 번 호출)
+    """
+    # SQLite 조회는 로컬 디스크 작업이라 짧으므로 루프에서 바로 수행
+    cache = get_cache()
+    key = make_cache_key(model, messages, temperature, prompt_version, response_format)
+    cached = cache.get(key)
+    if cached is not None:
+        metrics.record_cache_hit()
+        if on_token is not None:
+            on_token(cached)
+        return cached
+
+    content = await _acreate(messages, model, temperature, on_token, response_format)
+    cache.set(key, content)
+    return content
+
+
+def close_client() -> None:
+    """공유 클라이언트와 커넥션 풀 정리 (프로세스 종료 / 테스트용)"""
+    global _client
+    with _client_lock:
+        if _client is not None:
+            _client.close()
+            _client = None
@@ -0,0 +1,233 @@
+''' 평가용 대표 발췌 선택 (원고 앞부분 대신 이야기 전체를 덮는 발췌)
+    - 문단(paragraph_spans)을 PASSAGE_CHARS 정도의 발췌 단위로 묶고, 원고 위치로 구간을 나눔
+        * 도입: 원고 첫 부분을 이어서
+        * 전개: 원고를 MIDDLE_STRATA개 구간으로 나누고 구간마다 질의와 가장 관련 높은 발췌
+        * 결말: 원고 마지막 부분을 이어서
+    - 관련도는 BM25 (질의 = 장르 키워드 + 요약 키워드 + 줄거리 요약)
+        * 한국어 조사 / 어미 변화에 형태소 분석 없이 대응하도록 어절 안의 글자 bigram을 단어로 씀
+        * bigram 추출 / 질의 bigram 매칭 / 발췌별 점수 합산은 NumPy 배열 연산 (100만 자 원고도 수십 ms)
+    - 전체 분량은 토큰 예산으로 고정 → 원고가 길어져도 평가 호출 비용은 일정'''
+
+from utils.rate_limiter import count_tokens
+from utils.text_utils import paragraph_spans
+
+# 평가 노드에 보내는 발췌 전체 토큰 예산
+SAMPLE_TOKENS = 3000
+# 발췌 단위 하나의 목표 / 최대 길이 (짧은 문단은 이어 붙이고 긴 문단은 나눔)
+PASSAGE_CHARS = 300
+PASSAGE_MAX_CHARS = 600
+# 예산 중 도입 / 결말 몫 (나머지는 전개 구간에 똑같이 나눔)
+OPENING_SHARE = 0.25
+ENDING_SHARE = 0.15
+MIDDLE_STRATA = 5
+# 전개 구간마다 점수 상위 몇 개까지 담아 볼지 (토큰 수를 세는 발췌 수 제한 → 원고 길이와 무관한 비용)
+STRATUM_CANDIDATES = 8
+# BM25 매개변수
+BM25_K1 = 1.2
+BM25_B = 0.75
+# 키워드에서 나온 bigram의 질의 가중치 (줄거리 요약에서 나온 bigram은 1)
+KEYWORD_WEIGHT = 2.0
+
+_PAIR_SHIFT = 21    # 유니코드 코드 포인트 비트 수 (bigram 키 = 앞 글자 << 21 | 뒤 글자)
+
+
+def _passages(text: str) -> list:
+    """발췌 단위 (시작, 끝) 목록: 짧은 문단은 PASSAGE_CHARS까지 묶고 PASSAGE_MAX_CHARS보다 긴 문단은 공백에서 나눔"""
+    passages = []
+    current = None
+    for start, end in paragraph_spans(text):
+        while end - start > PASSAGE_MAX_CHARS:
+            cut = text.rfind(" ", start + PASSAGE_CHARS, start + PASSAGE_MAX_CHARS)
+            if cut <= start:
+                cut = start + PASSAGE_MAX_CHARS
+            if current:
+                passages.append(current)
+                current = None
+            passages.append((start, cut))
+            start = cut
+            while start < end and text[start].isspace():
+                start += 1
+        if start >= end:
+            continue
+        if current is None:
+            current = (start, end)
+        elif end - current[0] <= PASSAGE_MAX_CHARS:
+            current = (current[0], end)
+        else:
+            passages.append(current)
+            current = (start, end)
+        if current[1] - current[0] >= PASSAGE_CHARS:
+            passages.append(current)
+            current = None
+    if current:
+        passages.append(current)
+    return passages
+
+
+def _bigram_keys(text: str):
+    """(bigram 키, 키의 글자 위치) 배열: 어절 안에서 이어진 두 글자만 (한글 / 영문 / 숫자, 영문은 소문자로)"""
+    import numpy as np
+
+    codes = np.frombuffer(text.lower().encode("utf-32-le"), dtype=np.uint32).astype(np.uint64)
+    word = (
+        ((codes >= 0xAC00) & (codes <= 0xD7A3))
+        | ((codes >= ord("0")) & (codes <= ord("9")))
+        | ((codes >= ord("a")) & (codes <= ord("z")))
+    )
+    positions = np.flatnonzero(word[:-1] & word[1:])
+    keys = (codes[positions] << np.uint64(_PAIR_SHIFT)) | codes[positions + 1]
+    return keys, positions
+
+
+def _query_weights(keywords: list, context: str):
+    """질의 bigram (정렬된 키, 가중치): 같은 bigram은 가장 큰 가중치 하나만"""
+    import numpy as np
+
+    weights = {}
+    for source, weight in ((context or "", 1.0), (" ".join(keywords or []), KEYWORD_WEIGHT)):
+        keys, _ = _bigram_keys(source)
+        for key in keys.tolist():
+            weights[key] = max(weights.get(key, 0.0), weight)
+    keys = np.array(sorted(weights), dtype=np.uint64)
+    return keys, np.array([weights[k] for k in keys.tolist()], dtype=np.float64)
+
+
+def bm25_scores(text: str, passages: list, keywords: list, context: str = ""):
+    """발췌 단위마다 질의에 대한 BM25 점수 (질의가 비었거나 겹치는 bigram이 없으면 모두 0)"""
+    import numpy as np
+
+    n = len(passages)
+    scores = np.zeros(n)
+    query, weights = _query_weights(keywords, context)
+    if not n or not len(query):
+        return scores
+
+    keys, positions = _bigram_keys(text)
+    term = np.minimum(np.searchsorted(query, keys), len(query) - 1)
+    hit = query[term] == keys
+    term, positions = term[hit], positions[hit]
+
+    starts = np.array([s for s, _ in passages])
+    ends = np.array([e for _, e in passages])
+    doc = np.searchsorted(starts, positions, side="right") - 1
+    inside = (doc >= 0) & (positions + 1 < ends[np.maximum(doc, 0)])
+    term, doc = term[inside], doc[inside]
+    if not len(doc):
+        return scores
+
+    # (발췌, bigram) 쌍별 등장 횟수 → 문서 빈도 / 점수
+    pairs, tf = np.unique(doc.astype(np.int64) * len(query) + term, return_counts=True)
+    doc, term = pairs // len(query), pairs % len(query)
+    df = np.bincount(term, minlength=len(query))
+    idf = np.log((n - df + 0.5) / (df + 0.5) + 1.0)
+    lengths = (ends - starts).astype(np.float64)
+    norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths / lengths.mean())
+    gain = weights[term] * idf[term] * tf * (BM25_K1 + 1) / (tf + norm[doc])
+    return np.bincount(doc, weights=gain, minlength=n)
+
+
+class PassageSampler:
+    """
+    원고 하나에서 토큰 예산 안의 대표 발췌 고르기
+    - select(): 고른 발췌 단위 번호 (원고 순서)
+    - render(): 위치 표시를 붙인 발췌 본문
+    """
+
+    def __init__(self, text: str, keywords: list = None, context: str = ""):
+        self.text = text
+        self.passages = _passages(text)
+        self.scores = bm25_scores(text, self.passages, keywords or [], context)
+        self._tokens = {}
+
+    def tokens(self, number: int) -> int:
+        if number not in self._tokens:
+            start, end = self.passages[number]
+            self._tokens[number] = count_tokens(self.text[start:end]) + 8    # 위치 표시 줄 포함
+        return self._tokens[number]
+
+    def _take_run(self, order, budget: int, chosen: set) -> int:
+        """order 순서로 이어서 담다가 예산을 넘으면 멈춤 (하나도 못 담았으면 첫 단위는 담음), 쓴 토큰 반환"""
+        used = 0
+        for number in order:
+            if number in chosen:
+                break
+            size = self.tokens(number)
+            if used + size > budget and used:
+                break
+            chosen.add(number)
+            used += size
+        return used
+
+    def select(self, max_tokens: int = SAMPLE_TOKENS) -> list:
+        """
+        도입 / 전개 구간별 / 결말 발췌 단위 번호
+        - 전개 구간은 BM25 점수 순으로 담고(같으면 구간 가운데에 가까운 순), 구간에서 남은 예산은 다음 구간으로 넘김
+        """
+        n = len(self.passages)
+        if not n:
+            return []
+        chosen = set()
+        opening = self._take_run(range(n), int(max_tokens * OPENING_SHARE), chosen)
+        ending = self._take_run(range(n - 1, -1, -1), int(max_tokens * ENDING_SHARE), chosen)
+
+        middle = [i for i in range(n) if i not in chosen]
+        if not middle:
+            return sorted(chosen)
+        # 구간은 발췌 개수가 아니라 원고 글자 위치로 나눔 (이야기 진행 정도)
+        first, last = self.passages[middle[0]][0], self.passages[middle[-1]][1]
+        width = max(1, last - first) / MIDDLE_STRATA
+        strata = [[] for _ in range(MIDDLE_STRATA)]
+        for i in middle:
+            strata[min(MIDDLE_STRATA - 1, int((self.passages[i][0] - first) / width))].append(i)
+
+        carry = 0
+        share = (max_tokens - opening - ending) / MIDDLE_STRATA
+        for k, members in enumerate(strata):
+            budget = share + carry
+            center = first + width * (k + 0.5)
+            ranked = sorted(members, key=lambda i: (-self.scores[i], abs(self.passages[i][0] - center)))
+            used = 0
+            for i in ranked[:STRATUM_CANDIDATES]:
+                size = self.tokens(i)
+                if used + size > budget:
+                    continue
+                chosen.add(i)
+                used += size
+            carry = budget - used
+        return sorted(chosen)
+
+    def render(self, chosen: list) -> str:
+        """발췌 본문: 이어진 발췌 묶음마다 도입 / 전개 / 결말과 원고 내 위치(%) 표시, 묶음 사이는 [...]"""
+        runs = []
+        for number in chosen:
+            if runs and number == runs[-1][-1] + 1:
+                runs[-1].append(number)
+            else:
+                runs.append([number])
+
+        lines = []
+        for run in runs:
+            if lines:
+                lines.append("[...]")
+            part = "도입" if run[0] == 0 else "결말" if run[-1] == len(self.passages) - 1 else "전개"
+            lines.append(f"[{part} · 원고 {self.passages[run[0]][0] * 100 // len(self.text)}% 지점]")
+            lines.extend(self.text[start:end].strip() for start, end in (self.passages[i] for i in run))
+        return "\n".join(lines)
+
+
+def sample_passages(
+    text: str,
+    keywords: list = None,
+    context: str = "",
+    max_tokens: int = SAMPLE_TOKENS,
+) -> tuple[str, str]:
+    """
+    평가 노드에 보낼 (라벨, 본문)
+    - 원고가 max_tokens 안에 들어가면 원고 전체
+    - 아니면 도입 + 전개 구간별 관련 발췌 + 결말 (전체 max_tokens 이하)
+    """
+    # 토큰 하나가 4글자를 넘는 경우는 드물므로 그보다 긴 원고는 토큰을 세지 않고 발췌
+    if len(text) <= max_tokens * 4 and count_tokens(text) <= max_tokens:
+        return "소설 원문", text
+    sampler = PassageSampler(text, keywords, context)
+    return "원고 발췌", sampler.render(sampler.select(max_tokens))
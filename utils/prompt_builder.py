@@ -0,0 +1,24 @@
+''' 프롬프트 구성 유틸 (provider prefix caching 최적화)
+    - OpenAI는 요청 앞부분(prefix)이 이전 요청과 같으면 캐시된 토큰을 재사용함
+    - 모든 노드가 [공통 system] → [원고] 순서의 동일한 앞부분을 쓰고,
+      노드별 지시문은 그 뒤에 붙여서 한 번의 분석 안에서 두 번째 호출부터 캐시가 적중하도록 함'''
+
+# 모든 노드가 공유하는 system 메시지 (바꾸면 모든 노드의 prefix cache가 초기화됨)
+SHARED_SYSTEM_PROMPT = (
+    "당신은 웹소설 원고 분석 전문 AI입니다. "
+    "먼저 분석 대상 원고가 주어지고, 그 다음 메시지에 수행할 작업이 주어집니다. "
+    "작업 지시와 출력 형식을 정확히 따르세요."
+)
+
+
+def build_manuscript_messages(text: str, instructions: str, label: str = "소설 원문") -> list:
+    """
+    [공통 system] → [원고] → [작업 지시] 순서의 chat 메시지 생성
+    - 같은 원고로 만든 메시지들은 마지막 지시문을 제외하고 모두 동일
+    - 실행마다 달라지는 정보(요약, 인물 관찰 등)는 instructions 쪽에 넣어야 prefix가 유지됨
+    """
+    return [
+        {"role": "system", "content": SHARED_SYSTEM_PROMPT},
+        {"role": "user", "content": f"[{label}]\n{text}"},
+        {"role": "user", "content": instructions.strip()},
+    ]
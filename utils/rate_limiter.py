@@ -0,0 +1,222 @@
+''' OpenAI 호출 공유 rate limiter
+    - RPM(분당 요청 수) / TPM(분당 토큰 수)을 토큰 버킷으로 관리
+    - 프롬프트 토큰은 tiktoken으로 추정 (없으면 글자 수 기반 근사)
+    - 동시 요청 수를 429 / Retry-After 신호에 따라 자동 조절 (AIMD)
+        * 성공이 이어지면 동시 요청 수를 1씩 늘림
+        * 429를 받으면 절반으로 줄이고 Retry-After 동안 새 요청을 멈춤
+    - 동기 / 비동기 호출이 같은 limiter 상태를 공유'''
+
+import asyncio
+import os
+import threading
+import time
+
+# =========================
+# 설정
+# =========================
+RPM_LIMIT = int(os.getenv("OPENAI_RPM_LIMIT", "500"))
+TPM_LIMIT = int(os.getenv("OPENAI_TPM_LIMIT", "200000"))
+MIN_CONCURRENCY = int(os.getenv("OPENAI_MIN_CONCURRENCY", "1"))
+MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "32"))
+INITIAL_CONCURRENCY = int(os.getenv("OPENAI_INITIAL_CONCURRENCY", "8"))
+
+# 응답 토큰은 미리 알 수 없으므로 예약량으로 잡고, 응답 후 실제 사용량으로 정산
+COMPLETION_TOKEN_ESTIMATE = int(os.getenv("OPENAI_COMPLETION_TOKEN_ESTIMATE", "800"))
+
+# Retry-After 헤더가 없을 때 기본 대기 시간(초)
+DEFAULT_RETRY_AFTER = 2.0
+
+# 동시 요청 수 제한에 걸렸을 때 다시 확인하는 간격(초)
+POLL_INTERVAL = 0.05
+
+
+# =========================
+# 토큰 추정
+# =========================
+_encoding = None
+_encoding_lock = threading.Lock()
+
+
+def _get_encoding():
+    global _encoding
+    if _encoding is None:
+        with _encoding_lock:
+            if _encoding is None:
+                try:
+                    import tiktoken
+                    _encoding = tiktoken.get_encoding("o200k_base")
+                except Exception:
+                    # tiktoken이 없거나 인코딩 파일을 받을 수 없는 환경
+                    _encoding = False
+    return _encoding
+
+
+def count_tokens(text: str) -> int:
+    """텍스트 토큰 수 (tiktoken 사용 불가 시 한글 기준 근사치)"""
+    encoding = _get_encoding()
+    if encoding:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 2 + 1
+
+
+def estimate_prompt_tokens(messages: list) -> int:
+    """chat 메시지 목록의 프롬프트 토큰 수 추정 (메시지당 오버헤드 포함)"""
+    return sum(count_tokens(m.get("content") or "") + 4 for m in messages) + 3
+
+
+# =========================
+# Limiter
+# =========================
+class RateLimiter:
+    """RPM / TPM 토큰 버킷 + 적응형 동시 요청 수 제한"""
+
+    def __init__(
+        self,
+        rpm: int = RPM_LIMIT,
+        tpm: int = TPM_LIMIT,
+        min_concurrency: int = MIN_CONCURRENCY,
+        max_concurrency: int = MAX_CONCURRENCY,
+        initial_concurrency: int = INITIAL_CONCURRENCY,
+    ):
+        self.rpm = rpm
+        self.tpm = tpm
+        self.min_concurrency = min_concurrency
+        self.max_concurrency = max_concurrency
+        self.concurrency = max(min_concurrency, min(initial_concurrency, max_concurrency))
+
+        now = time.monotonic()
+        self._requests = float(rpm)
+        self._tokens = float(tpm)
+        self._updated = now
+        self._paused_until = 0.0
+        self._in_flight = 0
+        self._successes = 0
+
+        self.rate_limited = 0
+        self._lock = threading.Lock()
+
+    # -------------------------
+    # 버킷 관리
+    # -------------------------
+    def _refill(self, now: float) -> None:
+        elapsed = now - self._updated
+        self._updated = now
+        self._requests = min(self.rpm, self._requests + elapsed * self.rpm / 60)
+        self._tokens = min(self.tpm, self._tokens + elapsed * self.tpm / 60)
+
+    def _try_acquire(self, tokens: int) -> float:
+        """
+        자리를 확보하면 0, 아니면 다시 시도할 때까지 기다릴 시간(초) 반환
+        - 한 번에 TPM보다 큰 요청은 버킷이 가득 찼을 때 통과시킴
+        """
+        tokens = min(tokens, self.tpm)
+        with self._lock:
+            now = time.monotonic()
+            self._refill(now)
+
+            if now < self._paused_until:
+                return self._paused_until - now
+            if self._in_flight >= self.concurrency:
+                return POLL_INTERVAL
+
+            wait = 0.0
+            if self._requests < 1:
+                wait = max(wait, (1 - self._requests) * 60 / self.rpm)
+            if self._tokens < tokens:
+                wait = max(wait, (tokens - self._tokens) * 60 / self.tpm)
+            if wait > 0:
+                return wait
+
+            self._requests -= 1
+            self._tokens -= tokens
+            self._in_flight += 1
+            return 0.0
+
+    def acquire(self, tokens: int) -> None:
+        """요청 자리 확보 (동기, 필요하면 대기)"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            time.sleep(wait)
+
+    async def aacquire(self, tokens: int) -> None:
+        """요청 자리 확보 (비동기, 이벤트 루프를 막지 않고 대기)"""
+        while True:
+            wait = self._try_acquire(tokens)
+            if wait <= 0:
+                return
+            await asyncio.sleep(wait)
+
+    # -------------------------
+    # 결과 반영
+    # -------------------------
+    def release(self, reserved_tokens: int, used_tokens: int | None = None) -> None:
+        """
+        요청 성공 후 호출
+        - 예약한 토큰과 실제 사용량의 차이를 정산
+        - 성공이 동시 요청 수만큼 이어지면 동시 요청 수 +1
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if used_tokens is not None:
+                self._tokens = min(self.tpm, self._tokens + min(reserved_tokens, self.tpm) - used_tokens)
+
+            self._successes += 1
+            if self._successes >= self.concurrency and self.concurrency < self.max_concurrency:
+                self.concurrency += 1
+                self._successes = 0
+
+    def release_failed(self, rate_limited: bool = False, retry_after: float | None = None) -> None:
+        """
+        요청 실패 후 호출
+        - 429이면 동시 요청 수를 절반으로 줄이고 Retry-After 동안 새 요청을 멈춤
+        """
+        with self._lock:
+            self._in_flight = max(0, self._in_flight - 1)
+            if not rate_limited:
+                return
+
+            self.rate_limited += 1
+            self._successes = 0
+            self.concurrency = max(self.min_concurrency, self.concurrency // 2)
+            pause = retry_after if retry_after is not None else DEFAULT_RETRY_AFTER
+            self._paused_until = max(self._paused_until, time.monotonic() + pause)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "concurrency": self.concurrency,
+                "in_flight": self._in_flight,
+                "rate_limited": self.rate_limited,
+                "available_requests": round(self._requests, 2),
+                "available_tokens": round(self._tokens),
+            }
+
+
+def parse_retry_after(error) -> float | None:
+    """openai.RateLimitError의 응답 헤더에서 Retry-After(초) 추출"""
+    response = getattr(error, "response", None)
+    headers = getattr(response, "headers", None) or {}
+    try:
+        if headers.get("retry-after-ms"):
+            return float(headers["retry-after-ms"]) / 1000
+        if headers.get("retry-after"):
+            return float(headers["retry-after"])
+    except (TypeError, ValueError):
+        pass
+    return None
+
+
+_limiter = None
+_limiter_lock = threading.Lock()
+
+
+def get_rate_limiter() -> RateLimiter:
+    """프로세스 공유 limiter 반환"""
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = RateLimiter()
+    return _limiter
@@ -0,0 +1,167 @@
+''' 분기 지점 추측 실행 (speculative execution)
+    - 게이트 노드(text_type, genre/evaluation)가 실행되는 동안, 통과를 가정하고 다음 노드를 미리 시작
+    - 다음 노드가 실제로 실행될 때 입력(상태 키)이 추측 시점과 같으면 미리 계산한 결과를 그대로 사용
+    - 게이트가 다른 길을 고르면 남은 추측 작업은 취소하고, 낭비된 호출 비율을 계측값에 남김
+    - 추측 작업의 LLM 호출은 "speculative:<노드>" 이름으로 집계 (사용 / 폐기 여부와 무관하게 실제 비용)
+    - 실행 범위는 contextvar로 전달 (utils.metrics의 run_scope와 같은 방식)
+    - 추측 작업은 결과만 계산하고 밖에 남는 부수 효과(연재 저장소 쓰기 등)는 하지 않음
+      (그런 작업은 노드 finalize로 분리해 결과가 채택된 뒤에만 실행, langgraph_pipeline.safe_node_wrapper)'''
+
+import asyncio
+import contextvars
+import threading
+from contextlib import asynccontextmanager
+
+from utils import metrics
+
+SPECULATIVE_PREFIX = "speculative:"
+
+_current = contextvars.ContextVar("speculation_current", default=None)
+_speculating = contextvars.ContextVar("speculation_running", default=False)
+
+
+def current_speculation():
+    return _current.get()
+
+
+def is_speculative() -> bool:
+    """추측 실행 중인 노드 안인지 (토큰 스트리밍 등 부수 효과를 끌 때 사용)"""
+    return _speculating.get()
+
+
+class Speculation:
+    """
+    한 번의 실행에서 게이트와 동시에 미리 시작한 노드 작업
+    - plan: {게이트 노드: {미리 시작할 노드: (결과가 의존하는 상태 키, ...)}}
+    - nodes: {노드 이름: async 노드 함수(state) -> 상태 변경분}
+    - conditions: {게이트 노드: state -> bool} 추측할 가치가 있을 때만 시작 (없으면 항상)
+    """
+
+    def __init__(self, plan: dict, nodes: dict, conditions: dict | None = None):
+        self.plan = plan
+        self.nodes = nodes
+        self.conditions = conditions or {}
+        self._loop = asyncio.get_running_loop()
+        self._tasks = {}
+        self._all_tasks = []
+        self._lock = threading.Lock()
+        self.started = []
+        self.used = []
+        self.discarded = []
+        self.failed = []
+
+    # -------------------------
+    # 시작 / 사용
+    # -------------------------
+    def launch(self, gate: str, state: dict) -> None:
+        """게이트 노드 시작 시 호출: 계획된 다음 노드들을 미리 실행"""
+        targets = self.plan.get(gate)
+        if not targets:
+            return
+        condition = self.conditions.get(gate)
+        if condition is not None and not condition(state):
+            return
+        for node, keys in targets.items():
+            with self._lock:
+                if node in self._tasks:
+                    continue
+                inputs = {key: state.get(key) for key in keys}
+                task = asyncio.ensure_future(self._run(node, dict(state)))
+                self._tasks[node] = (task, inputs)
+                self._all_tasks.append(task)
+                self.started.append(node)
+
+    async def _run(self, node: str, state: dict):
+        _speculating.set(True)
+        with metrics.node_scope(SPECULATIVE_PREFIX + node):
+            return await self.nodes[node](state)
+
+    async def take(self, node: str, state: dict):
+        """
+        노드가 실제로 실행될 때 호출: 미리 계산한 결과(상태 변경분) 반환
+        - 추측이 없었거나 입력이 달라졌거나 추측 작업이 실패했으면 None (→ 평소처럼 실행)
+        """
+        with self._lock:
+            entry = self._tasks.pop(node, None)
+        if entry is None:
+            return None
+
+        task, inputs = entry
+        if any(state.get(key) != value for key, value in inputs.items()):
+            task.cancel()
+            self._finish(node, "discarded")
+            return None
+        try:
+            result = await task
+        except Exception:
+            self._finish(node, "failed")
+            return None
+        self._finish(node, "used")
+        return result
+
+    # -------------------------
+    # 폐기
+    # -------------------------
+    def keep_only(self, targets) -> None:
+        """
+        라우터 결정 후 호출: 선택되지 않은 노드의 추측 작업 취소
+        - 라우터가 스레드에서 실행될 수 있으므로 취소는 이벤트 루프에 맡김
+        """
+        keep = set(targets)
+        with self._lock:
+            dropped = [node for node in self._tasks if node not in keep]
+            entries = [(node, self._tasks.pop(node)[0]) for node in dropped]
+        for node, task in entries:
+            self._loop.call_soon_threadsafe(task.cancel)
+            self._finish(node, "discarded")
+
+    async def aclose(self) -> None:
+        """실행 종료 시 남은 추측 작업을 취소하고 끝날 때까지 기다림 (비용 집계를 확정하기 위해)"""
+        with self._lock:
+            leftover = list(self._tasks.items())
+            self._tasks.clear()
+        for node, (task, _) in leftover:
+            task.cancel()
+            self._finish(node, "discarded")
+
+        # 취소된 작업의 LLM 호출 계측(finally)까지 끝나야 report가 정확함
+        await asyncio.gather(*self._all_tasks, return_exceptions=True)
+
+    def _finish(self, node: str, outcome: str) -> None:
+        getattr(self, outcome).append(node)
+        metrics.record_speculation(outcome)
+
+    # -------------------------
+    # 보고
+    # -------------------------
+    def report(self, run: metrics.RunMetrics) -> dict:
+        """추측 실행 결과 (wasted_ratio: 이 실행의 전체 LLM 호출 중 폐기된 추측 작업의 호출 비율)"""
+        nodes = run.to_dict()["nodes"]
+        totals = run.totals()
+
+        def spent(names, field):
+            return sum(nodes.get(SPECULATIVE_PREFIX + n, {}).get(field, 0) for n in names)
+
+        wasted = self.discarded + self.failed
+        wasted_calls = spent(wasted, "llm_calls")
+        return {
+            "started": len(self.started),
+            "used": self.used,
+            "discarded": self.discarded,
+            "failed": self.failed,
+            "wasted_calls": wasted_calls,
+            "wasted_tokens": spent(wasted, "prompt_tokens") + spent(wasted, "completion_tokens"),
+            "wasted_ratio": round(wasted_calls / totals["llm_calls"], 4) if totals["llm_calls"] else 0.0,
+        }
+
+
+@asynccontextmanager
+async def speculation_scope(plan: dict, nodes: dict, conditions: dict | None = None):
+    """한 번의 실행 동안 추측 실행을 켬 (Speculation 반환)"""
+    speculation = Speculation(plan, nodes, conditions)
+    token = _current.set(speculation)
+    try:
+        yield speculation
+    finally:
+        _current.reset(token)
+        await speculation.aclose()
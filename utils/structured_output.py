@@ -0,0 +1,236 @@
+''' 노드 응답 구조화 출력 (JSON 스키마 + 검증 + repair)
+    - 노드마다 응답 JSON 스키마를 정의하고 API에 response_format(json_schema, strict)로 전달
+    - 받은 응답은 로컬에서 다시 검증 (스키마를 지원하지 않는 호환 서버 / 이전에 캐시된 응답 대비)
+    - 검증에 실패한 경우에만 repair 요청: 원고 없이 "깨진 응답 + 스키마 + 오류 목록"만 보내 형식을 고침
+      (원고 전체를 다시 보내는 것보다 훨씬 싸고, 응답 하나가 깨졌다고 실행 전체를 버리지 않음)
+    - 끝내 고치지 못하면 기존과 같은 {"raw_response": ..., "parse_error": True} 형태에
+      validation_errors를 붙여 반환하고 파싱 실패로 계측
+    - 모델이 응답을 거부하면(strict 모드의 refusal → content 없음) 고칠 내용이 없으므로 repair 없이 바로 실패'''
+
+import json
+import logging
+import os
+
+from utils import metrics
+from utils.openai_client import DEFAULT_MODEL, achat_completion, chat_completion
+
+logger = logging.getLogger(__name__)
+
+# response_format(json_schema)을 API에 전송 (지원하지 않는 OpenAI 호환 서버면 0으로 끔, 검증 / repair는 유지)
+SEND_RESPONSE_SCHEMA = os.getenv("OPENAI_STRUCTURED_OUTPUT", "1").lower() not in ("0", "false", "no")
+# 검증 실패 시 repair 요청 최대 횟수 (0이면 repair 없이 바로 실패 처리)
+MAX_REPAIR_ATTEMPTS = int(os.getenv("OPENAI_MAX_REPAIRS", "1"))
+# repair 요청에 넣는 깨진 응답 최대 길이
+REPAIR_CONTENT_CHARS = 12000
+# 응답 거부(content 없음) 시 validation_errors에 남기는 메시지
+REFUSAL_ERROR = "모델이 응답을 거부함 (content 없음)"
+
+
+# =========================
+# 스키마 구성 도우미
+# =========================
+STRING = {"type": "string"}
+STRING_LIST = {"type": "array", "items": STRING}
+SCORE = {"type": "integer", "minimum": 0, "maximum": 100}
+RATIO = {"type": "number", "minimum": 0, "maximum": 1}
+
+
+def object_schema(properties: dict) -> dict:
+    """모든 키가 필수이고 추가 키가 없는 object 스키마 (strict 모드 요구사항)"""
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def array_schema(items: dict) -> dict:
+    return {"type": "array", "items": items}
+
+
+def response_format(name: str, schema: dict) -> dict | None:
+    if not SEND_RESPONSE_SCHEMA:
+        return None
+    return {"type": "json_schema", "json_schema": {"name": name, "schema": schema, "strict": True}}
+
+
+# =========================
+# 파싱 / 검증
+# =========================
+def extract_json(content: str):
+    """
+    응답 문자열에서 JSON 값 추출 (코드펜스 / 앞뒤 설명 허용)
+    Returns:
+        (값, None) 또는 (None, 오류 메시지)
+    """
+    cleaned = (content or "").strip().strip("`").strip()
+    if cleaned.lower().startswith("json"):
+        cleaned = cleaned[4:].strip()
+    try:
+        return json.loads(cleaned), None
+    except json.JSONDecodeError as e:
+        error = f"JSON 파싱 실패: {e.msg} (위치 {e.pos})"
+
+    # 앞뒤에 설명이 붙은 경우 가장 바깥 중괄호만 다시 시도
+    start, end = cleaned.find("{"), cleaned.rfind("}")
+    if 0 <= start < end:
+        try:
+            return json.loads(cleaned[start:end + 1]), None
+        except json.JSONDecodeError:
+            pass
+    return None, error
+
+
+_TYPE_CHECKS = {
+    "object": lambda v: isinstance(v, dict),
+    "array": lambda v: isinstance(v, list),
+    "string": lambda v: isinstance(v, str),
+    "integer": lambda v: isinstance(v, int) and not isinstance(v, bool),
+    "number": lambda v: isinstance(v, (int, float)) and not isinstance(v, bool),
+    "boolean": lambda v: isinstance(v, bool),
+}
+
+
+def validate(value, schema: dict, path: str = "$") -> list:
+    """
+    노드 스키마에 쓰는 JSON Schema 부분집합(type / properties / required / items / enum / minimum / maximum) 검증
+    - 추가 키는 소비하는 쪽에서 무시하므로 오류로 보지 않음 (불필요한 repair 방지)
+    Returns:
+        오류 메시지 목록 (비어 있으면 통과)
+    """
+    expected = schema.get("type")
+    if expected and not _TYPE_CHECKS[expected](value):
+        return [f"{path}: {expected} 타입이어야 함 (현재 {type(value).__name__})"]
+
+    errors = []
+    if "enum" in schema and value not in schema["enum"]:
+        errors.append(f"{path}: {schema['enum']} 중 하나여야 함 (현재 {value!r})")
+    if "minimum" in schema and value < schema["minimum"]:
+        errors.append(f"{path}: {schema['minimum']} 이상이어야 함 (현재 {value})")
+    if "maximum" in schema and value > schema["maximum"]:
+        errors.append(f"{path}: {schema['maximum']} 이하여야 함 (현재 {value})")
+
+    if expected == "object":
+        properties = schema.get("properties", {})
+        for key in schema.get("required", []):
+            if key not in value:
+                errors.append(f"{path}.{key}: 누락")
+        for key, sub_schema in properties.items():
+            if key in value:
+                errors.extend(validate(value[key], sub_schema, f"{path}.{key}"))
+    elif expected == "array" and "items" in schema:
+        for i, item in enumerate(value):
+            errors.extend(validate(item, schema["items"], f"{path}[{i}]"))
+    return errors
+
+
+def parse_and_validate(content: str, schema: dict):
+    """(값, 오류 목록) 반환"""
+    value, error = extract_json(content)
+    if error:
+        return None, [error]
+    return value, validate(value, schema)
+
+
+# =========================
+# repair 요청
+# =========================
+REPAIR_SYSTEM_PROMPT = (
+    "당신은 JSON 형식 교정기입니다. "
+    "주어진 응답의 내용은 유지하고, 스키마를 만족하는 JSON만 반환하세요."
+)
+
+
+def _build_repair_messages(content: str, name: str, schema: dict, errors: list) -> list:
+    # 원고는 보내지 않음: 깨진 응답 안의 내용만으로 형식을 고침
+    instructions = f"""
+아래 [응답]은 '{name}' 작업의 출력인데 [스키마]를 만족하지 않습니다.
+[오류]를 참고해 응답의 내용은 그대로 두고 형식만 고쳐서 스키마에 맞는 JSON만 반환하세요.
+응답에서 알 수 없는 값은 빈 문자열, 빈 배열, 0 중 타입에 맞는 값으로 채우세요.
+다른 설명이나 마크다운 코드 블록(```)은 포함하지 마세요.
+
+[스키마]
+{json.dumps(schema, ensure_ascii=False)}
+
+[오류]
+{chr(10).join(f"- {e}" for e in errors[:20])}
+
+[응답]
+{content[:REPAIR_CONTENT_CHARS]}
+"""
+    return [
+        {"role": "system", "content": REPAIR_SYSTEM_PROMPT},
+        {"role": "user", "content": instructions.strip()},
+    ]
+
+
+def _failure(name: str, content: str | None, errors: list) -> dict:
+    metrics.record_parse_failure()
+    logger.warning("structured output '%s' failed validation: %s", name, "; ".join(errors[:5]))
+    return {"raw_response": content or "", "parse_error": True, "validation_errors": errors}
+
+
+def is_failure(result) -> bool:
+    return isinstance(result, dict) and bool(result.get("parse_error"))
+
+
+def structured_completion(
+    messages: list,
+    name: str,
+    schema: dict,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.3,
+):
+    """
+    스키마에 맞는 JSON 응답을 파싱해 반환
+    - 검증 실패 시 깨진 응답만 보내 최대 MAX_REPAIR_ATTEMPTS번 고쳐 받음
+    - 끝내 실패하면 {"raw_response", "parse_error": True, "validation_errors"} 반환
+      (응답 거부로 content가 없으면 repair 없이 raw_response=""로 실패)
+    """
+    fmt = response_format(name, schema)
+    content = chat_completion(messages, model, temperature, response_format=fmt)
+    if content is None:
+        return _failure(name, "", [REFUSAL_ERROR])
+    value, errors = parse_and_validate(content, schema)
+
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        if not errors:
+            break
+        metrics.record_repair()
+        content = chat_completion(
+            _build_repair_messages(content, name, schema, errors), model, 0.0, response_format=fmt,
+        )
+        if content is None:
+            return _failure(name, "", [REFUSAL_ERROR])
+        value, errors = parse_and_validate(content, schema)
+
+    return _failure(name, content, errors) if errors else value
+
+
+async def astructured_completion(
+    messages: list,
+    name: str,
+    schema: dict,
+    model: str = DEFAULT_MODEL,
+    temperature: float = 0.3,
+):
+    """structured_completion의 비동기 버전"""
+    fmt = response_format(name, schema)
+    content = await achat_completion(messages, model, temperature, response_format=fmt)
+    if content is None:
+        return _failure(name, "", [REFUSAL_ERROR])
+    value, errors = parse_and_validate(content, schema)
+
+    for _ in range(MAX_REPAIR_ATTEMPTS):
+        if not errors:
+            break
+        metrics.record_repair()
+        content = await achat_completion(
+            _build_repair_messages(content, name, schema, errors), model, 0.0, response_format=fmt,
+        )
+        if content is None:
+            return _failure(name, "", [REFUSAL_ERROR])
+        value, errors = parse_and_validate(content, schema)
+
+    return _failure(name, content, errors) if errors else value